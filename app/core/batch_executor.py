@@ -0,0 +1,99 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.core.executor_helpers import to_serializable
+from app.core.jobs import report_progress
+from app.core.logger import get_logger
+from app.core.metrics import span
+
+logger = get_logger(__name__)
+
+# methods for which one named aggregation over the shared groupby gives what _do_aggregate computes alone
+FUSABLE_METHODS = {"sum", "mean", "median", "min", "max", "count", "nunique", "std", "var", "first", "last"}
+
+
+def fusion_key(df: pd.DataFrame, plan: Dict[str, Any]) -> Optional[Tuple[str, ...]]:
+    """The group keys of a plan that can share a scan with other aggregates on the same keys, or None.
+
+    Only plain grouped aggregates over columns that already exist qualify; anything needing column
+    derivation or name correction goes through the normal executor."""
+    if not isinstance(plan, dict) or str(plan.get("operation", "")).strip().lower() != "aggregate":
+        return None
+    params = plan.get("parameters") or {}
+    group_by = params.get("group_by") or params.get("by")
+    keys = [group_by] if isinstance(group_by, str) else group_by
+    col = params.get("column")
+    if not keys or not isinstance(keys, list) or params.get("method", "sum") not in FUSABLE_METHODS:
+        return None
+    if col not in df.columns or col in keys or not all(k in df.columns for k in keys):
+        return None
+    return tuple(keys)
+
+
+def _finish(res: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
+    # same optional sorting and limiting as _do_aggregate
+    sort_by, order, limit = params.get("sort_by"), params.get("order", "asc"), params.get("limit")
+    if sort_by and sort_by in res.columns:
+        res = res.sort_values(by=sort_by, ascending=(order.lower() == "asc"))
+    if limit:
+        res = res.head(int(limit))
+    return res
+
+
+def run_fused_aggregates(df: pd.DataFrame, keys: Tuple[str, ...], plans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Computes every (column, method) of plans grouped by the same keys in one groupby pass and slices
+    each plan's result out of it, with the column names, sorting and limit _do_aggregate would produce."""
+    params_list = [p.get("parameters") or {} for p in plans]
+    specs = {(p["column"], p.get("method", "sum")) for p in params_list}
+    named = {f"__agg{i}": spec for i, spec in enumerate(sorted(specs))}
+    slot = {spec: name for name, spec in named.items()}
+    try:
+        wide = df.groupby(list(keys)).agg(**named)
+    except Exception as e:
+        logger.warning("Fused aggregate over %s failed (%s), running the queries separately", keys, e)
+        return []
+    logger.info("Fused %d aggregates (%d distinct) over %s into one scan", len(plans), len(named), list(keys))
+
+    results = []
+    for params in params_list:
+        col, method = params["column"], params.get("method", "sum")
+        res = wide[[slot[(col, method)]]].reset_index()
+        new_col_name = f"{col}_{method}" if f"{col}_{method}" not in list(keys) + [col] else col
+        res = _finish(res.rename(columns={slot[(col, method)]: new_col_name}), params)
+        results.append({
+            "status": "ok",
+            "result_df": res,
+            "preview": to_serializable(res),
+            "message": "Executed successfully (fused scan)",
+            "fused": True,
+        })
+    return results
+
+
+def execute_batch(df: pd.DataFrame, plans: List[Any], execute_one: Callable[[Dict[str, Any]], Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """Runs the plans of one batch: aggregates sharing group keys are fused into one scan, every other
+    plan goes to execute_one (the normal derive-and-execute path). Entries that are not plans (planning
+    errors) get None. Results are in plan order."""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(plans)
+    groups: Dict[Tuple[str, ...], List[int]] = {}
+    for i, plan in enumerate(plans):
+        key = fusion_key(df, plan) if isinstance(plan, dict) else None
+        if key is not None:
+            groups.setdefault(key, []).append(i)
+
+    with span("execute"):
+        for keys, indexes in groups.items():
+            if len(indexes) < 2:
+                continue
+            fused = run_fused_aggregates(df, keys, [plans[i] for i in indexes])
+            for i, result in zip(indexes, fused):
+                results[i] = result
+
+    done = sum(r is not None for r in results)
+    for i, plan in enumerate(plans):
+        if results[i] is None and isinstance(plan, dict):
+            report_progress("batch_execute", done=done, total=len(plans))
+            results[i] = execute_one(plan)
+            done += 1
+    return results
@@ -0,0 +1,133 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# how the executor reads each plan parameter; anything not listed here is a literal value
+# (filter values, operators, methods, join "how", limits, ...) and never names a column
+COLUMN_ROLES = ("column", "column1", "column2", "group_by", "by", "index", "columns", "values",
+                "id_vars", "value_vars", "left_on", "on")
+SORT_ROLES = ("sort_by",)
+OUTPUT_ROLES = ("new_column", "new_column_name", "var_name", "value_name")
+
+
+def _norm(name: str) -> str:
+    return re.sub(r"[^0-9a-z]", "", str(name).casefold())
+
+
+class ColumnIndex:
+    """Lookup of a sheet's column names by exact, case-insensitive and normalized match.
+
+    There is deliberately no fuzzy matching: a near miss such as "Revenue2024" against Revenue2023 names
+    a different (or not yet existing) column, so it stays unresolved and goes to derivation."""
+
+    def __init__(self, columns: Iterable):
+        self.columns: List[str] = []
+        self._exact: set = set()
+        self._casefold: Dict[str, str] = {}
+        self._normalized: Dict[str, str] = {}
+        for c in columns:
+            self.add(c)
+
+    def add(self, column: Any) -> None:
+        column = str(column)
+        if column in self._exact:
+            return
+        self.columns.append(column)
+        self._exact.add(column)
+        self._casefold.setdefault(column.casefold(), column)
+        self._normalized.setdefault(_norm(column), column)
+
+    def resolve(self, name: Any) -> Optional[str]:
+        """Returns the sheet's spelling of `name`, or None when it does not refer to a known column."""
+        name = str(name).strip()
+        if not name:
+            return None
+        if name in self._exact:
+            return name
+        if name.casefold() in self._casefold:
+            return self._casefold[name.casefold()]
+        key = _norm(name)
+        if not key:
+            return None
+        return self._normalized.get(key)
+
+
+class PlanColumns:
+    """Outcome of resolving a plan: mentions mapped to real column names and references that matched nothing."""
+
+    def __init__(self):
+        self.resolved: Dict[str, str] = {}
+        self.missing: List[str] = []
+
+    def _record(self, mention: str, column: Optional[str]) -> None:
+        if column is None:
+            if mention not in self.missing:
+                self.missing.append(mention)
+        elif column != mention:
+            self.resolved[mention] = column
+
+
+def _as_names(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if isinstance(v, str) and v.strip()]
+    return []
+
+
+def _step_outputs(op: str, params: Dict[str, Any]) -> List[str]:
+    """Columns an executed step adds, so later multi_step steps may refer to them."""
+    outputs = [params[k] for k in OUTPUT_ROLES if isinstance(params.get(k), str)]
+    col = params.get("column")
+    if op == "aggregate":
+        method = params.get("method", "sum")
+        outputs += [f"{c}_{method}" for c in _as_names(col)] + ["count"]
+    elif op == "date_ops" and isinstance(col, str):
+        outputs += [f"{col}_month", "diff_days"]
+    elif op == "text_analysis" and isinstance(col, str):
+        outputs.append(f"{col}_analysis")
+    elif op == "unpivot":
+        outputs += ["variable", "value"]
+    return outputs
+
+
+def _resolve_step(step: Dict[str, Any], index: ColumnIndex, result: PlanColumns, canonicalize: bool) -> None:
+    op = str(step.get("operation", "")).strip().lower()
+    params = step.get("parameters") or {}
+
+    if op == "multi_step":
+        for sub in params.get("steps", []) or []:
+            if isinstance(sub, dict):
+                _resolve_step(sub, index, result, canonicalize)
+        return
+
+    def visit(key: str) -> None:
+        value = params.get(key)
+        names = _as_names(value)
+        resolved = {}
+        for name in names:
+            column = index.resolve(name)
+            result._record(name, column)
+            resolved[name] = column or name
+        if canonicalize and names:
+            params[key] = resolved[value] if isinstance(value, str) else [resolved.get(v, v) if isinstance(v, str) else v for v in value]
+
+    for key in COLUMN_ROLES:
+        visit(key)
+    outputs = _step_outputs(op, params)
+    for col in outputs:
+        index.add(col)
+    # sort keys may name the step's own output (e.g. "Sales_sum"), so they are resolved after it
+    for key in SORT_ROLES:
+        visit(key)
+
+
+def resolve_plan_columns(plan: Dict[str, Any], columns: Iterable, canonicalize: bool = False) -> PlanColumns:
+    """Walks the plan by parameter role and matches every column reference against the sheet's columns.
+
+    Only parameters that name columns are considered; values, operators and methods never are. Columns produced
+    by earlier multi_step steps count as available to later ones. With canonicalize=True, references are rewritten
+    in place to the sheet's exact spelling (e.g. "sales" -> "Sales").
+    """
+    result = PlanColumns()
+    _resolve_step(plan, ColumnIndex(columns), result, canonicalize)
+    return result
@@ -1,9 +1,11 @@
 import os
 import shutil
+import uuid
 import pandas as pd
-from openpyxl import load_workbook
 from typing import Dict, Any, Optional
-from app.core.logger import get_logger
+from app.core.jobs import report_progress
+from app.core.logger import get_logger, log_payload
+from app.core.metrics import span
 from app.core.executor_helpers import (
     _do_aggregate, _do_math, _do_filter, _do_pivot,
     _do_unpivot, _do_join, _do_date_ops, _do_text_analysis,
@@ -14,8 +16,9 @@ logger = get_logger(__name__)
 
 def execute_plan(df: pd.DataFrame, plan: Dict[str, Any], other_tables: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, Any]:
     """Executes the predicted operation plan on the given Excel dataframe"""
-    logger.info(" Executing plan: %s", plan)
-    df, derivation_report = derive_missing_columns_with_llm(plan, df, logger)
+    log_payload(logger, "plan", " Executing plan: %s", plan)
+    with span("column_derivation"):
+        df, derivation_report = derive_missing_columns_with_llm(plan, df, logger)
     if derivation_report:
         logger.info("Derivation report: %s", derivation_report)
 
@@ -30,140 +33,164 @@ def execute_plan(df: pd.DataFrame, plan: Dict[str, Any], other_tables: Optional[
                 params["right_on"] = params["on"]
                 logger.info("Normalized join parameters: using left_on/right_on = %s", params["on"])
 
-        if op == "aggregate":
-            result = _do_aggregate(df, params)
-        elif op == "math":
-            result = _do_math(df, params)
-        elif op == "filter":
-            result = _do_filter(df, params)
-        elif op == "pivot":
-            result = _do_pivot(df, params)
-        elif op == "unpivot":
-
-            result_unpivot = _do_unpivot(df, params)
-            
-            # If helper returns dict (with dataframe inside)
-            if isinstance(result_unpivot, dict) and "result_df" in result_unpivot:
-                result_df = result_unpivot["result_df"]
-                file_path = result_unpivot.get("file_path")
-            else:
-                result_df = result_unpivot
-                file_path = None
-            logger.info(f"Unpivot result columns: {result_df.columns.tolist()}")
-
-            result = {
-                "status": "ok",
-                "result_df": result_df,
-                "preview": to_serializable(result_df, max_rows=10),
-                "message": "Unpivot operation executed successfully.",
-                "file_path": file_path
-            }
-        elif op == "join":
-            result = _do_join(df, params, other_tables)
-        elif op == "date_ops":
-            result = _do_date_ops(df, params)
-        elif op == "text_analysis":
-            result = _do_text_analysis(df, params)
-        elif op in ["describe", "sample"]:
-            result = {
-                "status": "ok",
-                "result_df": df,
-                "preview": to_serializable(df, max_rows=10),
-                "message": "describe/sample"
-            }
-        elif op == "multi_step":
-            current_df = df.copy()
-            for step in plan.get("parameters", {}).get("steps", []):
-                logger.info(" Executing sub-step: %s", step)
-                out = execute_plan(current_df, step, other_tables=other_tables)
-                if out["status"] != "ok":
-                    return out
-                if out.get("result_df") is not None:
-                    current_df = out["result_df"]
-            result = {
-                "status": "ok",
-                "result_df": current_df,
-                "preview": to_serializable(current_df, max_rows=20),
-                "message": "multi_step executed"
-            }
-        else:
-            logger.warning("Unsupported operation: %s", op)
-            return {"status": "error", "message": f"Unsupported operation: {op}"}
+        with span("execute"):
+            result = _run_operation(df, plan, op, params, other_tables)
+        if result.get("status") != "ok":
+            return result
 
         logger.info(" Operation %s executed successfully.", op)
 
-        # Saving the output in excel file along with input data
-        input_path = plan.get("input_path")
-        result_df = result.get("result_df")
-
-        if result.get("status") == "ok" and "result_df" in result:
-            try:
-                os.makedirs("results", exist_ok=True)
-                input_path = plan.get("input_path")
-
-                # handle case where no input file is provided 
-                if input_path is None:
-                    logger.warning("Skipping Excel save — no input_path provided (e.g., multi-step or ad-hoc query).")
-                    result["message"] = "Result returned (no Excel file created)"
-                    result["preview"] = to_serializable(result.get("result_df"), max_rows=10)
-                    return {
-                        "status": "ok",
-                        "result_df": result["result_df"],
-                        "preview": result["preview"],
-                        "message": result["message"]
-                    }
-
-                input_name = os.path.basename(input_path)
-                result_path = os.path.join("results", f"result_{input_name}")
-
-                # Make a copy of the input Excel 
-                shutil.copy2(input_path, result_path)
-
-                # find the target sheet
-                wb = load_workbook(result_path)
-                sheet_name = wb.sheetnames[0]  # assuming first sheet
-                ws = wb[sheet_name]
-
-                result_df = result["result_df"]
-                same_shape = len(result_df) == len(df)
-
-                if same_shape:
-                    existing_cols = len(ws[1])
-                    for j, col in enumerate(result_df.columns, start=existing_cols + 1):
-                        ws.cell(row=1, column=j, value=col)
-                        for i, val in enumerate(result_df[col].tolist(), start=2):
-                            ws.cell(row=i, column=j, value=val)
-                else:
-                    logger.info(" Writing summary report")
-                    summary_sheet = wb["Summary Report"] if "Summary Report" in wb.sheetnames else wb.create_sheet("Summary Report")
-                    summary_sheet.append(["Summary Report"])
-                    # summary_sheet.append([])
-
-                    try:
-                        preview = result.get("preview", [])
-                        if preview and isinstance(preview[0], dict):
-                            for row in preview:
-                                line = ", ".join(f"{k}: {v}" for k, v in row.items())
-                                summary_sheet.append([line])
-                        else:
-                            summary_sheet.append([str(preview)])
-                    except Exception as e:
-                        summary_sheet.append([f"(Could not format summary: {e})"])
-
-                wb.save(result_path)
-                wb.close()
-
-                result["file_path"] = result_path
-                result["result_file"] = os.path.basename(result_path)
-                result["message"] = f"Result written to {result_path}"
-                logger.info(f" Result written to {result_path}")
-
-            except Exception as e:
-                logger.error(" Failed to save result: %s", e)
-                result["message"] = f"Save failed: {e}"
-                
-        return result
+        with span("excel_export"):
+            return _save_result_workbook(df, plan, result)
 
     except Exception as e:
         logger.exception(" Exception during plan execution: %s", e)
         return {"status": "error", "message": str(e)}
+
+
+def _run_operation(df: pd.DataFrame, plan: Dict[str, Any], op: str, params: Dict[str, Any],
+                   other_tables: Optional[Dict[str, pd.DataFrame]]) -> Dict[str, Any]:
+    """Dispatches one operation and returns its result dict (not yet written to Excel)."""
+    if op == "aggregate":
+        result = _do_aggregate(df, params)
+    elif op == "math":
+        result = _do_math(df, params)
+    elif op == "filter":
+        result = _do_filter(df, params)
+    elif op == "pivot":
+        result = _do_pivot(df, params)
+    elif op == "unpivot":
+
+        result_unpivot = _do_unpivot(df, params)
+
+        # If helper returns dict (with dataframe inside)
+        if isinstance(result_unpivot, dict) and "result_df" in result_unpivot:
+            result_df = result_unpivot["result_df"]
+            file_path = result_unpivot.get("file_path")
+        else:
+            result_df = result_unpivot
+            file_path = None
+        logger.info("Unpivot result columns: %s", result_df.columns.tolist())
+
+        result = {
+            "status": "ok",
+            "result_df": result_df,
+            "preview": to_serializable(result_df, max_rows=10),
+            "message": "Unpivot operation executed successfully.",
+            "file_path": file_path
+        }
+    elif op == "join":
+        result = _do_join(df, params, other_tables)
+    elif op == "date_ops":
+        result = _do_date_ops(df, params)
+    elif op == "text_analysis":
+        result = _do_text_analysis(df, params)
+    elif op in ["describe", "sample"]:
+        result = {
+            "status": "ok",
+            "result_df": df,
+            "preview": to_serializable(df, max_rows=10),
+            "message": "describe/sample"
+        }
+    elif op == "multi_step":
+        current_df = df.copy()
+        steps = plan.get("parameters", {}).get("steps", [])
+        for i, step in enumerate(steps):
+            # a cancelled job stops here, between steps
+            report_progress("multi_step", done=i, total=len(steps))
+            log_payload(logger, "plan_step", " Executing sub-step: %s", step)
+            out = execute_plan(current_df, step, other_tables=other_tables)
+            if out["status"] != "ok":
+                return out
+            if out.get("result_df") is not None:
+                current_df = out["result_df"]
+        result = {
+            "status": "ok",
+            "result_df": current_df,
+            "preview": to_serializable(current_df, max_rows=20),
+            "message": "multi_step executed"
+        }
+    else:
+        logger.warning("Unsupported operation: %s", op)
+        return {"status": "error", "message": f"Unsupported operation: {op}"}
+
+    return result
+
+
+def _save_result_workbook(df: pd.DataFrame, plan: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Writes the result next to a copy of the input workbook under results/."""
+    # Saving the output in excel file along with input data
+    input_path = plan.get("input_path")
+    result_df = result.get("result_df")
+
+    if result.get("status") == "ok" and "result_df" in result:
+        try:
+            os.makedirs("results", exist_ok=True)
+            input_path = plan.get("input_path")
+
+            # handle case where no input file is provided 
+            if input_path is None:
+                logger.warning("Skipping Excel save — no input_path provided (e.g., multi-step or ad-hoc query).")
+                result["message"] = "Result returned (no Excel file created)"
+                result["preview"] = to_serializable(result.get("result_df"), max_rows=10)
+                return {
+                    "status": "ok",
+                    "result_df": result["result_df"],
+                    "preview": result["preview"],
+                    "message": result["message"]
+                }
+
+            # one workbook per result: concurrent queries on the same file must not copy over and
+            # re-save each other's workbook, and a returned file_path must keep pointing at this answer
+            stem, ext = os.path.splitext(os.path.basename(input_path))
+            result_path = os.path.join("results", f"result_{stem}_{uuid.uuid4().hex[:12]}{ext}")
+
+            # Make a copy of the input Excel 
+            shutil.copy2(input_path, result_path)
+
+            # find the target sheet
+            from openpyxl import load_workbook  # only needed for exports; keeps it off the import path
+            wb = load_workbook(result_path)
+            sheet_name = wb.sheetnames[0]  # assuming first sheet
+            ws = wb[sheet_name]
+
+            result_df = result["result_df"]
+            same_shape = len(result_df) == len(df)
+
+            if same_shape:
+                existing_cols = len(ws[1])
+                for j, col in enumerate(result_df.columns, start=existing_cols + 1):
+                    report_progress("excel_export", done=j - existing_cols - 1, total=len(result_df.columns))
+                    ws.cell(row=1, column=j, value=col)
+                    for i, val in enumerate(result_df[col].tolist(), start=2):
+                        ws.cell(row=i, column=j, value=val)
+            else:
+                logger.info(" Writing summary report")
+                summary_sheet = wb["Summary Report"] if "Summary Report" in wb.sheetnames else wb.create_sheet("Summary Report")
+                summary_sheet.append(["Summary Report"])
+                # summary_sheet.append([])
+
+                try:
+                    preview = result.get("preview", [])
+                    if preview and isinstance(preview[0], dict):
+                        for row in preview:
+                            line = ", ".join(f"{k}: {v}" for k, v in row.items())
+                            summary_sheet.append([line])
+                    else:
+                        summary_sheet.append([str(preview)])
+                except Exception as e:
+                    summary_sheet.append([f"(Could not format summary: {e})"])
+
+            wb.save(result_path)
+            wb.close()
+
+            result["file_path"] = result_path
+            result["result_file"] = os.path.basename(result_path)
+            result["message"] = f"Result written to {result_path}"
+            logger.info(" Result written to %s", result_path)
+
+        except Exception as e:
+            logger.error(" Failed to save result: %s", e)
+            result["message"] = f"Save failed: {e}"
+
+    return result
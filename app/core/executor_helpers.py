@@ -3,28 +3,42 @@ import numpy as np
 import os
 import time
 import re
-from typing import Dict, Any, Tuple
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
 from pandas import DataFrame
 from app.core.logger import get_logger
+from app.core.schema import schema_fingerprint
+from app.core.prompt_builder import build_derivation_prompt, column_profile
+from app.core.column_resolver import resolve_plan_columns
+from app.core.serialization import frame_to_records
+from app.core.metrics import record_cache_lookup
 from app.services.gemini_service import generate_text 
 
 logger = get_logger(__name__)
 logger.info("LOADED: %s", os.path.abspath(__file__))
 
+# whether operations write their own results/result_*.xlsx file; off for callers that keep results only
+# in the result store (asyncio.to_thread copies it to the worker thread)
+_write_result_files: ContextVar[bool] = ContextVar("write_result_files", default=True)
+
+
+@contextmanager
+def no_result_files():
+    """Operations run inside the block skip their per-operation Excel file."""
+    token = _write_result_files.set(False)
+    try:
+        yield
+    finally:
+        _write_result_files.reset(token)
+
 
 def to_serializable(df: DataFrame, max_rows: int = 20):
     """Converts dataframe to JSON-serializable python types."""
-    records = df.head(max_rows).where(pd.notnull(df.head(max_rows)), None).to_dict(orient="records")
-    for r in records:
-        for k, v in list(r.items()):
-            if isinstance(v, (pd.Timestamp, np.datetime64)):
-                try:
-                    r[k] = pd.to_datetime(v).strftime("%Y-%m-%d")
-                except Exception:
-                    r[k] = str(v)
-            elif isinstance(v, (np.integer, np.floating, np.bool_)):
-                r[k] = v.item()
-    return records
+    return frame_to_records(df, max_rows=max_rows)
 
 def _do_aggregate(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
     """Performs aggregation on a df. Handles missing group_by gracefully."""
@@ -35,19 +49,19 @@ def _do_aggregate(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
     order = params.get("order", "asc")
     limit = params.get("limit")
 
-    logger.info(f"Aggregating: col={col}, group_by={group_by}, method={method}")
+    logger.info("Aggregating: col=%s, group_by=%s, method=%s", col, group_by, method)
 
     try:
         if not group_by:
             if col in df.columns:
                 agg_val = getattr(df[col], method)()
                 res = pd.DataFrame([{f"{col}_{method}": agg_val}])
-                logger.info(f"No group_by specified, computed {method}({col}) = {agg_val}")
+                logger.info("No group_by specified, computed %s(%s) = %s", method, col, agg_val)
             else:
                 # Try counting rows if col missing
                 if method == "count":
                     res = pd.DataFrame([{"count": len(df)}])
-                    logger.info(f"No group_by/column, returning row count = {len(df)}")
+                    logger.info("No group_by/column, returning row count = %s", len(df))
                 else:
                     raise KeyError(f"Column not found: {col}")
         else:
@@ -56,7 +70,7 @@ def _do_aggregate(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
             res = df.groupby(group_by)[col].agg(method).reset_index()
             new_col_name = f"{col}_{method}" if f"{col}_{method}" not in res.columns else col
             res.rename(columns={col: new_col_name}, inplace=True)
-            logger.info(f"Grouped by {group_by} and aggregated {col} with {method}")
+            logger.info("Grouped by %s and aggregated %s with %s", group_by, col, method)
 
         # Optional sorting and limiting
         if sort_by and sort_by in res.columns:
@@ -65,12 +79,14 @@ def _do_aggregate(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
             res = res.head(int(limit))
 
         # Save to Excel (summary report)
-        os.makedirs("results", exist_ok=True)
-        timestamp = int(time.time())
-        result_filename = f"result_aggregate_{timestamp}.xlsx"
-        result_path = os.path.join("results", result_filename)
-        res.to_excel(result_path, index=False)
-        logger.info(f"Result saved at {result_path}")
+        result_filename = result_path = None
+        if _write_result_files.get():
+            os.makedirs("results", exist_ok=True)
+            timestamp = int(time.time())
+            result_filename = f"result_aggregate_{timestamp}.xlsx"
+            result_path = os.path.join("results", result_filename)
+            res.to_excel(result_path, index=False)
+            logger.info("Result saved at %s", result_path)
 
         return {
             "status": "ok",
@@ -96,7 +112,7 @@ def _do_math(df, params):
             return {
                 "status": "ok",
                 "result_df": df,
-                "preview": df.head(5).to_dict(orient="records"),
+                "preview": to_serializable(df, max_rows=5),
                 "message": f"Column '{new_col}' already present, skipping math."
             }
 
@@ -144,7 +160,7 @@ def _do_math(df, params):
         return {
             "status": "ok",
             "result_df": df,
-            "preview": df.head(5).to_dict(orient="records"),
+            "preview": to_serializable(df, max_rows=5),
             "message": f"Added new column '{new_col}' using formula: {formula}"
         }
 
@@ -161,7 +177,7 @@ def _do_filter(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
         if col not in df.columns:
             raise KeyError(f"Column not found: {col}")
 
-        logger.info(f"Filtering: {col} {op} {val}")
+        logger.info("Filtering: %s %s %s", col, op, val)
 
         if op == "==":
             filtered = df[df[col] == val]
@@ -180,7 +196,7 @@ def _do_filter(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
         else:
             raise ValueError(f"Unsupported operator: {op}")
 
-        logger.info(f"Filtered rows: {len(filtered)} / {len(df)}")
+        logger.info("Filtered rows: %s / %s", len(filtered), len(df))
 
         return {
             "status": "ok",
@@ -208,10 +224,13 @@ def _do_pivot(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
     result_path = os.path.join("results", result_filename)
 
     try:
-        res.to_excel(result_path, index=False)
-        logger.info(f"Result saved at {result_path}")
+        if not _write_result_files.get():
+            result_path = None
+        else:
+            res.to_excel(result_path, index=False)
+            logger.info("Result saved at %s", result_path)
     except Exception as e:
-        logger.error(f"Failed to save result: {e}")
+        logger.error("Failed to save result: %s", e)
         result_path = None
 
     return {
@@ -230,8 +249,10 @@ def _do_unpivot(df, params):
 
     melted = df.melt(id_vars=id_vars, value_vars=value_vars, var_name=var_name, value_name=value_name)
 
-    result_path = f"results/result_{int(time.time())}.xlsx"
-    melted.to_excel(result_path, index=False)
+    result_path = None
+    if _write_result_files.get():
+        result_path = f"results/result_{int(time.time())}.xlsx"
+        melted.to_excel(result_path, index=False)
 
     return {"status": "ok", "result_df": melted, "file_path": result_path}
 
@@ -294,14 +315,14 @@ def _do_join(df_left, params, other_tables=None, logger=None):
             return {"status": "error", "message": "Missing left_on or right_on in join parameters."}
 
         if logger:
-            logger.info(f"Joining on '{left_on}' with '{resolved_right}' ({how} join)")
+            logger.info("Joining on '%s' with '%s' (%s join)", left_on, resolved_right, how)
 
         result_df = df_left.merge(df_right, left_on=left_on, right_on=right_on, how=how)
 
         return {
             "status": "ok",
             "result_df": result_df,
-            "preview": result_df.head(5).to_dict(orient="records"),
+            "preview": to_serializable(result_df, max_rows=5),
             "message": f"Join completed successfully with table '{resolved_right}'"
         }
 
@@ -331,10 +352,13 @@ def _do_date_ops(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
     result_path = os.path.join("results", result_filename)
 
     try:
-        res.to_excel(result_path, index=False)
-        logger.info(f"Result saved at {result_path}")
+        if not _write_result_files.get():
+            result_path = None
+        else:
+            res.to_excel(result_path, index=False)
+            logger.info("Result saved at %s", result_path)
     except Exception as e:
-        logger.error(f"Failed to save result: {e}")
+        logger.error("Failed to save result: %s", e)
         result_path = None
 
     return {
@@ -363,10 +387,13 @@ def _do_text_analysis(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any
     result_path = os.path.join("results", result_filename)
 
     try:
-        df.to_excel(result_path, index=False)
-        logger.info(f"Result saved at {result_path}")
+        if not _write_result_files.get():
+            result_path = None
+        else:
+            df.to_excel(result_path, index=False)
+            logger.info("Result saved at %s", result_path)
     except Exception as e:
-        logger.error(f"Failed to save result: {e}")
+        logger.error("Failed to save result: %s", e)
         result_path = None
 
     return {
@@ -377,26 +404,6 @@ def _do_text_analysis(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, Any
         "result_file": result_filename if result_path else None
     }
 
-def _extract_column_mentions(plan: dict) -> set:
-    cols = set()
-    params = plan.get("parameters", {}) or {}
-    def collect(v):
-        if isinstance(v, str):
-            parts = re.split(r"[,\|\(\)\+\-\*/<>:%\"]+", v)
-            for p in parts:
-                p = p.strip()
-                # consider tokens that contain letters and not a number only
-                if p and re.search(r"[A-Za-z]", p):
-                    cols.add(p)
-        elif isinstance(v, list):
-            for el in v:
-                collect(el)
-        elif isinstance(v, dict):
-            for el in v.values():
-                collect(el)
-    collect(params)
-    return cols
-
 def _safe_eval_expression_on_sample(expr: str, df: 'pd.DataFrame') -> Tuple[bool, str]:
     """Evaluate the expression on a small sample of the DataFrame to validate it."""
     sample = df.head(10).copy()
@@ -421,79 +428,114 @@ def _normalize_token_name(token: str) -> str:
     """Convert df column names into py variables."""
     return token.strip().replace(" ", "_").replace("-", "_")
 
+DERIVATION_CACHE_MAX_ENTRIES = int(os.getenv("DERIVATION_CACHE_MAX_ENTRIES", "1024"))
+
+# (schema fingerprint, column) -> {"expr": validated expression or None, "detail": ...}, least recently used first
+derivation_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+_derivation_cache_lock = threading.Lock()
+
+
+def _cached_derivation(key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+    with _derivation_cache_lock:
+        entry = derivation_cache.get(key)
+        if entry is not None:
+            derivation_cache.move_to_end(key)
+        return entry
+
+
+def _remember_derivation(key: Tuple[str, str], entry: Dict[str, Any]) -> Dict[str, Any]:
+    with _derivation_cache_lock:
+        derivation_cache[key] = entry
+        derivation_cache.move_to_end(key)
+        while len(derivation_cache) > DERIVATION_CACHE_MAX_ENTRIES:
+            derivation_cache.popitem(last=False)
+    return entry
+
+def _parse_derivation_response(raw: Any, missing: List[str]) -> Dict[str, str]:
+    """Extracts {column: expression} from the LLM reply. Tolerates code fences and a bare expression for one column."""
+    text = str(raw).strip()
+    match = re.search(r"\{[\s\S]*\}", text)
+    if match:
+        try:
+            parsed = json.loads(match.group(0))
+            if isinstance(parsed, dict):
+                return {str(k): str(v).strip() for k, v in parsed.items() if v is not None}
+        except json.JSONDecodeError:
+            pass
+    if len(missing) == 1:
+        for line in text.splitlines():
+            l = line.strip().strip("`")
+            if not l:
+                continue
+            if (l.startswith('"') and l.endswith('"')) or (l.startswith("'") and l.endswith("'")):
+                l = l[1:-1]
+            return {missing[0]: l}
+    return {}
+
+
+def _apply_derived_expression(expr: str, df: 'pd.DataFrame'):
+    local_ns = {}
+    for c in df.columns:
+        local_ns[_normalize_token_name(c)] = df[c]
+    return eval(expr, {"np": np, "pd": pd, "__builtins__": {}}, local_ns)
+
+
 def derive_missing_columns_with_llm(plan: dict, df: 'pd.DataFrame', logger) -> Tuple['pd.DataFrame', dict]:
-    """For any column referenced by the plan but missing from df,ask the LLM to propose a derivation using only existing columns."""
+    """For any column referenced by the plan but missing from df, ask the LLM (once, for all of them) to propose
+    derivations using only existing columns. Results are cached per schema fingerprint and column name."""
     report = {}
     
     if plan.get("operation") == "math" and plan["parameters"].get("formula"):
         logger.info("Skipping LLM derivation (formula provided manually).")
         return df, {}
-    # 1) detect mentioned columns from plan
-    mentioned = _extract_column_mentions(plan)
-    # Filter out obvious non-column words like SQL keywords (very conservative)
-    sql_stop = {"select","where","group","by","order","limit","sum","avg","count","and","or","not","desc","asc"}
-    mentioned = {m for m in mentioned if m.lower() not in sql_stop}
-    # 2) which are missing
-    missing = [m for m in mentioned if m not in df.columns]
+    # 1) resolve column references by parameter role against the sheet's columns; values, operators and
+    #    methods are never mistaken for columns, and near-miss spellings are rewritten to the real name
+    mentions = resolve_plan_columns(plan, df.columns, canonicalize=True)
+    if mentions.resolved:
+        logger.info("Resolved column references: %s", mentions.resolved)
+    # 2) only real unresolved references need the LLM
+    missing = sorted(mentions.missing)
     if not missing:
         return df, report
 
     logger.info("Derivation needed for columns: %s", missing)
 
     # available columns tokens to propose usage
-    avail_cols = list(df.columns)
+    avail_cols = [str(c) for c in df.columns]
     avail_tokens = { _normalize_token_name(c): c for c in avail_cols }
+    # derived columns materialized earlier are left out so the key stays that of the original sheet
+    derived_cols = df.attrs.setdefault("derived_columns", [])
+    fingerprint = schema_fingerprint([c for c in df.columns if c not in derived_cols])
 
-    sample_cols_display = ", ".join(avail_cols[:30])
+    # 3) one LLM round trip for every column we have not seen on this schema before
+    decisions = {}
     for col in missing:
-        skip_keys = {"method", "how", "left_table", "right_table", "operation", "new_column"}
-        if col in skip_keys:
-            continue
+        cached = _cached_derivation((fingerprint, col))
+        if cached is not None:
+            decisions[col] = cached
+    to_ask = [col for col in missing if col not in decisions]
+    for col in missing:
+        record_cache_lookup("derivation", col not in to_ask)
+    if to_ask:
+        logger.info("LLM to derive %s from %d columns", to_ask, len(avail_cols))
         try:
-            prompt = f"""
-        You are given a pandas DataFrame with these columns:
-        {sample_cols_display}
-
-        The user requested an operation that refers to a missing column named "{col}".
-        Propose a single short Python expression (no surrounding code, no markdown fences)
-        that computes "{col}" using only the existing columns above. Use pandas Series variable names
-        that are the column names with spaces replaced by underscores.
-
-        If the missing column cannot be derived from the available columns, return the single token:
-        CANNOT_DERIVE
-
-        Examples of valid outputs:
-        Quantity * UnitPrice * (1 - Discount)
-        UnitPrice * Quantity
-        Profit - Cost
-
-        Return only the expression or CANNOT_DERIVE.
-        """     
-            logger.info("LLM to derive '%s' from %d columns", col, len(avail_cols))
-            raw = generate_text(prompt)
-            expr = None
-            try:
-                text = str(raw).strip()
-            except Exception:
-                text = str(raw)
-
-            for line in text.splitlines():
-                l = line.strip()
-                if not l:
-                    continue
-                # cleaning
-                if (l.startswith('"') and l.endswith('"')) or (l.startswith("'") and l.endswith("'")):
-                    l = l[1:-1]
-                expr = l
-                break
+            proposals = _parse_derivation_response(generate_text(build_derivation_prompt(to_ask, avail_cols, column_profile(df))), to_ask)
+        except Exception as e:
+            logger.exception("Unexpected error while deriving %s: %s", to_ask, e)
+            for col in to_ask:
+                report[col] = {"status": "failed", "detail": str(e)}
+            to_ask, proposals = [], {}
 
+        for col in to_ask:
+            expr = proposals.get(col)
             if not expr:
+                # not cached: an empty answer may be transient
                 report[col] = {"status": "failed", "detail": "empty LLM response"}
                 logger.warning(" Empty LLM response when deriving %s", col)
                 continue
 
             if expr == "CANNOT_DERIVE" or "cannot" in expr.lower():
-                report[col] = {"status": "skipped", "detail": "LLM indicated cannot derive"}
+                decisions[col] = _remember_derivation((fingerprint, col), {"expr": None, "status": "skipped", "detail": "LLM indicated cannot derive"})
                 logger.info("LLM could not derive '%s'", col)
                 continue
 
@@ -505,24 +547,27 @@ def derive_missing_columns_with_llm(plan: dict, df: 'pd.DataFrame', logger) -> T
 
             ok, err = _safe_eval_expression_on_sample(safe_expr, df)
             if not ok:
-                report[col] = {"status": "failed", "detail": f"validation failed: {err}", "expr": safe_expr}
+                decisions[col] = _remember_derivation((fingerprint, col), {"expr": None, "status": "failed", "detail": f"validation failed: {err}"})
                 logger.warning("Validation failed for derived expr for '%s': %s", col, err)
                 continue
+            decisions[col] = _remember_derivation((fingerprint, col), {"expr": safe_expr, "status": "derived", "detail": "applied"})
 
-            try:
-                local_ns = {}
-                for c in df.columns:
-                    local_ns[_normalize_token_name(c)] = df[c]
-                # Execute on full df
-                result_series = eval(safe_expr, {"np": np, "pd": pd, "__builtins__": {}}, local_ns)
-                df[col] = result_series
-                report[col] = {"status": "derived", "detail": "applied", "expr": safe_expr}
-                logger.info(" Derived column '%s' applied using expression: %s", col, safe_expr)
-            except Exception as e:
-                report[col] = {"status": "failed", "detail": f"apply error: {e}", "expr": safe_expr}
-                logger.error("Failed to apply derived expr for '%s': %s", col, e)
+    # 4) apply accepted expressions (cached or fresh) on the full frame
+    for col in missing:
+        cached = decisions.get(col)
+        if cached is None:
+            continue
+        source = "llm" if col in to_ask else "cache"
+        if cached["expr"] is None:
+            report[col] = {"status": cached["status"], "detail": cached["detail"], "source": source}
+            continue
+        try:
+            df[col] = _apply_derived_expression(cached["expr"], df)
+            derived_cols.append(col)
+            report[col] = {"status": "derived", "detail": "applied", "expr": cached["expr"], "source": source}
+            logger.info(" Derived column '%s' applied using expression: %s", col, cached["expr"])
         except Exception as e:
-            report[col] = {"status": "failed", "detail": str(e)}
-            logger.exception("Unexpected error while deriving %s: %s", col, e)
+            report[col] = {"status": "failed", "detail": f"apply error: {e}", "expr": cached["expr"]}
+            logger.error("Failed to apply derived expr for '%s': %s", col, e)
 
     return df, report
@@ -0,0 +1,278 @@
+import difflib
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# on: use fast-path plans above the confidence threshold, off: always ask the LLM,
+# shadow: always ask the LLM but compare its plan with the fast-path plan and record agreement.
+# Shadow by default: switch to on once /admin/fast_planner shows a high agreement rate on real traffic.
+FAST_PLANNER_MODE = os.getenv("FAST_PLANNER_MODE", "shadow").strip().lower()
+FAST_PLANNER_MIN_CONFIDENCE = float(os.getenv("FAST_PLANNER_MIN_CONFIDENCE", "0.85"))
+
+AGG_WORDS = {
+    "sum": "sum", "total": "sum", "sum of": "sum", "total of": "sum",
+    "average": "mean", "avg": "mean", "mean": "mean", "average of": "mean", "avg of": "mean", "mean of": "mean",
+    "max": "max", "maximum": "max", "highest": "max", "max of": "max", "maximum of": "max",
+    "min": "min", "minimum": "min", "lowest": "min", "min of": "min", "minimum of": "min",
+    "count": "count", "number": "count", "count of": "count", "number of": "count",
+}
+_AGG_RE = "|".join(sorted((re.escape(w) for w in AGG_WORDS), key=len, reverse=True))
+
+FILTER_OPS = [
+    (">=", ">="), ("<=", "<="), ("!=", "!="), ("==", "=="), ("=", "=="), (">", ">"), ("<", "<"),
+    ("is greater than or equal to", ">="), ("greater than or equal to", ">="), ("at least", ">="),
+    ("is less than or equal to", "<="), ("less than or equal to", "<="), ("at most", "<="),
+    ("is greater than", ">"), ("greater than", ">"), ("more than", ">"), ("above", ">"), ("over", ">"),
+    ("is less than", "<"), ("less than", "<"), ("below", "<"), ("under", "<"),
+    ("is not", "!="), ("not equal to", "!="), ("equals", "=="), ("equal to", "=="), ("is", "=="),
+    ("contains", "contains"), ("like", "like"),
+]
+_OP_RE = "|".join(re.escape(w) for w, _ in sorted(FILTER_OPS, key=lambda x: len(x[0]), reverse=True))
+_OP_MAP = dict(FILTER_OPS)
+
+_LEAD = r"^(?:please )?(?:show(?: me)?|list|get|find|give me|display|what is|what's|what are|compute|calculate|return)?\s*(?:the )?"
+
+TOP_N_RE = re.compile(
+    _LEAD + rf"(?P<dir>top|bottom|first|last) (?P<n>\d+) (?P<group>.+?) (?:by|based on|ranked by) "
+    rf"(?:(?P<agg>{_AGG_RE}) )?(?P<value>.+)$"
+)
+AGG_BY_RE = re.compile(
+    _LEAD + rf"(?P<agg>{_AGG_RE}) (?P<value>.+?) (?:grouped by|for each|for every|by|per|across|in each) (?P<group>.+)$"
+)
+AGG_ALL_RE = re.compile(_LEAD + rf"(?P<agg>{_AGG_RE}) (?P<value>.+)$")
+FILTER_RE = re.compile(
+    r"^(?:please )?(?:filter|show(?: me)?|list|get|find|select|display|return)?\s*(?:all )?(?:the )?"
+    r"(?:rows|records|entries|data|orders|items)?\s*(?:where|with|having|for which|whose|when)?\s*"
+    rf"(?P<col>[a-z0-9_ ()%-]+?) (?P<op>{_OP_RE}) (?P<value>.+)$"
+)
+
+_ARTICLES = re.compile(r"^(?:the|each|every|all|a|an|total|overall)\s+")
+
+_stats_lock = threading.Lock()
+fast_planner_stats = {
+    "fast_path_hits": 0,
+    "fast_path_misses": 0,
+    "low_confidence": 0,
+    "shadow_compared": 0,
+    "shadow_agreed": 0,
+}
+
+
+def record_event(key: str) -> None:
+    with _stats_lock:
+        fast_planner_stats[key] += 1
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(text).lower())
+
+
+def _guessed(score: float) -> float:
+    # prefix and fuzzy matches can name a different real column ("revenue2024" is close to Revenue2023),
+    # so they never reach the fast-path threshold on their own
+    return min(score, max(0.0, FAST_PLANNER_MIN_CONFIDENCE - 0.05))
+
+
+def _singular(token: str) -> str:
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("es") and len(token) > 4 and token[-3] in "sxz":
+        return token[:-2]
+    if token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+        return token[:-1]
+    return token
+
+
+class ColumnMatcher:
+    """Resolves a phrase from the query to one of the sheet's columns, with a match score in [0, 1].
+
+    Only exact (normalized) and singular/plural matches score high enough for the fast path; prefix
+    and fuzzy matches are kept as low-confidence guesses for shadow comparison."""
+
+    def __init__(self, columns: Iterable):
+        self.columns = [str(c) for c in columns]
+        self.by_norm: Dict[str, str] = {}
+        for c in self.columns:
+            self.by_norm.setdefault(_norm(c), c)
+
+    def resolve(self, phrase: str) -> Tuple[Optional[str], float]:
+        phrase = phrase.strip().strip("'\"`")
+        while True:
+            stripped = _ARTICLES.sub("", phrase)
+            if stripped == phrase:
+                break
+            phrase = stripped
+        key = _norm(phrase)
+        if not key:
+            return None, 0.0
+        if key in self.by_norm:
+            return self.by_norm[key], 1.0
+
+        singular = _singular(key)
+        for variant in (singular, key + "s", key + "es"):
+            if variant in self.by_norm:
+                return self.by_norm[variant], 0.95
+
+        # "customer" -> "CustomerName"; only trusted when unambiguous
+        if len(singular) >= 4:
+            prefixed = [c for n, c in self.by_norm.items() if n.startswith(singular)]
+            if len(prefixed) == 1:
+                return prefixed[0], _guessed(0.85)
+            if len(prefixed) > 1:
+                return prefixed[0], _guessed(0.5)
+
+        close = difflib.get_close_matches(key, list(self.by_norm), n=2, cutoff=0.8)
+        if close:
+            score = difflib.SequenceMatcher(None, key, close[0]).ratio() * 0.95
+            if len(close) > 1:
+                score *= 0.6
+            return self.by_norm[close[0]], _guessed(score)
+        return None, 0.0
+
+
+def _parse_value(raw: str) -> Tuple[Any, float]:
+    """Parses a filter value; numbers and quoted strings are trusted more than bare words."""
+    raw = raw.strip().rstrip(".?!")
+    if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in "'\"":
+        return raw[1:-1], 1.0
+    number = raw.replace(",", "")
+    try:
+        return (int(number) if re.fullmatch(r"-?\d+", number) else float(number)), 1.0
+    except ValueError:
+        return raw, 0.8
+
+
+def _aggregate_plan(value_col: str, group_col: Optional[str], method: str,
+                    order: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    params: Dict[str, Any] = {"column": value_col, "method": method}
+    if group_col:
+        params["group_by"] = group_col
+    if order:
+        # the executor renames the aggregated column to <column>_<method>
+        params["sort_by"] = f"{value_col}_{method}"
+        params["order"] = order
+    if limit:
+        params["limit"] = limit
+    return {"operation": "aggregate", "parameters": params}
+
+
+def _count_column(matcher: ColumnMatcher, value_phrase: str, group_col: str) -> Tuple[Optional[str], float]:
+    col, score = matcher.resolve(value_phrase)
+    if col and score >= FAST_PLANNER_MIN_CONFIDENCE and col != group_col:
+        return col, score
+    # "number of orders per region" counts rows, not the non-null values of some column; leave it to the LLM
+    return None, 0.0
+
+
+def plan_locally(user_query: str, columns: Optional[Iterable]) -> Tuple[Optional[Dict[str, Any]], float]:
+    """Matches common query shapes against the sheet's columns.
+
+    Returns (plan, confidence) with a plan in the executor's JSON format, or (None, 0.0) when no
+    shape matched.
+    """
+    if not user_query or not columns:
+        return None, 0.0
+    matcher = ColumnMatcher(columns)
+    original = re.sub(r"\s+", " ", user_query.strip()).rstrip(" .?!;")
+    query = original.lower()
+
+    m = TOP_N_RE.match(query)
+    if m:
+        group_col, g_score = matcher.resolve(m.group("group"))
+        value_col, v_score = matcher.resolve(m.group("value"))
+        if group_col and value_col and group_col != value_col:
+            method = AGG_WORDS.get(m.group("agg") or "sum", "sum")
+            order = "desc" if m.group("dir") in ("top", "first") else "asc"
+            plan = _aggregate_plan(value_col, group_col, method, order=order, limit=int(m.group("n")))
+            return plan, min(g_score, v_score)
+
+    m = AGG_BY_RE.match(query)
+    if m:
+        method = AGG_WORDS[m.group("agg")]
+        group_col, g_score = matcher.resolve(m.group("group"))
+        if group_col:
+            if method == "count":
+                value_col, v_score = _count_column(matcher, m.group("value"), group_col)
+            else:
+                value_col, v_score = matcher.resolve(m.group("value"))
+            if value_col and value_col != group_col:
+                return _aggregate_plan(value_col, group_col, method), min(g_score, v_score)
+
+    m = AGG_ALL_RE.match(query)
+    if m:
+        method = AGG_WORDS[m.group("agg")]
+        value_col, v_score = matcher.resolve(m.group("value"))
+        if value_col:
+            return _aggregate_plan(value_col, None, method), v_score
+
+    m = FILTER_RE.match(query)
+    if m:
+        col, c_score = matcher.resolve(m.group("col"))
+        if col:
+            op = _OP_MAP[m.group("op")]
+            # filter values keep the user's casing (lower() rarely changes length, guard anyway)
+            raw_value = original[m.start("value"):m.end("value")] if len(original) == len(query) else m.group("value")
+            value, val_score = _parse_value(raw_value)
+            if op in (">", "<", ">=", "<=") and isinstance(value, str):
+                return None, 0.0
+            plan = {"operation": "filter", "parameters": {"column": col, "operator": op, "value": value}}
+            return plan, min(c_score, val_score)
+
+    return None, 0.0
+
+
+def _canonical(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduces a plan to the fields that decide its result, normalized for comparison."""
+    params = plan.get("parameters") or {}
+    method = str(params.get("method") or params.get("aggfunc") or "").lower()
+    method = AGG_WORDS.get(method, method)
+
+    def norm(v):
+        if isinstance(v, list) and len(v) == 1:
+            v = v[0]
+        return _norm(v) if isinstance(v, str) else v
+
+    canonical = {
+        "operation": str(plan.get("operation", "")).lower(),
+        "column": norm(params.get("column")),
+        "group_by": norm(params.get("group_by") or params.get("by")),
+        "method": method,
+        "limit": int(params["limit"]) if str(params.get("limit", "")).isdigit() else None,
+        "operator": _OP_MAP.get(str(params.get("operator", "")).lower(), params.get("operator")),
+        "value": norm(params.get("value")),
+    }
+    if canonical["operation"] != "filter":
+        canonical.pop("operator")
+        canonical.pop("value")
+    return canonical
+
+
+def plans_agree(fast_plan: Dict[str, Any], llm_plan: Dict[str, Any]) -> bool:
+    """True when both plans would compute the same result (ignoring naming of sort keys etc.)."""
+    return _canonical(fast_plan) == _canonical(llm_plan)
+
+
+def record_shadow_comparison(user_query: str, fast_plan: Dict[str, Any], llm_plan: Dict[str, Any]) -> bool:
+    """Compares a shadow fast-path plan with the LLM plan, updating stats and logging disagreements."""
+    agreed = plans_agree(fast_plan, llm_plan)
+    record_event("shadow_compared")
+    if agreed:
+        record_event("shadow_agreed")
+    else:
+        logger.info("Fast-path shadow plan disagrees with LLM for %r: fast=%s llm=%s", user_query, fast_plan, llm_plan)
+    return agreed
+
+
+def planner_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(fast_planner_stats)
+    stats["mode"] = FAST_PLANNER_MODE
+    stats["min_confidence"] = FAST_PLANNER_MIN_CONFIDENCE
+    compared = stats["shadow_compared"]
+    stats["shadow_agreement_rate"] = round(stats["shadow_agreed"] / compared, 4) if compared else None
+    return stats
@@ -1,11 +1,24 @@
 from fastapi import UploadFile
 from pathlib import Path
+import hashlib
+import os
+import threading
+import time
 import pandas as pd
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.core import shared_store
 from app.core.logger import get_logger
+from app.core.metrics import record_cache_lookup, span
 logger = get_logger(__name__)
 
 dataset_cache: Dict[str, Dict[str, pd.DataFrame]] = {}
+# per cached file: content_hash, stat, loaded_at, last_access, hits and per-sheet profiles
+dataset_meta: Dict[str, Dict[str, Any]] = {}
+_profiles_lock = threading.Lock()
+# the cached sheets are shared between requests and queries add derived columns to them; one lock per
+# (file, sheet) guards those additions and the snapshots readers take
+_sheet_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_sheet_locks_guard = threading.Lock()
 
 async def save_upload_file(upload_file: UploadFile, destination: Path) -> None:
     """Save FastAPI UploadFile to disk."""
@@ -18,17 +31,180 @@ async def save_upload_file(upload_file: UploadFile, destination: Path) -> None:
 
 def _read_all_sheets_to_cache(filepath: str) -> Dict[str, pd.DataFrame]:
     """Read all sheets in excel."""
-    sheets = pd.read_excel(filepath, sheet_name=None, engine="openpyxl")
+    with span("workbook_parse"):
+        sheets = pd.read_excel(filepath, sheet_name=None, engine="openpyxl")
     return sheets
 
+def _header_names(row: Tuple[Any, ...]) -> List[str]:
+    # the names pd.read_excel gives: "Unnamed: i" for blank headers, ".1", ".2" suffixes for repeats
+    names, seen = [], {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_sheet_chunks(filepath: str, chunk_size: int = 100_000, sheet: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Streams one sheet (the first by default) as DataFrames of at most chunk_size rows.
+
+    Reads the workbook in openpyxl's read-only mode, so memory stays at one chunk instead of the whole
+    sheet; nothing is cached. Chunk dtypes are inferred per chunk. Blank rows are skipped."""
+    from openpyxl import load_workbook  # only needed for streaming reads; keeps it off the import path
+
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet is not None else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header_names(header)
+        batch: List[Tuple[Any, ...]] = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append(tuple(row[:len(columns)]) + (None,) * (len(columns) - len(row)))
+            if len(batch) == chunk_size:
+                yield pd.DataFrame.from_records(batch, columns=columns).infer_objects()
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=columns).infer_objects()
+    finally:
+        wb.close()
+
+
+def first_sheet_name(filepath: str) -> str:
+    """Name of the sheet pd.read_excel and iter_sheet_chunks pick by default, without reading any rows."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(filepath, read_only=True)
+    try:
+        return wb.sheetnames[0]
+    finally:
+        wb.close()
+
+
+def _load_sheets(filepath: str, content_hash: str) -> Dict[str, pd.DataFrame]:
+    """Maps the sheets from the host's shared store when another worker already parsed this content,
+    otherwise parses the workbook and publishes it there."""
+    if not shared_store.enabled():
+        return _read_all_sheets_to_cache(filepath)
+    with span("shared_store_attach"):
+        sheets = shared_store.attach(content_hash)
+    record_cache_lookup("shared_dataset", sheets is not None)
+    if sheets is not None:
+        return sheets
+    sheets = _read_all_sheets_to_cache(filepath)
+    with span("shared_store_publish"):
+        # the publishing worker switches to the mapped copy too, so no worker keeps a private one
+        if shared_store.publish(content_hash, sheets):
+            sheets = shared_store.attach(content_hash) or sheets
+    return sheets
+
+def file_content_hash(filepath: str) -> str:
+    """blake2b of the file content, read in 1 MB chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _stat_signature(filepath: str) -> Tuple[int, int]:
+    st = os.stat(filepath)
+    return st.st_size, st.st_mtime_ns
+
+def _register_dataset(filename: str, filepath: str, content_hash: Optional[str] = None) -> None:
+    content_hash = content_hash or file_content_hash(filepath)
+    previous = dataset_meta.get(filename)
+    now = time.time()
+    dataset_meta[filename] = {
+        "path": filepath,
+        "content_hash": content_hash,
+        "stat": _stat_signature(filepath),
+        "loaded_at": now,
+        "last_access": now,
+        "hits": 0,
+        # profiles describe the content, so an identical re-upload keeps them
+        "profiles": previous["profiles"] if previous and previous["content_hash"] == content_hash else {},
+    }
+
+def get_dataset(filename: str, upload_dir: str = "uploads") -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]:
+    """Returns the cached sheets of an uploaded file and its metadata, (re)loading it when the file on disk changed."""
+    filepath = os.path.join(upload_dir, filename)
+    meta = dataset_meta.get(filename)
+    stale = filename not in dataset_cache or meta is None or meta["stat"] != _stat_signature(filepath)
+    record_cache_lookup("dataset", not stale)
+    if stale:
+        load_excel_preview(filepath)
+        meta = dataset_meta[filename]
+    meta["hits"] += 1
+    meta["last_access"] = time.time()
+    return dataset_cache[filename], meta
+
+def dataset_profile(filename: str, key: str, compute: Callable[[], Any], cache: str = "profile") -> Any:
+    """Returns profile `key` of a cached file, computing it with compute() on first use.
+
+    Every kind of profile of a file lives here: the /analyze_excel profiles of a sheet ("Sheet1",
+    "Sheet1:approx") and the planner's column hints ("Sheet1:prompt"). They hang off the file's
+    content hash, so a changed file starts over and an identical re-upload keeps them. `cache` is the
+    label the lookup is counted under. Files that are not cached are profiled without being stored."""
+    meta = dataset_meta.get(filename)
+    if meta is None:
+        return compute()
+    profiles = meta["profiles"]
+    with _profiles_lock:
+        cached = profiles.get(key)
+    record_cache_lookup(cache, cached is not None)
+    if cached is not None:
+        return cached
+    # computed outside the lock; two requests racing on a cold profile both compute it, one result is kept
+    profile = compute()
+    with _profiles_lock:
+        return profiles.setdefault(key, profile)
+
+def drop_profiles(filename: str) -> int:
+    """Forgets every cached profile of a file and returns how many there were."""
+    meta = dataset_meta.get(filename)
+    if meta is None:
+        return 0
+    with _profiles_lock:
+        count = len(meta["profiles"])
+        meta["profiles"] = {}
+    return count
+
+def sheet_lock(filename: str, sheet: str) -> threading.Lock:
+    """The lock held while derived columns are added to a cached sheet."""
+    with _sheet_locks_guard:
+        return _sheet_locks.setdefault((filename, sheet), threading.Lock())
+
+def sheet_snapshot(filename: str, sheet: str, df: pd.DataFrame) -> pd.DataFrame:
+    """A stable view of a cached sheet for code reading it while other requests may add derived columns:
+    shares the column data (never modified in place), not the column list. Cheap, no data is copied."""
+    with sheet_lock(filename, sheet):
+        return df.copy(deep=False)
+
+def touch_dataset(filename: str) -> None:
+    """Records a cache hit on an already loaded file (for callers that read dataset_cache directly)."""
+    meta = dataset_meta.get(filename)
+    if meta is not None:
+        meta["hits"] += 1
+        meta["last_access"] = time.time()
+
 def load_excel_preview(filepath: str, max_rows: int = 5) -> Dict[str, Any]:
     """Reads excel, stores Dataframes in cache, returns preview dict"""
     filepath = str(filepath)
-    sheets = _read_all_sheets_to_cache(filepath)
+    content_hash = file_content_hash(filepath)
+    sheets = _load_sheets(filepath, content_hash)
     # store in cache under the filename (basename)
     filename = Path(filepath).name
     dataset_cache[filename] = sheets
-    logger.info(f"Attempting to load Excel preview: {filepath}")
+    _register_dataset(filename, filepath, content_hash)
+    logger.info("Attempting to load Excel preview: %s", filepath)
 
     preview = {}
     for sheet_name, df in sheets.items():
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_STORED_JOBS = int(os.getenv("JOB_STORE_MAX_ENTRIES", "256"))
+# jobs running at once per event loop; later submissions wait as "queued"
+MAX_CONCURRENT_JOBS = int(os.getenv("JOB_MAX_CONCURRENT", "4"))
+
+# "cancelling": cancel was requested and the body has not exited yet (it keeps its slot until it does)
+ACTIVE = ("queued", "running", "cancelling")
+FINISHED = ("done", "failed", "cancelled")
+
+# Jobs live in this process only: a status, result or cancel request must reach the worker that
+# accepted the job, so run a single worker or route /jobs/{id} requests stickily by job id.
+job_store: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_store_lock = threading.Lock()
+_cancel_events: Dict[str, threading.Event] = {}
+_tasks: Dict[str, asyncio.Task] = {}  # keeps running job tasks referenced until they finish
+_slots: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+# id of the job the current coroutine or worker thread belongs to; asyncio.to_thread copies it along
+_current_job: ContextVar[Optional[str]] = ContextVar("current_job", default=None)
+_NEVER = threading.Event()
+
+
+class JobCancelled(BaseException):
+    """Raised at a cancellation checkpoint of a cancelled job.
+
+    A BaseException, like asyncio.CancelledError, so the `except Exception` handlers around operations
+    let it through instead of turning it into an error result.
+    """
+
+
+class JobFailed(Exception):
+    """Raised by a job body to fail with a response body and status code (the job's result)."""
+
+    def __init__(self, status_code: int, content: Dict[str, Any]):
+        super().__init__(content.get("message") or content.get("detail"))
+        self.status_code = status_code
+        self.content = content
+
+
+def check_cancelled() -> None:
+    """Cancellation checkpoint: raises JobCancelled if the current job was cancelled. No-op outside a job."""
+    job_id = _current_job.get()
+    if job_id is not None and _cancel_events.get(job_id, _NEVER).is_set():
+        raise JobCancelled(job_id)
+
+
+def report_progress(stage: Optional[str] = None, done: Optional[int] = None, total: Optional[int] = None) -> None:
+    """Updates the current job's stage and/or progress counter, then checks for cancellation."""
+    job_id = _current_job.get()
+    if job_id is None:
+        return
+    with _store_lock:
+        job = job_store.get(job_id)
+        if job is not None and job["status"] == "running":
+            if stage is not None:
+                job["stage"] = stage
+                job["progress"] = None
+            if total is not None:
+                job["progress"] = {"done": done or 0, "total": total}
+    check_cancelled()
+
+
+def _public(job: Dict[str, Any], with_result: bool = False) -> Dict[str, Any]:
+    view = {k: v for k, v in job.items() if k not in ("result", "status_code")}
+    end = job.get("finished_at") or time.time()
+    view["elapsed_s"] = round(end - (job.get("started_at") or end), 3)
+    if with_result:
+        view["result"] = job.get("result")
+        view["status_code"] = job.get("status_code")
+    return view
+
+
+def _update(job_id: str, **fields) -> None:
+    with _store_lock:
+        job = job_store.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+
+def _start(job_id: str) -> None:
+    # the cancelled check and the switch to running happen under the lock, so a cancel that lands
+    # in between cannot be overwritten by "running"
+    with _store_lock:
+        if _cancel_events[job_id].is_set():
+            raise JobCancelled(job_id)
+        job_store[job_id].update(status="running", stage="starting", started_at=time.time())
+
+
+def _evict_finished() -> None:
+    # caller holds the lock; active jobs are never evicted
+    for job_id in [j for j, job in job_store.items() if job["status"] in FINISHED]:
+        if len(job_store) <= MAX_STORED_JOBS:
+            break
+        job_store.pop(job_id)
+        _cancel_events.pop(job_id, None)
+
+
+async def _run(job_id: str, body: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+    _current_job.set(job_id)
+    loop = asyncio.get_running_loop()
+    slots = _slots.setdefault(loop, asyncio.Semaphore(MAX_CONCURRENT_JOBS))
+    try:
+        async with slots:
+            _start(job_id)
+            content = await body()
+        _update(job_id, status="done", stage="done", progress=None, result=content, status_code=200)
+    except (JobCancelled, asyncio.CancelledError):
+        _update(job_id, status="cancelled", progress=None)
+        logger.info("Job %s cancelled", job_id)
+    except JobFailed as e:
+        _update(job_id, status="failed", error=str(e), result=e.content, status_code=e.status_code)
+    except Exception as e:
+        logger.exception("Job %s failed: %s", job_id, e)
+        _update(job_id, status="failed", error=str(e), result={"status": "error", "message": str(e)}, status_code=500)
+    finally:
+        _update(job_id, finished_at=time.time())
+        _tasks.pop(job_id, None)
+
+
+def submit_job(kind: str, body: Callable[[], Awaitable[Dict[str, Any]]], **info) -> str:
+    """Starts `body` as a background task on the running loop and returns the job id.
+
+    `body` returns the job's result (the response body a synchronous call would have returned) or raises
+    JobFailed. Heavy work inside it should run on worker threads (asyncio.to_thread) and call
+    report_progress / check_cancelled between chunks of work.
+    """
+    job_id = uuid.uuid4().hex
+    with _store_lock:
+        job_store[job_id] = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "progress": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "cancel_requested": False,
+            "error": None,
+            **info,
+        }
+        _cancel_events[job_id] = threading.Event()
+        _evict_finished()
+    _tasks[job_id] = asyncio.get_running_loop().create_task(_run(job_id, body))
+    logger.info("Submitted %s job %s", kind, job_id)
+    return job_id
+
+
+def get_job(job_id: str, with_result: bool = False) -> Optional[Dict[str, Any]]:
+    with _store_lock:
+        job = job_store.get(job_id)
+        return _public(job, with_result) if job is not None else None
+
+
+def list_jobs() -> List[Dict[str, Any]]:
+    with _store_lock:
+        return [_public(job) for job in reversed(job_store.values())]
+
+
+def job_counts() -> Dict[str, int]:
+    counts = {status: 0 for status in ACTIVE + FINISHED}
+    with _store_lock:
+        for job in job_store.values():
+            counts[job["status"]] += 1
+    return counts
+
+
+def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Requests cancellation and marks an active job "cancelling".
+
+    The task is not cancelled: that would free its slot while a worker thread still runs the work.
+    The body stops at its next checkpoint (stage changes, multi_step steps, export chunks), a queued job
+    as soon as it gets a slot, and the status turns to "cancelled" once the body has exited. A body
+    that finishes without reaching another checkpoint completes as "done"."""
+    with _store_lock:
+        job = job_store.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in ACTIVE:
+            job["cancel_requested"] = True
+            job["status"] = "cancelling"
+            _cancel_events[job_id].set()
+        return _public(job)
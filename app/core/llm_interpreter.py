@@ -1,12 +1,22 @@
+import copy
 import json
+from typing import Any, Dict, List
 from fastapi import HTTPException
 from app.services.gemini_service import generate_text
 import re
-from app.core.logger import get_logger
+from app.core.logger import get_logger, log_payload
+from app.core.plan_cache import plan_cache, make_plan_key, normalize_query
+from app.core import fast_planner
+from app.core.fast_planner import plan_locally, record_shadow_comparison
+from app.core.prompt_builder import build_batch_plan_prompt, build_plan_prompt
+from app.core.metrics import record_cache_lookup, span
 import os
 logger = get_logger(__name__)
 logger.info("LOADED: %s", os.path.abspath(__file__))
 
+# queries planned per batched LLM call; bounds the response size
+PLAN_BATCH_MAX_QUERIES = int(os.getenv("PLAN_BATCH_MAX_QUERIES", "25"))
+
 SYSTEM_PROMPT = """
 You are an AI data planner that converts natural-language Excel queries
 into structured JSON instructions for a pandas executor.
@@ -37,33 +47,136 @@ Rules:
 - Use field names directly from the query (e.g., 'sales', 'region').
 """
 
-def call_llm_for_plan(user_query: str, sample_columns=None):
+def _fast_path(user_query: str, sample_columns=None):
+    """(plan to use without the LLM or None, fast plan to compare against the LLM plan in shadow mode or None)."""
+    mode = fast_planner.FAST_PLANNER_MODE
+    fast_plan, confidence = plan_locally(user_query, sample_columns) if mode != "off" else (None, 0.0)
+
+    if mode == "on":
+        if fast_plan is not None and confidence >= fast_planner.FAST_PLANNER_MIN_CONFIDENCE:
+            fast_planner.record_event("fast_path_hits")
+            logger.info("Fast-path plan (confidence %.2f), skipping LLM call.", confidence)
+            fast_plan["planner"] = "fast_path"
+            return fast_plan, None
+        fast_planner.record_event("low_confidence" if fast_plan is not None else "fast_path_misses")
+    return None, (fast_plan if mode == "shadow" else None)
+
+def call_llm_for_plan(user_query: str, sample_columns=None, column_profile=None):
+    """Returns the JSON plan for a query. Common query shapes are planned locally by the fast-path
+    planner; everything else goes through the plan cache and the LLM.
+
+    column_profile (see prompt_builder.column_profile) adds type and cardinality hints to the prompt."""
+    plan, shadow_plan = _fast_path(user_query, sample_columns)
+    if plan is not None:
+        return plan
+
+    plan = _plan_with_llm(user_query, sample_columns, column_profile)
+    if shadow_plan is not None:
+        record_shadow_comparison(user_query, shadow_plan, plan)
+    return plan
+
+def _cached_plan(user_query: str, sample_columns=None):
+    cached_plan = plan_cache.get(make_plan_key(user_query, sample_columns))
+    if plan_cache.enabled:
+        record_cache_lookup("plan", cached_plan is not None)
+    return cached_plan
+
+def _extract_json(raw_response: str, pattern: str) -> str:
+    # Clean and extract JSON even if Gemini adds markdown/code
+    match = re.search(pattern, raw_response)
+    if not match:
+        raise HTTPException(status_code=500, detail="Gemini did not return valid JSON")
+    return match.group(0)
+
+def _plan_with_llm(user_query: str, sample_columns=None, column_profile=None):
     """Sends the user query to the LLM, extracts and returns the generated JSON plan for execution."""
     logger.info("Starting LLM plan generation.")
     logger.info("[LLM] Query -> %s", user_query)
-    prompt = SYSTEM_PROMPT + "\n\nUser Query: " + user_query
-    if sample_columns:
-        prompt += f"\n\nAvailable columns: {', '.join(sample_columns)}"
+    cached_plan = _cached_plan(user_query, sample_columns)
+    if cached_plan is not None:
+        logger.info("Plan cache hit, skipping LLM call.")
+        return cached_plan
+    return _request_plan(user_query, sample_columns, column_profile)
+
+def _request_plan(user_query: str, sample_columns=None, column_profile=None):
+    """One LLM round trip for one query; the plan is cached."""
+    with span("prompt_build"):
+        prompt = build_plan_prompt(SYSTEM_PROMPT, user_query, sample_columns, column_profile)
     # get plan from llm
-    raw_response = generate_text(prompt)
+    with span("llm_plan"):
+        raw_response = generate_text(prompt)
     raw_response = raw_response.replace('""','"')
-    logger.info("[LLM] Raw response (truncated 1000): %s", str(raw_response)[:1000])
+    log_payload(logger, "llm_response", "[LLM] Raw response: %s", raw_response)
 
-    # Clean and extract JSON even if Gemini adds markdown/code
-    match = re.search(r'\{[\s\S]*\}', raw_response)
-    if not match:
-        raise HTTPException(status_code=500, detail="Gemini did not return valid JSON")
-
-    json_str = match.group(0)
+    json_str = _extract_json(raw_response, r'\{[\s\S]*\}')
     try:
         plan = json.loads(json_str)
         logger.info("Parsed LLM plan successfully.")
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse LLM output as JSON:")
+        logger.error("Failed to parse LLM output as JSON:")
         raise HTTPException(status_code=500, detail=f"Invalid JSON from LLM: {e}: {json_str[:300]}")
 
+    plan_cache.put(make_plan_key(user_query, sample_columns), plan)
     return plan
 
+def _plan_batch_with_llm(user_queries: List[str], sample_columns=None, column_profile=None) -> List[Any]:
+    """One LLM call planning every query; falls back to one call per query if the array is unusable."""
+    if len(user_queries) == 1:
+        return [_request_plan(user_queries[0], sample_columns, column_profile)]
+    logger.info("Planning %d queries in one LLM call.", len(user_queries))
+    with span("prompt_build"):
+        prompt = build_batch_plan_prompt(SYSTEM_PROMPT, user_queries, sample_columns, column_profile)
+    with span("llm_plan"):
+        raw_response = generate_text(prompt)
+    log_payload(logger, "llm_response", "[LLM] Raw batch response: %s", raw_response)
+
+    try:
+        plans = json.loads(_extract_json(raw_response, r'\[[\s\S]*\]'))
+    except (HTTPException, json.JSONDecodeError):
+        plans = None
+    if not isinstance(plans, list) or len(plans) != len(user_queries) or not all(isinstance(p, dict) for p in plans):
+        logger.warning("Unusable batched plan response, planning %d queries one by one.", len(user_queries))
+        return [_plan_or_error(q, sample_columns, column_profile) for q in user_queries]
+    for user_query, plan in zip(user_queries, plans):
+        plan_cache.put(make_plan_key(user_query, sample_columns), plan)
+    return plans
+
+def _plan_or_error(user_query: str, sample_columns=None, column_profile=None):
+    try:
+        return _request_plan(user_query, sample_columns, column_profile)
+    except HTTPException as e:
+        return e
+
+def plan_queries(user_queries: List[str], sample_columns=None, column_profile=None) -> List[Any]:
+    """Plans many queries on one sheet with as few LLM calls as possible.
+
+    Each query first tries the fast path and the plan cache. The remaining distinct queries are planned
+    PLAN_BATCH_MAX_QUERIES at a time, in one LLM call per chunk. Returns one plan per query, in order;
+    a query that could not be planned gets the HTTPException it raised instead of a plan."""
+    plans: List[Any] = [None] * len(user_queries)
+    pending: Dict[str, List[int]] = {}
+    for i, user_query in enumerate(user_queries):
+        plan, _ = _fast_path(user_query, sample_columns)
+        plan = plan if plan is not None else _cached_plan(user_query, sample_columns)
+        if plan is not None:
+            plans[i] = plan
+        else:
+            # repeated queries in one batch are planned once
+            pending.setdefault(normalize_query(user_query), []).append(i)
+
+    groups = list(pending.values())
+    for start in range(0, len(groups), PLAN_BATCH_MAX_QUERIES):
+        chunk = groups[start:start + PLAN_BATCH_MAX_QUERIES]
+        queries = [user_queries[indexes[0]] for indexes in chunk]
+        try:
+            chunk_plans = _plan_batch_with_llm(queries, sample_columns, column_profile)
+        except HTTPException as e:
+            chunk_plans = [e] * len(chunk)
+        for indexes, plan in zip(chunk, chunk_plans):
+            for i in indexes:
+                plans[i] = plan if isinstance(plan, Exception) else copy.deepcopy(plan)
+    return plans
+
 def call_llm_verifier(user_query: str, plan: dict, result_sample: list) -> dict:
     """Asks the LLM to verify if the generated result matches the user query and returns a JSON verdict."""
     logger.info("Starting LLM plan verification.")
@@ -72,7 +185,8 @@ Plan: {json.dumps(plan)}
 Result sample (first rows): {json.dumps(result_sample[:5])}
 Is this result consistent with the user query? Respond only JSON like: {{ "ok": true, "note": "..." }}."""
 
-    txt = generate_text(verify_prompt, temperature=0.0, max_output_tokens=200)
+    with span("llm_verify"):
+        txt = generate_text(verify_prompt, temperature=0.0, max_output_tokens=200)
 
     # Handle ```json code fences
     if txt.startswith("```"):
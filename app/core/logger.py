@@ -1,15 +1,171 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from app.core.request_context import current_request_id
+
+# json (one object per line, for log shippers) or text (for a terminal)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").strip().lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# verbose payloads (plans, raw LLM output) are truncated and logged at most this often per kind
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+LOG_PAYLOAD_PER_SECOND = float(os.getenv("LOG_PAYLOAD_PER_SECOND", "1"))
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s"
+
+_setup_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_configured_roots = set()
+log_stats = {"dropped": 0, "payloads_suppressed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(outcome: str) -> None:
+    with _stats_lock:
+        log_stats[outcome] += 1
+
+
+def _has_containers(args: Any) -> bool:
+    if isinstance(args, dict):
+        return True
+    return isinstance(args, tuple) and any(isinstance(a, (dict, list, set, tuple)) for a in args)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, request_id, message and exc_info when present."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """Hands records to the writer thread without formatting them or blocking.
+
+    The message is formatted on the writer thread, so a filtered or dropped record costs almost
+    nothing. Records whose args hold containers are the exception: the caller may mutate them (plans
+    are, nested dicts included) right after logging, so their message is rendered here. When the queue
+    is full the record is dropped and counted instead of blocking.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = current_request_id() or "-"
+        if _has_containers(record.args):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # tracebacks reference live frames; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _count("dropped")
+
+
+def _writer_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "text":
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt="%Y-%m-%d %H:%M:%S"))
+    else:
+        handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _ensure_listener() -> QueueHandler:
+    global _listener
+    if _listener is None:
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _listener = QueueListener(log_queue, _writer_handler(), respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    return AsyncQueueHandler(_listener.queue)
+
+
+def shutdown_logging() -> None:
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            _configured_roots.clear()
+
 
 def get_logger(name: str):
-    """For Logging purposes."""
+    """For Logging purposes. Module loggers propagate to their top-level package logger, which owns
+    the queue handler; the writer thread does the formatting and I/O."""
     logger = logging.getLogger(name)
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        logger.setLevel(logging.INFO)
+    root_name = name.split(".")[0]
+    with _setup_lock:
+        if root_name not in _configured_roots:
+            root = logging.getLogger(root_name)
+            for handler in list(root.handlers):
+                if isinstance(handler, AsyncQueueHandler):
+                    root.removeHandler(handler)
+            root.addHandler(_ensure_listener())
+            root.setLevel(LOG_LEVEL)
+            _configured_roots.add(root_name)
     return logger
+
+
+class _PayloadLimiter:
+    """Lets one payload per kind through every 1 / LOG_PAYLOAD_PER_SECOND seconds."""
+
+    def __init__(self):
+        self._last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, kind: str) -> bool:
+        if LOG_PAYLOAD_PER_SECOND <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(kind, -1e9) >= 1.0 / LOG_PAYLOAD_PER_SECOND:
+                self._last[kind] = now
+                return True
+        return False
+
+
+_payload_limiter = _PayloadLimiter()
+
+
+def log_payload(logger: logging.Logger, kind: str, message: str, payload: Any) -> None:
+    """Logs a large payload (plan, raw LLM output) without paying for it on every request.
+
+    At DEBUG every payload is logged in full. Otherwise one payload per kind per rate window is logged,
+    truncated to LOG_PAYLOAD_MAX_CHARS; the rest are only counted. `message` gets one %s for the payload.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, payload, stacklevel=2)
+        return
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    if not _payload_limiter.allow(kind):
+        _count("payloads_suppressed")
+        return
+    text = str(payload)
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = f"{text[:LOG_PAYLOAD_MAX_CHARS]}... ({len(text)} chars)"
+    logger.info(message, text, stacklevel=2)
@@ -0,0 +1,117 @@
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from app.core.executor_helpers import derivation_cache
+from app.core.file_manager import dataset_cache, dataset_meta, drop_profiles
+from app.core.result_store import delete_result, result_store, stored_file_bytes
+from app.core.schema import schema_fingerprint
+from app.core.shared_store import store_stats
+
+
+def _json_size(obj: Any) -> int:
+    """Serialized size in bytes; a fair proxy for small nested dicts such as profiles."""
+    return len(json.dumps(obj, default=str))
+
+
+def frame_memory(df: pd.DataFrame, deep: bool = True) -> Dict[str, Any]:
+    """Memory of a frame: total, index, and per-dtype totals. deep=True counts the Python strings behind
+    object columns, which is accurate but walks every value."""
+    usage = df.memory_usage(index=True, deep=deep)
+    by_dtype: Dict[str, Dict[str, int]] = {}
+    for col, dtype in df.dtypes.items():
+        entry = by_dtype.setdefault(str(dtype), {"columns": 0, "bytes": 0})
+        entry["columns"] += 1
+        entry["bytes"] += int(usage[col])
+    return {
+        "rows": len(df),
+        "columns": df.shape[1],
+        "bytes": int(usage.sum()),
+        "index_bytes": int(usage["Index"]),
+        "dtypes": dict(sorted(by_dtype.items(), key=lambda kv: -kv[1]["bytes"])),
+    }
+
+
+def _sheet_report(df: pd.DataFrame, deep: bool) -> Dict[str, Any]:
+    report = frame_memory(df, deep)
+    derived = [c for c in df.attrs.get("derived_columns") or [] if c in df.columns]
+    usage = df[derived].memory_usage(index=False, deep=deep) if derived else None
+    report["derived_columns"] = {"names": derived, "bytes": int(usage.sum()) if usage is not None else 0}
+    fingerprint = schema_fingerprint([c for c in df.columns if c not in derived])
+    report["derivations_cached"] = sum(1 for fp, _ in list(derivation_cache) if fp == fingerprint)
+    return report
+
+
+def result_report(result_id: str, entry: Dict[str, Any], deep: bool = True) -> Dict[str, Any]:
+    df = entry.get("result_df")
+    return {
+        "result_id": result_id,
+        "source": entry.get("source"),
+        "created_at": entry.get("created_at"),
+        "bytes": int(df.memory_usage(index=True, deep=deep).sum()) if df is not None else 0,
+        "rows": len(df) if df is not None else 0,
+        "exports": sorted(entry.get("exports") or {}),
+    }
+
+
+def dataset_report(filename: str, deep: bool = True) -> Optional[Dict[str, Any]]:
+    """Everything held in memory for one uploaded file: its sheets, profiles (analysis and prompt
+    hints) and stored results."""
+    sheets = dataset_cache.get(filename)
+    if sheets is None:
+        return None
+    meta = dataset_meta.get(filename, {})
+    sheet_reports = {str(name): _sheet_report(df, deep) for name, df in sheets.items()}
+    profiles = {key: _json_size(p) for key, p in list((meta.get("profiles") or {}).items())}
+    results = [result_report(rid, e, deep) for rid, e in list(result_store.items()) if e.get("source") == filename]
+    total = sum(s["bytes"] for s in sheet_reports.values()) + sum(profiles.values()) + sum(r["bytes"] for r in results)
+    now = time.time()
+    return {
+        "filename": filename,
+        "bytes": total,
+        "content_hash": meta.get("content_hash"),
+        "loaded_at": meta.get("loaded_at"),
+        "last_access": meta.get("last_access"),
+        "idle_seconds": round(now - meta["last_access"], 1) if meta.get("last_access") else None,
+        "hits": meta.get("hits", 0),
+        "sheets": sheet_reports,
+        "profiles": profiles,
+        "results": results,
+    }
+
+
+def cache_report(deep: bool = True) -> Dict[str, Any]:
+    """Per-dataset memory report, largest first, plus results whose source file is no longer cached."""
+    datasets = [dataset_report(name, deep) for name in list(dataset_cache)]
+    datasets = sorted((d for d in datasets if d is not None), key=lambda d: -d["bytes"])
+    orphans = [result_report(rid, e, deep) for rid, e in list(result_store.items()) if e.get("source") not in dataset_cache]
+    return {
+        "deep": deep,
+        "total_bytes": sum(d["bytes"] for d in datasets) + sum(r["bytes"] for r in orphans),
+        "datasets": datasets,
+        "other_results": orphans,
+        "result_file_bytes": stored_file_bytes(),
+        "prompt_profiles_cached": sum(1 for meta in list(dataset_meta.values()) for key in list(meta["profiles"]) if key.endswith(":prompt")),
+        "derivations_cached": len(derivation_cache),
+        "shared_store": store_stats(),
+    }
+
+
+def evict_dataset(filename: str, include_results: bool = False) -> Dict[str, Any]:
+    """Drops a file's sheets, metadata and profiles (and optionally its stored results).
+    The next request for the file reloads it from disk."""
+    sheets = dataset_cache.pop(filename, None)
+    dataset_meta.pop(filename, None)
+    removed: List[str] = []
+    if include_results:
+        removed = [rid for rid, e in list(result_store.items()) if e.get("source") == filename]
+        for rid in removed:
+            delete_result(rid)
+    return {"filename": filename, "evicted": sheets is not None, "sheets": sorted(map(str, sheets or {})), "results_removed": removed}
+
+
+def evict_profiles(filename: str) -> int:
+    """Drops the cached profiles of a file (/analyze_excel and prompt hints), keeping its sheets."""
+    return drop_profiles(filename)
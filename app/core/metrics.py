@@ -0,0 +1,232 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds, from a cached fast-path query up to a slow LLM call plus a large export.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(values: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in values.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Prometheus-style histogram with one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Labels, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']!r}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+    def snapshot(self) -> Dict[Labels, Dict[str, Any]]:
+        with self._lock:
+            return {k: {"sum": v["sum"], "count": v["count"]} for k, v in self._series.items()}
+
+
+class Counter:
+    """Monotonic counter with one series per label set."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels(labels), 0)
+
+    def snapshot(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(self._values.items())]
+        return lines
+
+
+stage_seconds = Histogram("excel_ai_stage_seconds", "Time spent in each stage of request processing.")
+http_request_seconds = Histogram("excel_ai_http_request_seconds", "HTTP request latency by route and status.")
+cache_lookups = Counter("excel_ai_cache_lookups_total", "Cache lookups by cache and result (hit or miss).")
+
+_http_in_flight = 0
+_http_lock = threading.Lock()
+
+# stage -> seconds of the current request; None outside a request that asked for a breakdown
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+_active_stages: ContextVar[Tuple[str, ...]] = ContextVar("active_stages", default=())
+
+
+def start_request_timings() -> Dict[str, float]:
+    """Starts collecting the stage breakdown of the current request; returns the dict that spans fill.
+
+    Worker threads started with asyncio.to_thread copy the context, so they add to the same dict."""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    stage_seconds.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Times the enclosed block as `stage`. Nested spans of the same stage (e.g. multi_step sub-steps)
+    are only counted once, by the outermost one."""
+    active = _active_stages.get()
+    if stage in active:
+        yield
+        return
+    token = _active_stages.set(active + (stage,))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+        _active_stages.reset(token)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    cache_lookups.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def cache_hit_ratios() -> Dict[str, float]:
+    totals: Dict[str, Dict[str, float]] = {}
+    for labels, value in cache_lookups.snapshot().items():
+        values = dict(labels)
+        totals.setdefault(values["cache"], {})[values["result"]] = value
+    return {cache: round(c.get("hit", 0) / sum(c.values()), 4) for cache, c in sorted(totals.items()) if sum(c.values())}
+
+
+@contextmanager
+def track_http_request(method: str) -> Iterator[Dict[str, Any]]:
+    """Counts the request as in flight; the caller fills `route` and `status` before the block ends."""
+    global _http_in_flight
+    info = {"route": "unmatched", "status": 500}
+    with _http_lock:
+        _http_in_flight += 1
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        with _http_lock:
+            _http_in_flight -= 1
+        http_request_seconds.observe(time.perf_counter() - start, method=method, route=info["route"], status=info["status"])
+
+
+def format_timings(timings: Dict[str, float]) -> Dict[str, float]:
+    """Stage breakdown in milliseconds, for responses."""
+    return {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """`Server-Timing` header value (shown by browser dev tools) for a stage breakdown."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def _family(name: str, help_text: str, samples: List[Tuple[Dict[str, Any], float]], kind: str = "gauge") -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_format_labels(_labels(labels))} {_format_value(value)}" for labels, value in samples]
+    return lines
+
+
+def _app_state_metrics() -> List[str]:
+    """Point-in-time values read from the caches, coalescers and LLM client when /metrics is scraped."""
+    # imported here: these modules record spans themselves, so importing them at module level would be circular
+    from app.core.file_manager import dataset_cache
+    from app.core.jobs import job_counts
+    from app.core.logger import log_stats
+    from app.core.plan_cache import plan_cache
+    from app.core.result_store import result_store
+    from app.core.singleflight import singleflight_stats
+    from app.services.llm_client import current_llm_client
+
+    plan = plan_cache.stats()
+    flights = singleflight_stats()
+    lines = _family("excel_ai_http_requests_in_flight", "HTTP requests currently being served.", [({}, _http_in_flight)])
+    lines += _family("excel_ai_cache_hit_ratio", "Hit rate of each cache since start.",
+                    [({"cache": cache}, ratio) for cache, ratio in cache_hit_ratios().items()])
+    lines += _family("excel_ai_cache_entries", "Entries currently held per cache.", [
+        ({"cache": "dataset"}, len(dataset_cache)),
+        ({"cache": "plan"}, plan["size"]),
+        ({"cache": "result"}, len(result_store)),
+    ])
+    lines += _family("excel_ai_singleflight_in_flight", "Coalesced calls currently running.",
+                    [({"flight": name}, s["in_flight"]) for name, s in flights.items()])
+    lines += _family("excel_ai_singleflight_calls_total", "Calls that executed or joined an in-flight call.",
+                    [({"flight": name, "outcome": outcome}, s[outcome]) for name, s in flights.items()
+                     for outcome in ("executions", "shared")], kind="counter")
+    lines += _family("excel_ai_log_records_total", "Log records dropped on a full queue or suppressed by payload sampling.",
+                     [({"outcome": k}, v) for k, v in log_stats.items()], kind="counter")
+    lines += _family("excel_ai_jobs", "Background jobs held in the job store, by status.",
+                     [({"status": status}, count) for status, count in job_counts().items()])
+    client = current_llm_client()
+    if client is not None:
+        lines += _family("excel_ai_llm_calls_total", "LLM client call outcomes.",
+                        [({"outcome": k}, v) for k, v in client.stats.items()], kind="counter")
+    return lines
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in (stage_seconds, http_request_seconds, cache_lookups):
+        lines += metric.render()
+    lines += _app_state_metrics()
+    return "\n".join(lines) + "\n"
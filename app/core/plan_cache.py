@@ -0,0 +1,155 @@
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.logger import get_logger
+from app.core.schema import schema_fingerprint
+
+logger = get_logger(__name__)
+
+
+def normalize_query(user_query: str) -> str:
+    """Collapses whitespace and drops trailing punctuation.
+
+    Case is kept: queries quote values ("Region = East" vs "Region = east") and a plan for one must not
+    answer the other."""
+    text = re.sub(r"\s+", " ", (user_query or "").strip())
+    return text.rstrip(" .?!;")
+
+
+def make_plan_key(user_query: str, sample_columns: Optional[Iterable] = None) -> str:
+    """Cache key for a plan: normalized query text plus a fingerprint of the available columns."""
+    return f"{schema_fingerprint(sample_columns or [])}|{normalize_query(user_query)}"
+
+
+class PlanCache:
+    """LRU + TTL cache of LLM plans with optional JSON persistence and hit/miss counters.
+
+    Persisted entries are rewritten after `save_every` new plans or `save_interval` seconds, whichever
+    comes first, and on flush() (called at shutdown), rather than on every put."""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600, persist_path: Optional[str] = None,
+                 save_every: int = 20, save_interval: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._saved_at = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if persist_path:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry["stored_at"] > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns a copy of the cached plan for key, or None on a miss/expired entry."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, time.time()):
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry["plan"])
+
+    def put(self, key: str, plan: Dict[str, Any]) -> None:
+        """Stores a copy of plan under key, evicting the least recently used entries."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = {"plan": copy.deepcopy(plan), "stored_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._unsaved += 1
+            if self._unsaved >= self.save_every or time.time() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def flush(self) -> None:
+        """Writes plans not persisted yet."""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persist_path": self.persist_path,
+        }
+
+    def _load(self) -> None:
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except Exception as e:
+            logger.warning("Could not load plan cache from %s: %s", self.persist_path, e)
+            return
+        now = time.time()
+        for key, entry in stored.items():
+            if not self._expired(entry, now):
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info("Loaded %d cached plans from %s", len(self._entries), self.persist_path)
+
+    def _save(self) -> None:
+        # caller holds the lock
+        if not self.persist_path:
+            return
+        # per process: uvicorn workers sharing PLAN_CACHE_PATH must not write into each other's temp file
+        tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.persist_path)
+            self._unsaved = 0
+            self._saved_at = time.time()
+        except Exception as e:
+            logger.warning("Could not persist plan cache to %s: %s", self.persist_path, e)
+
+
+plan_cache = PlanCache(
+    max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.getenv("PLAN_CACHE_TTL_SECONDS", "3600")),
+    persist_path=os.getenv("PLAN_CACHE_PATH") or None,
+    save_every=int(os.getenv("PLAN_CACHE_SAVE_EVERY", "20")),
+    save_interval=float(os.getenv("PLAN_CACHE_SAVE_INTERVAL_SECONDS", "30")),
+)
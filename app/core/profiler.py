@@ -0,0 +1,98 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# object columns with fewer distinct values than this share of the rows are categorical
+CATEGORICAL_RATIO = 0.05
+
+
+def _float_or_none(value) -> Any:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(value) else value
+
+
+def _non_numeric_columns(df: pd.DataFrame) -> List[Any]:
+    return [c for c in df.columns
+            if not pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_datetime64_any_dtype(df[c])]
+
+
+def infer_column_types(df: pd.DataFrame, nunique: pd.Series = None) -> Dict[str, str]:
+    """numeric / date / categorical / text per column, from dtypes plus one nunique over the other columns."""
+    types = {}
+    if nunique is None:
+        other = _non_numeric_columns(df)
+        nunique = df[other].nunique() if other else pd.Series(dtype="int64")
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            types[col] = "numeric"
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            types[col] = "date"
+        elif nunique[col] < len(df) * CATEGORICAL_RATIO:
+            types[col] = "categorical"
+        else:
+            types[col] = "text"
+    return types
+
+
+def profile_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    """Column types, summary statistics and unstructured text columns of a sheet, in the /analyze_excel format.
+
+    Every statistic is computed once per column with vectorized reductions: one isna pass for all columns,
+    one nunique over object columns, one min/mean/max aggregate over the numeric and date blocks.
+    """
+    missing = df.isna().sum()
+    other = _non_numeric_columns(df)
+    nunique = df[other].nunique() if other else pd.Series(dtype="int64")
+    inferred_types = infer_column_types(df, nunique)
+
+    by_type: Dict[str, List[Any]] = {"numeric": [], "date": [], "categorical": [], "text": []}
+    for col, kind in inferred_types.items():
+        by_type[kind].append(col)
+
+    summary: Dict[Any, Dict[str, Any]] = {}
+    if by_type["numeric"]:
+        stats = df[by_type["numeric"]].agg(["mean", "min", "max"])
+        for col in by_type["numeric"]:
+            summary[col] = {
+                "mean": _float_or_none(stats.at["mean", col]),
+                "min": _float_or_none(stats.at["min", col]),
+                "max": _float_or_none(stats.at["max", col]),
+                "missing": int(missing[col]),
+            }
+    for col in by_type["categorical"]:
+        mode = df[col].mode()
+        summary[col] = {
+            "unique_values": int(nunique[col]),
+            "top_value": str(mode.iloc[0]) if not mode.empty else None,
+            "missing": int(missing[col]),
+        }
+    if by_type["date"]:
+        dates = df[by_type["date"]].agg(["min", "max"])
+        for col in by_type["date"]:
+            all_missing = missing[col] == len(df)
+            summary[col] = {
+                "min_date": str(dates.at["min", col].date()) if not all_missing else None,
+                "max_date": str(dates.at["max", col].date()) if not all_missing else None,
+                "missing": int(missing[col]),
+            }
+    for col in by_type["text"]:
+        lengths = df[col].dropna().astype(str).str.len()
+        avg_len = lengths.mean() if not lengths.empty else None
+        summary[col] = {
+            "avg_text_length": round(float(avg_len), 2) if avg_len else None,
+            "missing": int(missing[col]),
+        }
+
+    return {
+        "inferred_column_types": inferred_types,
+        # keep the column order of the sheet
+        "summary": {col: summary[col] for col in df.columns},
+        "unstructured_columns": by_type["text"],
+    }
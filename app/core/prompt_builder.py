@@ -0,0 +1,152 @@
+import difflib
+import math
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+PROFILE_SAMPLE_ROWS = 2000
+MAX_CATEGORY_EXAMPLES = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return math.ceil(len(text) / 4)
+
+
+def _column_kind(series: pd.Series) -> Dict[str, Any]:
+    if pd.api.types.is_bool_dtype(series):
+        return {"type": "bool"}
+    if pd.api.types.is_integer_dtype(series):
+        return {"type": "int"}
+    if pd.api.types.is_numeric_dtype(series):
+        return {"type": "float"}
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return {"type": "date"}
+    values = series.dropna()
+    distinct = values.nunique()
+    if distinct and distinct <= 20 and distinct <= max(len(values) * 0.5, 1):
+        top = values.astype(str).value_counts().index[:MAX_CATEGORY_EXAMPLES].tolist()
+        return {"type": "cat", "distinct": int(distinct), "examples": [t[:20] for t in top]}
+    return {"type": "text"}
+
+
+def column_profile(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Per-column type and cardinality hints, computed on a head sample.
+
+    Not cached here: routes answering on an uploaded file keep it with the file's other profiles
+    (file_manager.dataset_profile), keyed by its content hash."""
+    sample = df.head(PROFILE_SAMPLE_ROWS)
+    return {str(c): _column_kind(sample[c]) for c in sample.columns if isinstance(sample[c], pd.Series)}
+
+
+def describe_column(name: str, info: Optional[Dict[str, Any]]) -> str:
+    """Compact one-token-ish description like `Region:cat(East|West|North)` or `Sales:float`."""
+    if not info:
+        return name
+    if info.get("type") == "cat" and info.get("examples"):
+        return f"{name}:cat({'|'.join(info['examples'])})"
+    return f"{name}:{info.get('type')}"
+
+
+def _words(text: str) -> List[str]:
+    # split camelCase and snake_case so "UnitPrice" matches "unit price"
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    return [w for w in re.split(r"[^a-z0-9]+", text.lower()) if w]
+
+
+def relevance(query: str, column: str) -> float:
+    """Lexical similarity between the query and a column name (0 = unrelated)."""
+    q_words = _words(query)
+    c_words = _words(column)
+    if not q_words or not c_words:
+        return 0.0
+    score = 0.0
+    for cw in c_words:
+        best = max(difflib.SequenceMatcher(None, cw, qw).ratio() for qw in q_words)
+        if best >= 0.75:
+            score += best
+    joined = "".join(c_words)
+    if joined in "".join(q_words):
+        score += 1.0
+    return score / len(c_words)
+
+
+def select_columns(query: str, columns: Iterable, profile: Optional[Dict[str, Dict[str, Any]]],
+                   fixed_text: str, budget: int) -> List[str]:
+    """Describes as many columns as fit into the token budget, most query-relevant first."""
+    columns = [str(c) for c in columns]
+    ranked = sorted(enumerate(columns), key=lambda ic: (-relevance(query, ic[1]), ic[0]))
+    remaining = budget - estimate_tokens(fixed_text)
+    chosen = []
+    for _, col in ranked:
+        cost = estimate_tokens(describe_column(col, (profile or {}).get(col))) + 1
+        if cost > remaining:
+            break
+        chosen.append(col)
+        remaining -= cost
+    # keep the sheet's column order in the prompt, only the selection is relevance-driven
+    order = {c: i for i, c in enumerate(columns)}
+    return sorted(chosen, key=order.get)
+
+
+def _schema_block(header: str, columns: List[str], chosen: List[str], profile) -> str:
+    if not chosen:
+        return ""
+    block = f"\n\n{header}: " + ", ".join(describe_column(c, (profile or {}).get(c)) for c in chosen)
+    omitted = len(columns) - len(chosen)
+    if omitted > 0:
+        block += f" (+{omitted} less relevant columns omitted)"
+    return block
+
+
+def build_plan_prompt(system_prompt: str, user_query: str, columns: Optional[Iterable] = None,
+                      profile: Optional[Dict[str, Dict[str, Any]]] = None, budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Planner prompt with a compact typed schema pruned to the token budget."""
+    prompt = system_prompt + "\n\nUser Query: " + user_query
+    columns = [str(c) for c in (columns or [])]
+    chosen = select_columns(user_query, columns, profile, prompt + "\n\nAvailable columns (name:type): ", budget)
+    return prompt + _schema_block("Available columns (name:type)", columns, chosen, profile)
+
+
+def build_batch_plan_prompt(system_prompt: str, user_queries: List[str], columns: Optional[Iterable] = None,
+                            profile: Optional[Dict[str, Dict[str, Any]]] = None, budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Planner prompt for several queries on one sheet; the schema is shared and chosen for all of them."""
+    numbered = "\n".join(f"{i}. {q}" for i, q in enumerate(user_queries, start=1))
+    prompt = (system_prompt
+              + "\n\nPlan each of the numbered queries below independently. Instead of a single object, return a JSON"
+              + f" array with exactly {len(user_queries)} plan objects, one per query, in the same order."
+              + "\n\nUser Queries:\n" + numbered)
+    columns = [str(c) for c in (columns or [])]
+    chosen = select_columns(" ".join(user_queries), columns, profile, prompt + "\n\nAvailable columns (name:type): ", budget)
+    return prompt + _schema_block("Available columns (name:type)", columns, chosen, profile)
+
+
+def build_derivation_prompt(missing: List[str], columns: Iterable, profile: Optional[Dict[str, Dict[str, Any]]] = None,
+                            budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Prompt asking for expressions for all missing columns at once, listing the most relevant typed columns."""
+    missing_display = ", ".join(f'"{c}"' for c in missing)
+    instructions = f"""
+        The user requested an operation that refers to these missing columns: {missing_display}.
+        For each missing column propose a single short Python expression (no surrounding code, no markdown fences)
+        that computes it using only the existing columns above. Use pandas Series variable names
+        that are the column names with spaces replaced by underscores.
+
+        If a missing column cannot be derived from the available columns, use the single token:
+        CANNOT_DERIVE
+
+        Examples of valid expressions:
+        Quantity * UnitPrice * (1 - Discount)
+        UnitPrice * Quantity
+        Profit - Cost
+
+        Return only a JSON object mapping every missing column name to its expression or CANNOT_DERIVE,
+        for example: {{"Revenue": "Quantity * UnitPrice", "Margin": "CANNOT_DERIVE"}}
+        """
+    columns = [str(c) for c in columns]
+    header = "\n        You are given a pandas DataFrame with these columns (name:type)"
+    chosen = select_columns(" ".join(missing), columns, profile, header + instructions, budget)
+    schema = _schema_block(header.strip("\n"), columns, chosen, profile).strip("\n")
+    return "\n        " + schema.strip() + "\n" + instructions
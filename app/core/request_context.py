@@ -0,0 +1,28 @@
+import re
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+# id of the request being served; worker threads started with asyncio.to_thread inherit it
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_VALID_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Uses the caller's X-Request-ID when it is a safe token, otherwise generates one."""
+    if incoming and _VALID_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def set_request_id(request_id: Optional[str]):
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token) -> None:
+    _request_id.reset(token)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
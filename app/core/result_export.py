@@ -0,0 +1,99 @@
+import os
+import tempfile
+from typing import Any, Callable, Dict, Tuple
+
+import pandas as pd
+from app.core.logger import get_logger
+from app.core.result_store import register_export
+
+logger = get_logger(__name__)
+
+RESULTS_DIR = "results"
+
+
+class ExportError(Exception):
+    """Raised when a stored result cannot be written in the requested format (e.g. mixed-type columns for Arrow)."""
+
+
+class ResultEvicted(Exception):
+    """Raised when the result was evicted from the store while its export was being written."""
+
+
+def _write_xlsx(df: pd.DataFrame, path: str) -> None:
+    df.to_excel(path, index=False, engine="openpyxl")
+
+
+def _write_parquet(df: pd.DataFrame, path: str) -> None:
+    df.to_parquet(path, index=False)
+
+
+def _write_feather(df: pd.DataFrame, path: str) -> None:
+    df.reset_index(drop=True).to_feather(path)
+
+
+def _write_csv_gz(df: pd.DataFrame, path: str) -> None:
+    # level 1 keeps most of the size win while staying close to plain CSV speed
+    df.to_csv(path, index=False, compression={"method": "gzip", "compresslevel": 1})
+
+
+# format -> (file extension, media type, writer, needs pyarrow)
+EXPORT_FORMATS: Dict[str, Tuple[str, str, Callable[[pd.DataFrame, str], None], bool]] = {
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", _write_xlsx, False),
+    "parquet": (".parquet", "application/vnd.apache.parquet", _write_parquet, True),
+    "feather": (".arrow", "application/vnd.apache.arrow.file", _write_feather, True),
+    "csv.gz": (".csv.gz", "application/gzip", _write_csv_gz, False),
+}
+
+FORMAT_ALIASES = {"arrow": "feather", "ipc": "feather", "csv": "csv.gz", "gzip": "csv.gz", "excel": "xlsx"}
+
+
+def normalize_format(fmt: str) -> str:
+    """Maps a user supplied format name to a key of EXPORT_FORMATS. Raises ValueError if unknown."""
+    key = (fmt or "").strip().lower()
+    key = FORMAT_ALIASES.get(key, key)
+    if key not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported download format: {fmt}. Use one of {', '.join(EXPORT_FORMATS)}")
+    return key
+
+
+def export_result(result_id: str, entry: Dict[str, Any], fmt: str) -> Tuple[str, str]:
+    """Writes a stored result in the requested format once and returns (path, media_type).
+
+    Raises ValueError for an unknown or unavailable format, ExportError when the writer fails and
+    ResultEvicted when the result left the store meanwhile (the file is removed again)."""
+    fmt = normalize_format(fmt)
+    ext, media_type, writer, needs_arrow = EXPORT_FORMATS[fmt]
+
+    cached = entry["exports"].get(fmt)
+    if cached and os.path.exists(cached):
+        return cached, media_type
+
+    if needs_arrow:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError(f"{fmt} export requires pyarrow to be installed")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"result_{result_id}{ext}")
+    # unique per call so concurrent downloads of one result never share a temp file; keep the real
+    # extension on it, the xlsx writer validates it
+    fd, tmp_path = tempfile.mkstemp(prefix=f".tmp_result_{result_id}_", suffix=ext, dir=RESULTS_DIR)
+    os.close(fd)
+    try:
+        df = entry["result_df"].rename(columns=str)
+        writer(df, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning("Exporting result %s as %s failed: %s", result_id, fmt, e)
+        raise ExportError(f"Result cannot be written as {fmt}: {e}") from e
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if not register_export(result_id, entry, fmt, path):
+        # evicted during the write: its cleanup ran without this file, so nothing else would delete it
+        os.remove(path)
+        raise ResultEvicted(result_id)
+    logger.info("Exported result %s as %s to %s", result_id, fmt, path)
+    return path, media_type
@@ -0,0 +1,205 @@
+import base64
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Keeps the full result frames of recent queries so they can be paged/streamed later, least recently
+# used first out once their combined size passes the budget.
+MAX_STORED_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Files written for stored results (query workbooks, downloads) under results/. Small results rarely
+# reach the memory budget, so the files have their own: past it the oldest results lose their files
+# (downloads are regenerated on request). Files older than RESULT_FILES_STALE_SECONDS are leftovers of
+# earlier runs and are swept at startup.
+MAX_RESULT_FILE_BYTES = int(os.getenv("RESULT_FILES_MAX_BYTES", str(1024 * 1024 * 1024)))
+RESULT_FILES_STALE_SECONDS = float(os.getenv("RESULT_FILES_STALE_SECONDS", str(24 * 3600)))
+RESULTS_DIR = "results"
+
+result_store: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_store_lock = threading.Lock()
+_stored_bytes = 0
+_file_bytes = 0
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+def _size_on_disk(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _trim_files() -> List[Dict[str, str]]:
+    # caller holds the lock; takes the files of the least recently used results (never the newest one)
+    # until the budget holds again and returns them for deletion outside the lock
+    global _file_bytes
+    dropped = []
+    for entry in list(result_store.values())[:-1]:
+        if _file_bytes <= MAX_RESULT_FILE_BYTES:
+            break
+        if entry["exports"]:
+            dropped.append(entry["exports"])
+            entry["exports"] = {}
+            _file_bytes -= entry["file_bytes"]
+            entry["file_bytes"] = 0
+    return dropped
+
+
+def store_result(df: pd.DataFrame, plan: Optional[Dict[str, Any]] = None, source: Optional[str] = None,
+                 exports: Optional[Dict[str, str]] = None) -> str:
+    """Stores a result dataframe and returns the id used to retrieve it.
+
+    `exports` are files already written for the result (e.g. the executor's workbook); like the
+    download files generated later they are deleted when the result is evicted or when the files pass
+    RESULT_FILES_MAX_BYTES. The most recent result is always kept, even when it alone is over
+    RESULT_STORE_MAX_BYTES."""
+    global _stored_bytes, _file_bytes
+    result_id = uuid.uuid4().hex
+    size = _frame_bytes(df)
+    exports = dict(exports or {})
+    file_bytes = sum(_size_on_disk(path) for path in exports.values())
+    evicted = []
+    with _store_lock:
+        result_store[result_id] = {
+            "result_df": df,
+            "plan": plan,
+            "source": source,
+            "created_at": time.time(),
+            "bytes": size,
+            "exports": exports,
+            "file_bytes": file_bytes,
+        }
+        _stored_bytes += size
+        _file_bytes += file_bytes
+        while _stored_bytes > MAX_STORED_BYTES and len(result_store) > 1:
+            old_id, old = result_store.popitem(last=False)
+            _stored_bytes -= old["bytes"]
+            _file_bytes -= old["file_bytes"]
+            evicted.append((old_id, old))
+        dropped = _trim_files()
+    for old_id, old in evicted:
+        _remove_exports(old["exports"])
+        logger.info("Evicted stored result %s (%d bytes)", old_id, old["bytes"])
+    for files in dropped:
+        _remove_exports(files)
+    if dropped:
+        logger.info("Removed the files of %d older results (over RESULT_FILES_MAX_BYTES)", len(dropped))
+    return result_id
+
+
+def stored_bytes() -> int:
+    """Combined in-memory size of the stored result frames."""
+    return _stored_bytes
+
+
+def stored_file_bytes() -> int:
+    """Combined size on disk of the files written for stored results."""
+    return _file_bytes
+
+
+def _remove_exports(exports: Dict[str, str]) -> None:
+    """Deletes the workbook and download files of an evicted result."""
+    for path in exports.values():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def sweep_result_files(max_age: Optional[float] = None) -> int:
+    """Deletes result files under results/ older than max_age seconds (RESULT_FILES_STALE_SECONDS by
+    default): at startup nothing references them any more. Returns how many were removed."""
+    max_age = RESULT_FILES_STALE_SECONDS if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        names = os.listdir(RESULTS_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        if not name.startswith(("result_", ".tmp_result_")):
+            continue
+        path = os.path.join(RESULTS_DIR, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    if removed:
+        logger.info("Swept %d stale result files from %s", removed, RESULTS_DIR)
+    return removed
+
+
+def delete_result(result_id: str) -> bool:
+    """Drops a stored result and its download files. Returns False when it was not stored."""
+    global _stored_bytes, _file_bytes
+    with _store_lock:
+        entry = result_store.pop(result_id, None)
+        if entry is None:
+            return False
+        _stored_bytes -= entry["bytes"]
+        _file_bytes -= entry["file_bytes"]
+    _remove_exports(entry["exports"])
+    return True
+
+
+def register_export(result_id: str, entry: Dict[str, Any], fmt: str, path: str) -> bool:
+    """Records a download file written for a stored result, so eviction deletes it with the result.
+
+    Returns False when the result was evicted while the file was written; the caller owns the file then."""
+    global _file_bytes
+    size = _size_on_disk(path)
+    with _store_lock:
+        if result_store.get(result_id) is not entry:
+            return False
+        entry["exports"][fmt] = path
+        entry["file_bytes"] += size
+        _file_bytes += size
+        dropped = _trim_files()
+    for files in dropped:
+        _remove_exports(files)
+    return True
+
+
+def get_result(result_id: str) -> Optional[Dict[str, Any]]:
+    """Returns the stored entry for result_id (marking it recently used), or None."""
+    with _store_lock:
+        entry = result_store.get(result_id)
+        if entry is not None:
+            result_store.move_to_end(result_id)
+        return entry
+
+
+def encode_cursor(result_id: str, offset: int) -> str:
+    """Builds the opaque cursor pointing at row `offset` of a stored result."""
+    raw = f"{result_id}:{offset}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(result_id: str, cursor: Optional[str]) -> int:
+    """Returns the row offset encoded in cursor. Raises ValueError for foreign or malformed cursors."""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        owner, offset = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii").rsplit(":", 1)
+        offset = int(offset)
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if owner != result_id or offset < 0:
+        raise ValueError("Cursor does not belong to this result")
+    return offset
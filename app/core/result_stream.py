@@ -0,0 +1,75 @@
+import io
+from typing import Iterator
+
+import pandas as pd
+from app.core.serialization import dumps, frame_to_records
+
+DEFAULT_CHUNK_SIZE = 10000
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yields consecutive row slices of df without copying the whole frame."""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def iter_ndjson(df: pd.DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encodes df as newline-delimited JSON, one chunk of rows at a time."""
+    for chunk in iter_frame_chunks(df, chunk_size):
+        records = frame_to_records(chunk, max_rows=None)
+        yield b"".join(dumps(r) + b"\n" for r in records)
+
+
+def iter_csv(df: pd.DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encodes df as CSV, writing the header only with the first chunk."""
+    if df.empty:
+        yield df.to_csv(index=False).encode("utf-8")
+        return
+    for i, chunk in enumerate(iter_frame_chunks(df, chunk_size)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode("utf-8")
+
+
+def iter_arrow(df: pd.DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encodes df as an Arrow IPC stream, one record batch per chunk.
+
+    The schema is inferred up front (not lazily on the first chunk), so a frame Arrow cannot encode,
+    e.g. an object column mixing numbers and strings, raises here before any response is started."""
+    import pyarrow as pa
+
+    df = df.rename(columns=str)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    return _arrow_batches(df, schema, chunk_size)
+
+
+def _arrow_batches(df: pd.DataFrame, schema, chunk_size: int) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield drain()
+    for chunk in iter_frame_chunks(df, chunk_size):
+        batch = pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+        writer.write_batch(batch)
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+STREAM_ENCODERS = {
+    "ndjson": iter_ndjson,
+    "csv": iter_csv,
+    "arrow": iter_arrow,
+}
@@ -0,0 +1,162 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Profiling is opt-in twice: the deployment enables it, then a request asks for it with an
+# `X-Profile: 1` header or `?profile=true`.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").strip().lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+MAX_STORED_PROFILES = int(os.getenv("PROFILE_STORE_MAX_ENTRIES", "50"))
+MAX_STACK_DEPTH = 128
+
+profile_store: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_store_lock = threading.Lock()
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Root-first `a;b;c` stack, the collapsed format read by flamegraph.pl, speedscope and inferno."""
+    labels: List[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class RequestProfile:
+    """Samples the stacks of the threads attached to one request at a fixed interval.
+
+    The sampler thread only runs while at least one thread is attached, so the cost is limited to the
+    profiled sections (executor and serialization), not the whole process.
+    """
+
+    def __init__(self, request_id: str, path: str = "", interval_ms: Optional[float] = None):
+        # stored profiles are keyed by this server-generated id; the request id comes from the client
+        # and may be reused or guessed, so it is only recorded alongside
+        self.profile_id = uuid.uuid4().hex
+        self.request_id = request_id
+        self.path = path
+        self.interval = (interval_ms or PROFILE_SAMPLE_INTERVAL_MS) / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = time.time()
+        self._threads: Dict[int, int] = {}  # thread id -> nesting depth
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._sampler: Optional[threading.Thread] = None
+        self._closed = False
+
+    @contextmanager
+    def attach(self) -> Iterator[None]:
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] = self._threads.get(tid, 0) + 1
+            if self._sampler is None and not self._closed:
+                self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.profile_id[:8]}", daemon=True)
+                self._sampler.start()
+            self._wake.notify()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[tid] -= 1
+                if not self._threads[tid]:
+                    del self._threads[tid]
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                while not self._threads and not self._closed:
+                    self._wake.wait()
+                if self._closed:
+                    return
+                targets = [tid for tid in self._threads if tid != me]
+            frames = sys._current_frames()
+            stacks = [collapse_stack(frames[tid]) for tid in targets if tid in frames]
+            with self._lock:
+                self.stacks.update(stacks)
+                self.samples += len(stacks)
+            time.sleep(self.interval)
+
+    def close(self) -> Dict[str, Any]:
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+        return {
+            "profile_id": self.profile_id,
+            "request_id": self.request_id,
+            "path": self.path,
+            "created_at": self.started_at,
+            "duration_s": round(time.time() - self.started_at, 4),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": dict(self.stacks.most_common()),
+        }
+
+
+def profiling_requested(header: Optional[str], param: Optional[str]) -> bool:
+    if not PROFILING_ENABLED:
+        return False
+    return any((v or "").strip().lower() in ("1", "true", "yes") for v in (header, param))
+
+
+def start_profile(request_id: str, path: str = ""):
+    """Makes a RequestProfile active for the current context (and the worker threads it starts)."""
+    profile = RequestProfile(request_id, path)
+    return profile, _active_profile.set(profile)
+
+
+def finish_profile(profile: RequestProfile, token) -> Dict[str, Any]:
+    _active_profile.reset(token)
+    result = profile.close()
+    with _store_lock:
+        profile_store[profile.profile_id] = result
+        while len(profile_store) > MAX_STORED_PROFILES:
+            profile_store.popitem(last=False)
+    logger.info("Stored profile %s of request %s: %d samples over %.3fs",
+                profile.profile_id, profile.request_id, result["samples"], result["duration_s"])
+    return result
+
+
+@contextmanager
+def profiled_section() -> Iterator[None]:
+    """Samples the current thread for the duration of the block if the request is being profiled."""
+    profile = _active_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.attach():
+        yield
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    with _store_lock:
+        return profile_store.get(profile_id)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    with _store_lock:
+        return [{k: v for k, v in p.items() if k != "stacks"} for p in reversed(profile_store.values())]
+
+
+def to_collapsed(profile: Dict[str, Any]) -> str:
+    """One `stack count` line per distinct stack."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
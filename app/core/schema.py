@@ -0,0 +1,26 @@
+import hashlib
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+
+def schema_fingerprint(columns: Iterable, dtypes: Optional[Iterable] = None) -> str:
+    """Returns a short stable hash of column names (and dtypes when given)."""
+    parts = [str(c) for c in columns]
+    if dtypes is not None:
+        parts = [f"{c}:{d}" for c, d in zip(parts, dtypes)]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Fingerprint of a dataframe's schema (column names and dtypes, not the data)."""
+    return schema_fingerprint(df.columns, df.dtypes.astype(str))
+
+
+def base_columns(df: pd.DataFrame) -> List[str]:
+    """Column names of a cached sheet without the columns derived into it by earlier queries.
+
+    Plans and plan-cache keys are built from these, so a sheet gets the same plans before and after
+    a derivation has added columns to it."""
+    derived = set(df.attrs.get("derived_columns") or [])
+    return [str(c) for c in df.columns if c not in derived]
@@ -0,0 +1,111 @@
+import datetime
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def _column_values(series: pd.Series) -> List[Any]:
+    """Converts a whole column into JSON-safe python values in one pass."""
+    mask = series.isna().to_numpy()
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dt.strftime(DATE_FORMAT).tolist()
+    elif pd.api.types.is_timedelta64_dtype(series):
+        values = series.astype(str).tolist()
+    elif series.dtype == object:
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred in ("datetime", "datetime64", "date"):
+            values = pd.to_datetime(series, errors="coerce").dt.strftime(DATE_FORMAT).tolist()
+        elif inferred in ("string", "empty"):
+            values = series.tolist()
+        else:
+            # mixed object column: only here do we touch individual cells
+            values = [to_json_safe(v) for v in series.tolist()]
+    else:
+        # numeric, bool and categorical columns: tolist() yields python scalars
+        values = series.tolist()
+
+    if mask.any():
+        for i in np.flatnonzero(mask):
+            values[i] = None
+    return values
+
+
+def frame_to_records(df: pd.DataFrame, max_rows: Optional[int] = 20) -> List[Dict[str, Any]]:
+    """Converts a dataframe to a list of JSON-serializable records column by column."""
+    if df is None:
+        return []
+    head = df if max_rows is None else df.head(max_rows)
+    if head.empty:
+        return []
+    columns = list(head.columns)
+    values = [_column_values(head.iloc[:, i]) for i in range(len(columns))]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def to_json_safe(obj: Any) -> Any:
+    """Convert objects into JSON-serializable types."""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        if isinstance(obj, float) and obj != obj:
+            return None
+        return obj
+    if isinstance(obj, dict):
+        return {k: to_json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_json_safe(i) for i in obj]
+    if isinstance(obj, pd.DataFrame):
+        return frame_to_records(obj, max_rows=10)
+    if isinstance(obj, pd.Series):
+        return dict(zip(obj.index.tolist(), _column_values(obj)))
+    if isinstance(obj, np.generic):
+        return to_json_safe(obj.item())
+    if isinstance(obj, np.ndarray):
+        return to_json_safe(obj.tolist())
+    if isinstance(obj, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    return str(obj)
+
+
+def _default(obj: Any) -> Any:
+    """Fallback hook for values the encoder does not know natively."""
+    if isinstance(obj, pd.DataFrame):
+        return frame_to_records(obj, max_rows=10)
+    if isinstance(obj, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Encodes content to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with orjson and understands numpy/pandas values."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Host-wide dataset store shared by the uvicorn workers. Empty disables it (each worker parses and
+# holds its own copy, as before).
+SHARED_DATASET_DIR = os.getenv("SHARED_DATASET_DIR", "").strip()
+SHARED_DATASET_MAX_BYTES = int(os.getenv("SHARED_DATASET_MAX_BYTES", str(1 << 30)))
+
+CATALOG_NAME = "catalog.sqlite"
+
+_init_lock = threading.Lock()
+_initialized_dirs = set()
+
+
+def enabled() -> bool:
+    return bool(SHARED_DATASET_DIR)
+
+
+def _connect(directory: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(os.path.join(directory, CATALOG_NAME), timeout=10, isolation_level=None)
+    with _init_lock:
+        if directory not in _initialized_dirs:
+            # WAL lets workers read the catalog while another one publishes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS datasets ("
+                " content_hash TEXT PRIMARY KEY, sheets TEXT NOT NULL, rows INTEGER NOT NULL,"
+                " bytes INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            _initialized_dirs.add(directory)
+    return conn
+
+
+def _store_dir(directory: Optional[str]) -> Optional[str]:
+    directory = directory or SHARED_DATASET_DIR
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _shareable(sheets: Dict[str, pd.DataFrame]) -> Optional[str]:
+    """Reason the sheets cannot round-trip through Arrow unchanged, or None when they can."""
+    for name, df in sheets.items():
+        if not isinstance(name, str):
+            return f"sheet name {name!r} is not a string"
+        if not all(isinstance(c, str) for c in df.columns) or df.columns.has_duplicates:
+            return f"sheet {name!r} has non-string or duplicate column names"
+    return None
+
+
+def _restore_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """Arrow nulls come back as None in object columns; read_excel gives NaN, so behave the same."""
+    for col in df.columns[df.dtypes == object]:
+        missing = df[col].isna()
+        if missing.any():
+            df[col] = df[col].where(~missing, np.nan)
+    return df
+
+
+def publish(content_hash: str, sheets: Dict[str, pd.DataFrame], directory: Optional[str] = None) -> bool:
+    """Writes the sheets as uncompressed Arrow IPC files under <dir>/<content_hash>/ and records them
+    in the catalog. Returns False when the store is off or the sheets cannot be stored as-is (mixed-type
+    object columns, non-string headers); the caller keeps its local copy either way.
+
+    Files are written to a private directory and renamed into place, so a worker never maps a partial
+    file. When two workers publish the same content at once the first rename wins.
+    """
+    import pyarrow as pa
+
+    directory = _store_dir(directory)
+    if directory is None:
+        return False
+    reason = _shareable(sheets)
+    if reason is not None:
+        logger.info("Not sharing dataset %s: %s", content_hash, reason)
+        return False
+
+    target = os.path.join(directory, content_hash)
+    staging = os.path.join(directory, f".{content_hash}.{os.getpid()}.{uuid.uuid4().hex[:8]}")
+    os.makedirs(staging)
+    try:
+        total_bytes = rows = 0
+        for position, df in enumerate(sheets.values()):
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            path = os.path.join(staging, f"{position}.arrow")
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            total_bytes += os.path.getsize(path)
+            rows += len(df)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            if not os.path.isdir(target):
+                raise
+            shutil.rmtree(staging, ignore_errors=True)  # another worker published it first
+    except (pa.ArrowException, ValueError, TypeError) as e:
+        shutil.rmtree(staging, ignore_errors=True)
+        logger.info("Not sharing dataset %s: %s", content_hash, e)
+        return False
+
+    now = time.time()
+    with closing(_connect(directory)) as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO datasets (content_hash, sheets, rows, bytes, created_at, last_access)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (content_hash, json.dumps(list(sheets)), rows, total_bytes, now, now),
+        )
+    logger.info("Published dataset %s to the shared store (%d sheets, %d bytes)", content_hash, len(sheets), total_bytes)
+    prune(directory=directory)
+    return True
+
+
+def attach(content_hash: str, directory: Optional[str] = None) -> Optional[Dict[str, pd.DataFrame]]:
+    """Maps a published dataset into this process, or returns None when it is not in the store.
+
+    Numeric, boolean and datetime columns without nulls are views on the page cache, shared by every
+    worker on the host and read-only (in-place writes raise instead of corrupting other workers' data).
+    String columns are materialized as Python objects, as pandas needs them.
+    """
+    import pyarrow as pa
+
+    directory = _store_dir(directory)
+    if directory is None:
+        return None
+    with closing(_connect(directory)) as conn:
+        row = conn.execute("SELECT sheets FROM datasets WHERE content_hash = ?", (content_hash,)).fetchone()
+        if row is None:
+            return None
+        try:
+            sheets = {}
+            for position, name in enumerate(json.loads(row[0])):
+                source = pa.memory_map(os.path.join(directory, content_hash, f"{position}.arrow"))
+                sheets[name] = _restore_missing(pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True))
+        except (OSError, pa.ArrowException) as e:
+            # files pruned or damaged under the catalog: forget the entry so the next load republishes
+            logger.warning("Dropping unreadable shared dataset %s: %s", content_hash, e)
+            conn.execute("DELETE FROM datasets WHERE content_hash = ?", (content_hash,))
+            shutil.rmtree(os.path.join(directory, content_hash), ignore_errors=True)
+            return None
+        conn.execute("UPDATE datasets SET last_access = ?, hits = hits + 1 WHERE content_hash = ?", (time.time(), content_hash))
+    return sheets
+
+
+def prune(max_bytes: Optional[int] = None, directory: Optional[str] = None) -> List[str]:
+    """Removes least recently attached datasets until the store fits in max_bytes. Workers that already
+    mapped a removed file keep reading it; the kernel frees it when the last mapping goes."""
+    directory = _store_dir(directory)
+    limit = SHARED_DATASET_MAX_BYTES if max_bytes is None else max_bytes
+    if directory is None or limit <= 0:
+        return []
+    removed: List[str] = []
+    with closing(_connect(directory)) as conn:
+        entries = conn.execute("SELECT content_hash, bytes FROM datasets ORDER BY last_access").fetchall()
+        total = sum(size for _, size in entries)
+        for content_hash, size in entries:
+            if total <= limit:
+                break
+            conn.execute("DELETE FROM datasets WHERE content_hash = ?", (content_hash,))
+            shutil.rmtree(os.path.join(directory, content_hash), ignore_errors=True)
+            total -= size
+            removed.append(content_hash)
+    if removed:
+        logger.info("Pruned %d datasets from the shared store", len(removed))
+    return removed
+
+
+def store_stats(directory: Optional[str] = None) -> Dict[str, Any]:
+    directory = directory or SHARED_DATASET_DIR
+    if not directory or not os.path.isdir(directory):
+        return {"enabled": bool(directory), "datasets": 0, "bytes": 0}
+    with closing(_connect(directory)) as conn:
+        count, total, hits = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0), COALESCE(SUM(hits), 0) FROM datasets").fetchone()
+    return {"enabled": True, "directory": directory, "datasets": count, "bytes": total,
+            "max_bytes": SHARED_DATASET_MAX_BYTES, "attaches": hits}
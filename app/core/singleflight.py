@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs `func` on a worker thread; callers arriving while it is in flight
+    await the same task and get the same result (or exception). The result object is shared, so callers
+    must copy it before mutating. A caller that is cancelled does not cancel the shared work.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        self.stats = {"executions": 0, "shared": 0}
+
+    async def run(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        # futures are bound to a loop, so flights are only shared between callers on the same loop
+        slot = (asyncio.get_running_loop(), key)
+        task = self._inflight.get(slot)
+        if task is not None:
+            self.stats["shared"] += 1
+            logger.info("[%s] joining in-flight call for %s", self.name, key)
+        else:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+            self._inflight[slot] = task
+            task.add_done_callback(lambda _: self._inflight.pop(slot, None))
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
+dataset_flight = SingleFlight("dataset_load")
+plan_flight = SingleFlight("plan")
+execution_flight = SingleFlight("execution")
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    return {
+        f.name: {**f.stats, "in_flight": f.in_flight()}
+        for f in (dataset_flight, plan_flight, execution_flight)
+    }
@@ -0,0 +1,331 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from app.core.profiler import CATEGORICAL_RATIO
+
+# All sketches are updated chunk by chunk and can be merged, so a profile can be built while a file is
+# streamed in (file_manager.iter_sheet_chunks; one sketch per chunk or worker, merged at the end).
+# Memory is bounded by the sketch parameters and the chunk size, not by the number of rows.
+
+
+def _hash_values(values: pd.Series) -> np.ndarray:
+    # duplicates do not change a distinct-count sketch, so only the chunk's unique values are hashed
+    return pd.util.hash_array(pd.unique(values.to_numpy()), categorize=False).astype(np.uint64)
+
+
+class HyperLogLog:
+    """Distinct count estimate with 2**p registers (p=12: 4 KB, ~1.6% standard error)."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values: pd.Series) -> None:
+        values = values.dropna()
+        if values.empty:
+            return
+        h = _hash_values(values)
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        # rank = position of the leftmost 1-bit in the remaining 64-p bits
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, 64 - self.p + 1, 64 - self.p - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class HeavyHitters:
+    """Misra-Gries summary keeping at most k counters; any value above n/(k+1) occurrences is retained."""
+
+    def __init__(self, k: int = 64):
+        self.k = k
+        self.counts: Dict[Any, int] = {}
+
+    def _absorb(self, counts: Dict[Any, int]) -> None:
+        for value, c in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + int(c)
+        if len(self.counts) > self.k:
+            cut = sorted(self.counts.values(), reverse=True)[self.k]
+            self.counts = {v: c - cut for v, c in self.counts.items() if c > cut}
+
+    def update(self, values: pd.Series) -> None:
+        codes, uniques = pd.factorize(values.to_numpy(), use_na_sentinel=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # only the chunk's top k+1 values can survive the merge
+        if len(counts) > self.k + 1:
+            top = np.argpartition(counts, -(self.k + 1))[-(self.k + 1):]
+        else:
+            top = np.arange(len(counts))
+        self._absorb(dict(zip(uniques[top].tolist(), counts[top].tolist())))
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        self._absorb(other.counts)
+        return self
+
+    def top(self, n: int = 1) -> List[Any]:
+        return [v for v, _ in sorted(self.counts.items(), key=lambda vc: -vc[1])[:n]]
+
+
+class QuantileSketch:
+    """KLL-style compactor stack: level i holds items of weight 2**i, each level keeps at most k items."""
+
+    def __init__(self, k: int = 256, seed: int = 0):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.n = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[: len(items) - len(keep)]
+                promoted = pairs[int(self._rng.integers(2))::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for i, items in enumerate(other.levels):
+            self.levels[i] = np.concatenate([self.levels[i], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.n:
+            return None
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(l), 2 ** i, dtype=np.float64) for i, l in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        pos = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(items[order][min(pos, len(items) - 1)])
+
+
+class ReservoirSample:
+    """Uniform sample of at most `size` values (bottom-k of random keys, so two samples merge exactly)."""
+
+    def __init__(self, size: int = 1024, seed: int = 0):
+        self.size = size
+        self.keys = np.empty(0)
+        self.values = np.empty(0, dtype=object)
+        self._rng = np.random.default_rng(seed)
+
+    def _keep(self, keys: np.ndarray, values: np.ndarray) -> None:
+        if len(keys) > self.size:
+            idx = np.argpartition(keys, self.size)[: self.size]
+            keys, values = keys[idx], values[idx]
+        self.keys, self.values = keys, values
+
+    def update(self, values: pd.Series) -> None:
+        values = values.dropna().to_numpy(dtype=object)
+        if len(values):
+            self._keep(np.concatenate([self.keys, self._rng.random(len(values))]),
+                       np.concatenate([self.values, values]))
+
+    def merge(self, other: "ReservoirSample") -> "ReservoirSample":
+        self._keep(np.concatenate([self.keys, other.keys]), np.concatenate([self.values, other.values]))
+        return self
+
+
+class ColumnSketch:
+    """Approximate statistics of one column; which sketches are kept depends on the column kind."""
+
+    def __init__(self, kind: str, seed: int = 0):
+        self.kind = kind  # numeric, date or other
+        self.count = 0
+        self.missing = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.quantiles = QuantileSketch(seed=seed) if kind == "numeric" else None
+        self.distinct = HyperLogLog() if kind == "other" else None
+        self.heavy = HeavyHitters() if kind == "other" else None
+        self.sample = ReservoirSample(seed=seed) if kind == "other" else None
+
+    def _coerce(self, series: pd.Series) -> pd.Series:
+        # streamed chunks infer their dtypes separately; values a later chunk cannot give this kind
+        # (text in a numeric column) count as missing, as they would after pd.to_numeric(errors="coerce")
+        if self.kind == "numeric" and not pd.api.types.is_numeric_dtype(series):
+            return pd.to_numeric(series, errors="coerce")
+        if self.kind == "date" and not pd.api.types.is_datetime64_any_dtype(series):
+            return pd.to_datetime(series, errors="coerce")
+        return series
+
+    def update(self, series: pd.Series) -> None:
+        series = self._coerce(series)
+        n_missing = int(series.isna().sum())
+        self.count += len(series)
+        self.missing += n_missing
+        if self.kind == "other":
+            self.distinct.update(series)
+            self.heavy.update(series)
+            self.sample.update(series)
+            return
+        if n_missing == len(series):
+            return
+        present = series[series.notna()]
+        values = present.astype("int64") if self.kind == "date" else present
+        lo, hi = values.min(), values.max()
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        if self.kind == "numeric":
+            self.total += float(series.sum())
+            self.quantiles.update(series.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        self.count += other.count
+        self.missing += other.missing
+        self.total += other.total
+        for attr, pick in (("min", min), ("max", max)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, theirs if mine is None else (mine if theirs is None else pick(mine, theirs)))
+        for attr in ("quantiles", "distinct", "heavy", "sample"):
+            if getattr(self, attr) is not None:
+                getattr(self, attr).merge(getattr(other, attr))
+        return self
+
+
+def _column_kind(series: pd.Series) -> str:
+    # an all-empty column reads as float64 in pd.read_excel, so it is numeric here too
+    if pd.api.types.is_numeric_dtype(series) or series.isna().all():
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "date"
+    return "other"
+
+
+class FrameSketch:
+    """Mergeable sketch of a whole sheet; update() it with consecutive chunks, merge() partial sketches."""
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self.columns: Dict[Any, ColumnSketch] = {}
+
+    def _rekind(self, col: Any, kind: str) -> ColumnSketch:
+        # a column whose values so far were all missing takes the kind of the first chunk that has some
+        old = self.columns.get(col)
+        sketch = ColumnSketch(kind, seed=self.seed)
+        if old is not None:
+            sketch.count, sketch.missing = old.count, old.missing
+        self.columns[col] = sketch
+        return sketch
+
+    def update(self, chunk: pd.DataFrame) -> "FrameSketch":
+        for col in chunk.columns:
+            sketch = self.columns.get(col)
+            if sketch is None:
+                sketch = self._rekind(col, _column_kind(chunk[col]))
+            elif sketch.count == sketch.missing and chunk[col].notna().any():
+                kind = _column_kind(chunk[col])
+                if kind != sketch.kind:
+                    sketch = self._rekind(col, kind)
+            sketch.update(chunk[col])
+        return self
+
+    def merge(self, other: "FrameSketch") -> "FrameSketch":
+        for col, sketch in other.columns.items():
+            mine = self.columns.get(col)
+            if mine is None:
+                self.columns[col] = sketch
+            elif mine.kind != sketch.kind and mine.count == mine.missing:
+                sketch.count += mine.count
+                sketch.missing += mine.missing
+                self.columns[col] = sketch
+            elif mine.kind != sketch.kind and sketch.count == sketch.missing:
+                mine.count += sketch.count
+                mine.missing += sketch.missing
+            else:
+                mine.merge(sketch)
+        return self
+
+    def to_profile(self) -> Dict[str, Any]:
+        """Profile in the /analyze_excel format; distinct counts, top values, quantiles and text lengths are estimates."""
+        types, summary = {}, {}
+        for col, s in self.columns.items():
+            if s.kind == "numeric":
+                types[col] = "numeric"
+                present = s.count - s.missing
+                summary[col] = {
+                    "mean": s.total / present if present else None,
+                    "min": float(s.min) if s.min is not None else None,
+                    "max": float(s.max) if s.max is not None else None,
+                    "missing": s.missing,
+                    "approx_quantiles": {f"p{int(q * 100)}": s.quantiles.quantile(q) for q in (0.25, 0.5, 0.75, 0.95)},
+                }
+            elif s.kind == "date":
+                types[col] = "date"
+                summary[col] = {
+                    "min_date": str(pd.Timestamp(s.min).date()) if s.min is not None else None,
+                    "max_date": str(pd.Timestamp(s.max).date()) if s.max is not None else None,
+                    "missing": s.missing,
+                }
+            elif s.distinct.count() < s.count * CATEGORICAL_RATIO:
+                types[col] = "categorical"
+                top = s.heavy.top(1)
+                summary[col] = {
+                    "unique_values": s.distinct.count(),
+                    "top_value": str(top[0]) if top else None,
+                    "missing": s.missing,
+                }
+            else:
+                types[col] = "text"
+                lengths = [len(str(v)) for v in s.sample.values]
+                avg_len = float(np.mean(lengths)) if lengths else None
+                summary[col] = {
+                    "avg_text_length": round(avg_len, 2) if avg_len else None,
+                    "missing": s.missing,
+                }
+        return {
+            "inferred_column_types": types,
+            "summary": summary,
+            "unstructured_columns": [c for c, t in types.items() if t == "text"],
+            "approximate": True,
+        }
+
+
+def sketch_chunks(chunks: Iterable[pd.DataFrame], seed: int = 0) -> FrameSketch:
+    """Builds a FrameSketch from consecutive chunks of a sheet as they are read; no chunk is kept."""
+    sketch = FrameSketch(seed=seed)
+    for chunk in chunks:
+        sketch.update(chunk)
+    return sketch
+
+
+def sketch_frame(df: pd.DataFrame, chunk_size: int = 100_000, seed: int = 0) -> FrameSketch:
+    """Builds a FrameSketch over an already loaded frame chunk by chunk."""
+    return sketch_chunks((df.iloc[start:start + chunk_size] for start in range(0, max(len(df), 1), chunk_size)), seed=seed)
+
+
+def approximate_profile(df: pd.DataFrame, chunk_size: int = 100_000) -> Dict[str, Any]:
+    return sketch_frame(df, chunk_size=chunk_size).to_profile()
@@ -0,0 +1,185 @@
+import json
+import operator
+import os
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import pandas as pd
+from app.core.llm_interpreter import call_llm_verifier
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# plan parameters that name input columns
+COLUMN_PARAMS = ("column", "column1", "column2", "group_by", "by", "index", "values", "columns", "id_vars", "value_vars", "left_on")
+NUMERIC_METHODS = {"sum", "mean", "avg", "average", "median", "std", "var"}
+FILTER_COMPARISONS = {"==": operator.eq, "!=": operator.ne, ">": operator.gt, "<": operator.lt, ">=": operator.ge, "<=": operator.le}
+
+# hosts verification results may be POSTed to; empty (the default) disables callbacks
+CALLBACK_HOSTS = {h.strip().lower() for h in os.getenv("VERIFICATION_CALLBACK_HOSTS", "").split(",") if h.strip()}
+
+MAX_STORED_VERIFICATIONS = int(os.getenv("VERIFICATION_STORE_MAX_ENTRIES", "256"))
+verification_store: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_store_lock = threading.Lock()
+
+
+def _as_list(value) -> List[Any]:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _check(name: str, ok: bool, detail: str) -> Dict[str, Any]:
+    return {"name": name, "ok": bool(ok), "detail": detail}
+
+
+def _filter_condition_check(params: Dict[str, Any], result_df: Optional[pd.DataFrame]) -> Optional[Dict[str, Any]]:
+    """Re-evaluates the filter condition on the kept rows; None when it cannot be evaluated."""
+    col, op, val = params.get("column"), str(params.get("operator", "==")), params.get("value")
+    if result_df is None or col not in result_df.columns:
+        return None
+    try:
+        if op.lower() in ("contains", "like"):
+            held = result_df[col].astype(str).str.contains(str(val), case=False, na=False)
+        elif op in FILTER_COMPARISONS:
+            held = FILTER_COMPARISONS[op](result_df[col], val)
+        else:
+            return None
+    except Exception:
+        return None
+    violating = int((~held.astype(bool)).sum())
+    return _check("filter_condition_holds", violating == 0,
+                  f"{violating} of {len(result_df)} kept rows do not satisfy {col} {op} {val}")
+
+
+def verify_locally(plan: Dict[str, Any], source_df: pd.DataFrame, result_df: Optional[pd.DataFrame]) -> Dict[str, Any]:
+    """Cheap deterministic checks of an executed plan: referenced columns exist, the result is non-empty,
+    its row count is plausible for the operation, filtered rows satisfy the filter and aggregations
+    ran on numeric columns."""
+    op = str(plan.get("operation", "")).strip().lower()
+    params = plan.get("parameters") or {}
+    checks = []
+
+    if op != "multi_step":
+        referenced = [c for key in COLUMN_PARAMS for c in _as_list(params.get(key)) if isinstance(c, str)]
+        available = set(source_df.columns) | (set(result_df.columns) if result_df is not None else set())
+        missing = [c for c in referenced if c not in available]
+        checks.append(_check("columns_exist", not missing,
+                             f"missing columns: {missing}" if missing else f"{len(referenced)} referenced columns found"))
+
+    n_source = len(source_df)
+    n_result = len(result_df) if result_df is not None else 0
+    checks.append(_check("result_non_empty", n_result > 0, f"{n_result} result rows"))
+
+    limit = params.get("limit")
+    if op == "aggregate":
+        max_rows = n_source if params.get("group_by") or params.get("by") else 1
+        if limit is not None and str(limit).isdigit():
+            max_rows = min(max_rows, int(limit))
+        checks.append(_check("row_count_plausible", n_result <= max(max_rows, 1),
+                             f"{n_result} rows for at most {max_rows} groups"))
+    elif op == "filter":
+        condition = _filter_condition_check(params, result_df)
+        if condition is not None:
+            checks.append(condition)
+    elif op == "unpivot" and params.get("value_vars"):
+        expected = n_source * len(_as_list(params.get("value_vars")))
+        checks.append(_check("row_count_plausible", n_result == expected, f"{n_result} rows, expected {expected}"))
+    elif op in ("math", "date_ops", "text_analysis"):
+        checks.append(_check("row_count_plausible", n_result == n_source, f"{n_result} rows, source has {n_source}"))
+
+    method = str(params.get("method") or params.get("aggfunc") or "").lower()
+    if op in ("aggregate", "pivot") and method in NUMERIC_METHODS:
+        targets = _as_list(params.get("column") if op == "aggregate" else params.get("values"))
+        non_numeric = [c for c in targets if c in source_df.columns and not pd.api.types.is_numeric_dtype(source_df[c])]
+        checks.append(_check("aggregation_types", not non_numeric,
+                             f"{method} over non-numeric columns: {non_numeric}" if non_numeric else f"{method} over numeric columns"))
+
+    failed = [c["name"] for c in checks if not c["ok"]]
+    return {
+        "ok": not failed,
+        "note": f"local checks failed: {', '.join(failed)}" if failed else "local checks passed",
+        "checks": checks,
+    }
+
+
+def create_verification(user_query: str, plan: Dict[str, Any]) -> str:
+    """Registers a pending LLM verification and returns its id."""
+    verification_id = uuid.uuid4().hex
+    with _store_lock:
+        verification_store[verification_id] = {
+            "status": "pending",
+            "query": user_query,
+            "operation": plan.get("operation"),
+            "verdict": None,
+            "created_at": time.time(),
+        }
+        while len(verification_store) > MAX_STORED_VERIFICATIONS:
+            verification_store.popitem(last=False)
+    return verification_id
+
+
+def get_verification(verification_id: str) -> Optional[Dict[str, Any]]:
+    with _store_lock:
+        entry = verification_store.get(verification_id)
+        return dict(entry) if entry is not None else None
+
+
+def run_llm_verification(verification_id: str, user_query: str, plan: Dict[str, Any], result_preview: list,
+                         callback_url: Optional[str] = None) -> None:
+    """Runs the LLM verifier off the request path, stores the verdict and optionally POSTs it to callback_url."""
+    try:
+        verdict = call_llm_verifier(user_query, plan, result_preview)
+        update = {"status": "done", "verdict": verdict}
+    except Exception as e:
+        logger.error("Background LLM verification %s failed: %s", verification_id, e)
+        update = {"status": "failed", "verdict": None, "error": str(e)}
+    update["completed_at"] = time.time()
+
+    with _store_lock:
+        entry = verification_store.get(verification_id)
+        if entry is not None:
+            entry.update(update)
+
+    if callback_url:
+        _post_callback(callback_url, {"verification_id": verification_id, **update})
+
+
+def callback_allowed(url: str) -> bool:
+    """True if url is an http(s) URL on one of the VERIFICATION_CALLBACK_HOSTS.
+
+    The server makes the request, so an arbitrary URL would let callers reach internal services."""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    return parts.scheme in ("http", "https") and (parts.hostname or "").lower() in CALLBACK_HOSTS
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # a redirect could point the POST at a host outside the allowlist
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def _post_callback(url: str, payload: Dict[str, Any]) -> None:
+    if not callback_allowed(url):
+        logger.warning("Ignoring verification callback to a host outside VERIFICATION_CALLBACK_HOSTS: %s", url)
+        return
+    request = urllib.request.Request(
+        url, data=json.dumps(payload, default=str).encode("utf-8"),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    try:
+        with _callback_opener.open(request, timeout=5) as resp:
+            logger.info("Verification callback to %s returned %s", url, resp.status)
+    except Exception as e:
+        logger.warning("Verification callback to %s failed: %s", url, e)
@@ -0,0 +1,231 @@
+"""Vectorized synthetic data generator for scale testing.
+
+Columns are built with numpy: categorical values are sampled from fixed lists, person and place
+names from pools that Faker fills once up front, and dates come from integer day offsets. Output
+is written in chunks, so memory stays flat at 10M rows.
+
+    python -m app.data_generation.scalable_generator --schema sales --rows 1000000 --format parquet \
+        --out synthetic_data/sales_1m.parquet --seed 42
+
+A custom schema is a JSON object that maps column names to specs, passed with --schema-file:
+    {"OrderID": {"type": "id", "prefix": "ORD-"}, "Region": {"type": "choice", "values": ["N", "S"]},
+     "Amount": {"type": "float", "low": 1, "high": 100, "decimals": 2},
+     "Day": {"type": "date", "start": "2020-01-01", "end": "2024-12-31"},
+     "Customer": {"type": "faker", "provider": "name"}, "Flag": {"type": "bool"}}
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+XLSX_MAX_ROWS = 1_048_575  # one header row leaves this many data rows per sheet
+POOL_SIZE = 2000
+
+SCHEMAS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "sales": {
+        "OrderID": {"type": "id", "prefix": "ORD-", "start": 1000},
+        "CustomerName": {"type": "faker", "provider": "name"},
+        "Region": {"type": "choice", "values": ["North", "South", "East", "West"]},
+        "ProductCategory": {"type": "choice", "values": ["Electronics", "Furniture", "Clothing", "Toys"]},
+        "Quantity": {"type": "int", "low": 1, "high": 50},
+        "UnitPrice": {"type": "float", "low": 10, "high": 500, "decimals": 2},
+        "Discount": {"type": "choice", "values": [0, 0.05, 0.1, 0.15]},
+        "ShippingCost": {"type": "float", "low": 5, "high": 50, "decimals": 2},
+        "OrderDate": {"type": "date", "start": "2020-01-01", "end": "2024-12-31"},
+        "PaymentMethod": {"type": "choice", "values": ["Credit Card", "Debit Card", "UPI", "Cash"]},
+        "DeliveryStatus": {"type": "choice", "values": ["Delivered", "Pending", "Cancelled"]},
+        "CustomerRating": {"type": "int", "low": 1, "high": 6},
+        "Warehouse": {"type": "choice", "values": ["A", "B", "C", "D"]},
+        "SalesRep": {"type": "faker", "provider": "first_name"},
+        "Profit": {"type": "float", "low": 10, "high": 500, "decimals": 2},
+        "City": {"type": "faker", "provider": "city"},
+        "State": {"type": "faker", "provider": "state"},
+        "Country": {"type": "faker", "provider": "country"},
+        "ReturnFlag": {"type": "choice", "values": [0, 1]},
+        "Feedback": {"type": "choice", "values": ["Good", "Average", "Poor"]},
+    },
+    "hr": {
+        "EmployeeID": {"type": "id", "prefix": "EMP-"},
+        "Name": {"type": "faker", "provider": "name"},
+        "Department": {"type": "choice", "values": ["IT", "HR", "Finance", "Sales", "R&D"]},
+        "Age": {"type": "int", "low": 22, "high": 60},
+        "Gender": {"type": "choice", "values": ["Male", "Female", "Other"]},
+        "Experience": {"type": "int", "low": 0, "high": 20},
+        "Salary": {"type": "int", "low": 30000, "high": 200000},
+        "Bonus": {"type": "float", "low": 1000, "high": 10000, "decimals": 2},
+        "PerformanceScore": {"type": "int", "low": 1, "high": 6},
+        "RemoteWork": {"type": "bool"},
+        "JoiningDate": {"type": "date", "start": "2015-01-01", "end": "2024-12-31"},
+        "Manager": {"type": "faker", "provider": "name"},
+        "Education": {"type": "choice", "values": ["Bachelors", "Masters", "PhD"]},
+        "PromotionEligible": {"type": "bool"},
+        "LeaveBalance": {"type": "int", "low": 0, "high": 30},
+        "City": {"type": "faker", "provider": "city"},
+        "State": {"type": "faker", "provider": "state"},
+        "Country": {"type": "faker", "provider": "country"},
+        "Resigned": {"type": "bool"},
+        "MaritalStatus": {"type": "choice", "values": ["Single", "Married", "Divorced"]},
+    },
+    "product": {
+        "ProductID": {"type": "id", "prefix": "PROD-", "start": 1000},
+        "ProductName": {"type": "faker", "provider": "word", "capitalize": True},
+        "Category": {"type": "choice", "values": ["Electronics", "Apparel", "Grocery", "Books"]},
+        "Supplier": {"type": "faker", "provider": "company"},
+        "CostPrice": {"type": "float", "low": 10, "high": 500, "decimals": 2},
+        "SellingPrice": {"type": "float", "low": 20, "high": 1000, "decimals": 2},
+        "Stock": {"type": "int", "low": 0, "high": 1000},
+        "Discount": {"type": "choice", "values": [0, 0.05, 0.1, 0.2]},
+        "Rating": {"type": "int", "low": 1, "high": 6},
+        "LaunchDate": {"type": "date", "start": "2018-01-01", "end": "2024-12-31"},
+        "Color": {"type": "choice", "values": ["Red", "Blue", "Black", "White", "Green"]},
+        "InDemand": {"type": "bool"},
+    },
+    "reviews": {
+        "Review_ID": {"type": "id", "prefix": "R_"},
+        "Review_Text": {"type": "faker", "provider": "sentence"},
+        "Rating": {"type": "int", "low": 1, "high": 6},
+        "Product_Category": {"type": "choice", "values": ["Electronics", "Clothing", "Books", "Furniture"]},
+        "Sentiment": {"type": "choice", "values": ["Positive", "Negative", "Neutral"]},
+    },
+}
+
+
+def build_pools(schema: Dict[str, Dict[str, Any]], seed: int, size: int = POOL_SIZE) -> Dict[str, np.ndarray]:
+    """Calls Faker `size` times per provider once, instead of once per row."""
+    providers = {spec["provider"] for spec in schema.values() if spec["type"] == "faker"}
+    if not providers:
+        return {}
+    from faker import Faker
+    fake = Faker()
+    fake.seed_instance(seed)
+    return {p: np.array([getattr(fake, p)() for _ in range(size)], dtype=object) for p in sorted(providers)}
+
+
+def _column(spec: Dict[str, Any], rng: np.random.Generator, n: int, offset: int, pools: Dict[str, np.ndarray]):
+    kind = spec["type"]
+    if kind == "id":
+        ids = np.arange(offset, offset + n) + spec.get("start", 0)
+        return np.char.add(spec.get("prefix", ""), ids.astype(str)).astype(object)
+    if kind == "choice":
+        values = np.asarray(spec["values"])
+        if values.dtype.kind == "U":
+            values = values.astype(object)
+        return values[rng.choice(len(values), n, p=spec.get("p"))]
+    if kind == "int":
+        return rng.integers(spec["low"], spec["high"], n)
+    if kind == "float":
+        return rng.uniform(spec["low"], spec["high"], n).round(spec.get("decimals", 2))
+    if kind == "bool":
+        return rng.random(n) < spec.get("p_true", 0.5)
+    if kind == "date":
+        start = np.datetime64(spec["start"], "D")
+        span = int((np.datetime64(spec["end"], "D") - start).astype(int)) + 1
+        return start + rng.integers(0, span, n).astype("timedelta64[D]")
+    if kind == "faker":
+        pool = pools[spec["provider"]]
+        if spec.get("capitalize"):
+            pool = np.char.capitalize(pool.astype(str)).astype(object)
+        return pool[rng.integers(0, len(pool), n)]
+    raise ValueError(f"Unknown column type: {kind}")
+
+
+def generate_chunks(schema: Dict[str, Dict[str, Any]], n_rows: int, seed: int = 42,
+                    chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Yields the dataset in chunks. Chunk i uses its own seeded generator, so output depends only on the seed
+    and chunk size, and chunks could be produced in parallel."""
+    pools = build_pools(schema, seed)
+    for index, offset in enumerate(range(0, n_rows, chunk_size)):
+        n = min(chunk_size, n_rows - offset)
+        rng = np.random.default_rng([seed, index])
+        yield pd.DataFrame({name: _column(spec, rng, n, offset, pools) for name, spec in schema.items()})
+
+
+def generate_frame(schema: Dict[str, Dict[str, Any]], n_rows: int, seed: int = 42, chunk_size: int = 100_000) -> pd.DataFrame:
+    return pd.concat(generate_chunks(schema, n_rows, seed, chunk_size), ignore_index=True)
+
+
+def _write_xlsx(chunks: Iterator[pd.DataFrame], path: str, n_rows: int) -> None:
+    if n_rows > XLSX_MAX_ROWS:
+        raise ValueError(f"xlsx holds at most {XLSX_MAX_ROWS} rows per sheet, use parquet or csv for {n_rows} rows")
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    header_written = False
+    for chunk in chunks:
+        if not header_written:
+            ws.append(list(chunk.columns))
+            header_written = True
+        for col in chunk.columns:
+            if pd.api.types.is_datetime64_any_dtype(chunk[col]):
+                # Timestamps are datetime subclasses, which openpyxl writes as dates
+                chunk[col] = chunk[col].astype(object)
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(path)
+
+
+def _write_parquet(chunks: Iterator[pd.DataFrame], path: str, n_rows: int) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_csv(chunks: Iterator[pd.DataFrame], path: str, n_rows: int) -> None:
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+
+
+WRITERS = {"xlsx": _write_xlsx, "parquet": _write_parquet, "csv": _write_csv}
+
+
+def write_dataset(schema: Dict[str, Dict[str, Any]], n_rows: int, path: str, fmt: str = None,
+                  seed: int = 42, chunk_size: int = 100_000) -> str:
+    """Streams a generated dataset to path; the format defaults to the file extension."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of {sorted(WRITERS)}")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    WRITERS[fmt](generate_chunks(schema, n_rows, seed, chunk_size), path, n_rows)
+    return path
+
+
+def _load_schema(args) -> Dict[str, Dict[str, Any]]:
+    if args.schema_file:
+        with open(args.schema_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return SCHEMAS[args.schema]
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate large synthetic datasets for benchmarks.")
+    parser.add_argument("--schema", choices=sorted(SCHEMAS), default="sales")
+    parser.add_argument("--schema-file", help="JSON file with a custom column spec (overrides --schema)")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--format", choices=sorted(WRITERS))
+    parser.add_argument("--out", required=True, help="output path; the extension picks the format if --format is omitted")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    path = write_dataset(_load_schema(args), args.rows, args.out, args.format, args.seed, args.chunk_size)
+    print(f"Generated {path} with {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,22 +4,94 @@ __author__ = "Mridhula N"
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+import os
+import threading
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import render_prometheus, track_http_request
+from app.core.plan_cache import plan_cache
+from app.core.request_context import new_request_id, reset_request_id, set_request_id
+from app.core.result_store import sweep_result_files
+from app.core.sampling_profiler import finish_profile, profiling_requested, start_profile
 from app.routes import analyze_routes
 from app.routes.excel_routes import router as excel_router
 from app.routes.query_routes import router as query_router
+from app.routes.result_routes import router as result_router
+from app.routes.admin_routes import router as admin_router
+from app.routes.job_routes import router as job_router
+from app.services.llm_client import warm_llm_client
+
+# set to prepare the LLM client (and import its SDK) in the background as soon as a worker starts
+LLM_WARM_START = os.getenv("LLM_WARM_START", "").strip().lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup work that used to run at import time. Importing app.main stays cheap (tests, tooling);
+    a serving worker creates its directories here and, if asked, warms the LLM client without
+    delaying its first request."""
+    for directory in ("uploads", "results"):
+        os.makedirs(directory, exist_ok=True)
+    sweep_result_files()
+    if LLM_WARM_START:
+        threading.Thread(target=warm_llm_client, name="llm-warm-start", daemon=True).start()
+    yield
+    plan_cache.flush()
 
 
 app = FastAPI(
     title="Excel AI Engine ",
     description="Upload Excel files and preview them.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 # app.include_router(main_router, prefix="/api/v1", tags=["Analyze and Query Excel"])
 
 app.include_router(excel_router, prefix="/api/v1")
 app.include_router(analyze_routes.router, prefix="/api/v1")
 app.include_router(query_router, prefix="/api/v1")
+app.include_router(result_router, prefix="/api/v1")
+app.include_router(admin_router, prefix="/api/v1")
+app.include_router(job_router, prefix="/api/v1")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    with track_http_request(request.method) as info:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        # the route template keeps label cardinality bounded (no ids or file names)
+        info["route"] = getattr(route, "path", "unmatched")
+        info["status"] = response.status_code
+    return response
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tags the request with an id (echoed as X-Request-ID) and, when asked and enabled, profiles it."""
+    request_id = new_request_id(request.headers.get("x-request-id"))
+    token = set_request_id(request_id)
+    profile = None
+    if profiling_requested(request.headers.get("x-profile"), request.query_params.get("profile")):
+        profile, profile_token = start_profile(request_id, request.url.path)
+    try:
+        response = await call_next(request)
+    finally:
+        if profile is not None:
+            finish_profile(profile, profile_token)
+        reset_request_id(token)
+    response.headers["X-Request-ID"] = request_id
+    if profile is not None:
+        response.headers["X-Profile-Url"] = f"/api/v1/admin/profiles/{profile.profile_id}"
+    return response
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint: stage and request latency histograms, cache hit rates, in-flight counts."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/health")
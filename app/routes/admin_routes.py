@@ -0,0 +1,116 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core.plan_cache import plan_cache
+from app.core.fast_planner import planner_stats
+from app.core.singleflight import singleflight_stats
+from app.core.memory_report import cache_report, dataset_report, evict_dataset, evict_profiles
+from app.core.result_store import delete_result
+from app.core import sampling_profiler
+from app.core.sampling_profiler import get_profile, list_profiles, to_collapsed
+from app.core.serialization import FastJSONResponse
+from app.core.logger import get_logger
+
+router = APIRouter(prefix="/admin", default_response_class=FastJSONResponse)
+logger = get_logger(__name__)
+
+# The endpoints that change state (clearing caches, evicting datasets and other users' results) need
+# this token in an X-Admin-Token header. Without one configured they are disabled; the read-only
+# reports stay open.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip()
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin write endpoints are disabled (set ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+
+
+@router.get("/plan_cache")
+async def plan_cache_stats():
+    """Returns size and hit/miss counters of the LLM plan cache."""
+    return plan_cache.stats()
+
+
+@router.delete("/plan_cache", dependencies=[Depends(require_admin_token)])
+async def clear_plan_cache():
+    """Drops every cached plan (counters are kept)."""
+    plan_cache.clear()
+    logger.info("Plan cache cleared")
+    return {"status": "ok", "message": "Plan cache cleared"}
+
+
+@router.get("/fast_planner")
+async def fast_planner_stats():
+    """Returns fast-path hit counters and, in shadow mode, the agreement rate with LLM plans."""
+    return planner_stats()
+
+
+@router.get("/singleflight")
+async def singleflight_counters():
+    """Returns how many dataset loads, plan calls and executions ran versus were shared by coalesced requests."""
+    return singleflight_stats()
+
+
+@router.get("/cache")
+def cache_contents(deep: bool = Query(False, description="count string payloads of object columns (slower)")):
+    """Lists every cached dataset with per-sheet memory, dtype breakdown, access stats and derived structures.
+
+    A plain def so the (deep) memory walk runs on the threadpool instead of the event loop."""
+    return cache_report(deep)
+
+
+@router.get("/cache/datasets/{filename}")
+def cached_dataset(filename: str, deep: bool = Query(False)):
+    """Memory report of one cached dataset."""
+    report = dataset_report(filename, deep)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Dataset not cached")
+    return report
+
+
+@router.delete("/cache/datasets/{filename}", dependencies=[Depends(require_admin_token)])
+async def evict_cached_dataset(filename: str, include_results: bool = Query(False, description="also drop its stored results")):
+    """Evicts a dataset from memory; the file stays on disk and is reloaded on the next request."""
+    out = evict_dataset(filename, include_results)
+    if not out["evicted"] and not out["results_removed"]:
+        raise HTTPException(status_code=404, detail="Dataset not cached")
+    logger.info("Evicted dataset %s from cache (%d results removed)", filename, len(out["results_removed"]))
+    return out
+
+
+@router.delete("/cache/datasets/{filename}/profiles", dependencies=[Depends(require_admin_token)])
+async def evict_cached_profiles(filename: str):
+    """Drops the cached /analyze_excel profiles of a dataset."""
+    return {"filename": filename, "profiles_removed": evict_profiles(filename)}
+
+
+@router.delete("/cache/results/{result_id}", dependencies=[Depends(require_admin_token)])
+async def evict_cached_result(result_id: str):
+    """Drops a stored query result and its download files."""
+    if not delete_result(result_id):
+        raise HTTPException(status_code=404, detail="Result not found")
+    return {"result_id": result_id, "evicted": True}
+
+
+@router.get("/profiles")
+async def stored_profiles():
+    """Lists the retained request profiles, newest first (request with `X-Profile: 1` or `?profile=true`
+    while PROFILING_ENABLED is set to record one)."""
+    return {"enabled": sampling_profiler.PROFILING_ENABLED, "profiles": list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+async def stored_profile(profile_id: str, format: str = Query("collapsed", pattern="^(collapsed|json)$")):
+    """Returns one profile as collapsed stacks (feed to flamegraph.pl or speedscope) or as JSON."""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "json":
+        return profile
+    return PlainTextResponse(to_collapsed(profile))
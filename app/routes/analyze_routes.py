@@ -1,8 +1,13 @@
 from fastapi import APIRouter, Query
 from fastapi.responses import JSONResponse
-import pandas as pd
-import numpy as np
+from typing import Any, Dict
+import asyncio
 import os
+from app.core.file_manager import dataset_profile, first_sheet_name, get_dataset, iter_sheet_chunks, sheet_snapshot
+from app.core.profiler import profile_frame
+from app.core.sketches import sketch_chunks
+from app.core.metrics import span
+from app.core.sampling_profiler import profiled_section
 from app.core.logger import get_logger
 
 router = APIRouter()
@@ -10,73 +15,60 @@ logger = get_logger(__name__)
 
 # path where input files are saved
 UPLOAD_DIR = "uploads"
+# rows per chunk of the streamed read in approx mode; memory use is about one chunk plus the sketches
+APPROX_CHUNK_ROWS = int(os.getenv("PROFILE_APPROX_CHUNK_ROWS", "50000"))
+
+def _analyze(filename: str) -> Dict[str, Any]:
+    sheets, _ = get_dataset(filename, UPLOAD_DIR)
+    # same sheet pd.read_excel used to pick: the first one
+    sheet = next(iter(sheets))
+
+    def compute():
+        source = sheet_snapshot(filename, sheet, sheets[sheet])
+        # columns the query route derived on the cached sheet are not part of the uploaded file
+        derived = [c for c in source.attrs.get("derived_columns") or [] if c in source.columns]
+        if derived:
+            source = source.drop(columns=derived)
+        with span("profile"), profiled_section():
+            return profile_frame(source)
+
+    return dataset_profile(filename, sheet, compute)
+
+
+def _analyze_approx(filename: str) -> Dict[str, Any]:
+    # streams the workbook from disk instead of loading (and caching) the whole sheet first
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    sheet = first_sheet_name(file_path)
+
+    def compute():
+        with span("profile"), profiled_section():
+            return sketch_chunks(iter_sheet_chunks(file_path, APPROX_CHUNK_ROWS, sheet)).to_profile()
+
+    return dataset_profile(filename, f"{sheet}:approx", compute)
+
 
 @router.get("/analyze_excel")
-async def analyze_excel(filename: str = Query(..., description="Name of the uploaded Excel file")):
-    """Analyzes uploaded Excel file to infer column types, compute summary statistics, and flag unstructured text columns."""
-    logger.info(f"Analyzing Excel file: {filename}")
+async def analyze_excel(
+    filename: str = Query(..., description="Name of the uploaded Excel file"),
+    mode: str = Query("exact", pattern="^(exact|approx)$", description="exact statistics or mergeable sketches (approx)"),
+):
+    """Analyzes uploaded Excel file to infer column types, compute summary statistics, and flag unstructured text columns.
+
+    mode=approx reads the sheet in chunks straight from the file and estimates distinct counts, top
+    values and text lengths with bounded-memory sketches, adding approximate quantiles for numeric
+    columns. It never loads the whole sheet, so it suits sheets too large to profile exactly."""
+    logger.info("Analyzing Excel file: %s", filename)
     try:
         file_path = os.path.join(UPLOAD_DIR, filename)
         if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path}")
+            logger.error("File not found: %s", file_path)
             return JSONResponse(content={"error": "File not found."}, status_code=404)
 
-        df = pd.read_excel(file_path)
-
-        # Step 1: Column type inference
-        inferred_types = {}
-        for col in df.columns:
-            dtype = str(df[col].dtype)
-            if pd.api.types.is_numeric_dtype(df[col]):
-                inferred_types[col] = "numeric"
-            elif pd.api.types.is_datetime64_any_dtype(df[col]):
-                inferred_types[col] = "date"
-            elif df[col].nunique() < len(df) * 0.05:
-                inferred_types[col] = "categorical"
-            else:
-                inferred_types[col] = "text"
-
-        # Step 2: Summary statistics
-        summary = {}
-        for col in df.columns:
-            data = df[col]
-            if inferred_types[col] == "numeric":
-                summary[col] = {
-                    "mean": float(data.mean()) if not np.isnan(data.mean()) else None,
-                    "min": float(data.min()) if not np.isnan(data.min()) else None,
-                    "max": float(data.max()) if not np.isnan(data.max()) else None,
-                    "missing": int(data.isna().sum())
-                }
-            elif inferred_types[col] == "categorical":
-                summary[col] = {
-                    "unique_values": int(data.nunique()),
-                    "top_value": str(data.mode().iloc[0]) if not data.mode().empty else None,
-                    "missing": int(data.isna().sum())
-                }
-            elif inferred_types[col] == "date":
-                summary[col] = {
-                    "min_date": str(data.min().date()) if not data.isna().all() else None,
-                    "max_date": str(data.max().date()) if not data.isna().all() else None,
-                    "missing": int(data.isna().sum())
-                }
-            else:  # text/unstructured
-                avg_len = data.dropna().apply(lambda x: len(str(x))).mean() if not data.dropna().empty else None
-                summary[col] = {
-                    "avg_text_length": round(avg_len, 2) if avg_len else None,
-                    "missing": int(data.isna().sum())
-                }
-
-        # Step 3: Handle unstructured / free text columns (flag)
-        unstructured_cols = [col for col, t in inferred_types.items() if t == "text"]
-
-        result = {
-            "inferred_column_types": inferred_types,
-            "summary": summary,
-            "unstructured_columns": unstructured_cols
-        }
+        # reading the workbook and profiling it take seconds on large files; neither runs on the event loop
+        result = await asyncio.to_thread(_analyze if mode == "exact" else _analyze_approx, filename)
         logger.info("Analysis completed successfully.")
         return JSONResponse(content=result)
 
     except Exception as e:
-        logger.error(f"Error analyzing Excel file: {e}")
+        logger.error("Error analyzing Excel file: %s", e)
         return JSONResponse(content={"error": str(e)}, status_code=500)
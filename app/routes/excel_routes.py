@@ -9,7 +9,6 @@ router = APIRouter()
 logger = get_logger(__name__)
 
 UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 class QueryRequest(BaseModel):
@@ -19,7 +18,8 @@ class QueryRequest(BaseModel):
 @router.post("/upload")
 async def upload_excel(file: UploadFile = File(...)):
     """Handles Excel file uploads, saves them to disk, and returns the filename with column names."""
-    logger.info(f"Received Excel upload: {file.filename}")
+    logger.info("Received Excel upload: %s", file.filename)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
     file_path = os.path.join(UPLOAD_DIR, file.filename)
     with open(file_path, "wb") as f:
         f.write(await file.read())
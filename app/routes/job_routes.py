@@ -0,0 +1,91 @@
+import asyncio
+import os
+from typing import Any, Dict
+
+from fastapi import APIRouter, Body, HTTPException
+
+from app.core.file_manager import dataset_cache
+from app.core.jobs import ACTIVE, JobFailed, cancel_job, get_job, list_jobs, submit_job
+from app.core.metrics import format_timings, start_request_timings
+from app.core.serialization import FastJSONResponse
+from app.core.logger import get_logger
+from app.routes.query_routes import answer_query
+
+# job state is per process (see app.core.jobs): deploy with one worker or sticky routing by job id
+router = APIRouter(prefix="/jobs", default_response_class=FastJSONResponse)
+logger = get_logger(__name__)
+
+
+def _run_later(fn, *args) -> None:
+    # a job has no response to attach background tasks to; the verifier just runs on the default pool
+    asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def _links(job_id: str) -> Dict[str, str]:
+    return {"status_url": f"/api/v1/jobs/{job_id}", "result_url": f"/api/v1/jobs/{job_id}/result"}
+
+
+async def _query_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    timings = start_request_timings()
+    try:
+        content = await answer_query(payload, _run_later, coalesce=False)
+    except HTTPException as e:
+        raise JobFailed(e.status_code, {"status": "error", "detail": e.detail})
+    if content["status"] != "ok":
+        raise JobFailed(400, content)
+    content["timings"] = format_timings(timings)
+    return content
+
+
+@router.post("/query", status_code=202)
+async def submit_query_job(payload: Dict[str, Any] = Body(...)):
+    """Queues a /query request as a background job and returns its id at once.
+
+    Poll the status URL for stage and progress, fetch the result URL when the job is done, or cancel it.
+    The job's result is exactly the body /query would have returned."""
+    filename = payload.get("filename")
+    if not filename or not payload.get("query"):
+        raise HTTPException(status_code=400, detail="filename and query are required")
+    if filename not in dataset_cache and not os.path.exists(os.path.join("uploads", filename)):
+        raise HTTPException(status_code=404, detail="file not found")
+    job_id = submit_job("query", lambda: _query_job(payload), filename=filename, sheet=payload.get("sheet"), query=payload.get("query"))
+    return {"job_id": job_id, "status": "queued", **_links(job_id)}
+
+
+@router.get("")
+async def jobs_list():
+    """Recent jobs, newest first, without their results."""
+    return {"jobs": list_jobs()}
+
+
+@router.get("/{job_id}")
+async def job_status(job_id: str):
+    """Status (queued, running, cancelling, done, failed, cancelled), current stage, progress and elapsed time of a job."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return {**job, **_links(job_id)}
+
+
+@router.get("/{job_id}/result")
+async def job_result(job_id: str):
+    """The job's response body once it finished; 409 while it is still queued, running or cancelling."""
+    job = get_job(job_id, with_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job["status"] in ACTIVE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} (stage: {job['stage']})")
+    if job["status"] == "cancelled":
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    return FastJSONResponse(content=job["result"], status_code=job["status_code"])
+
+
+@router.post("/{job_id}/cancel", status_code=202)
+async def job_cancel(job_id: str):
+    """Requests cancellation of a queued or running job; its status is "cancelling" until the work stops
+    at its next checkpoint (stage changes, multi_step steps, export chunks), then "cancelled"."""
+    job = cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    logger.info("Cancellation requested for job %s", job_id)
+    return {**job, **_links(job_id)}
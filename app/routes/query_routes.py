@@ -1,123 +1,300 @@
 from fastapi import APIRouter, HTTPException,UploadFile, File,Form
-from fastapi import Body
-from fastapi.responses import JSONResponse, FileResponse
-from typing import Dict, Any, Optional
+from fastapi import Body, BackgroundTasks
+from fastapi.responses import FileResponse
+from typing import Any, Callable, Dict, List, Optional
 
+import asyncio
+import copy
 import difflib
 import os
 import json
 import pandas as pd
-import numpy as np
-import datetime
 
-from app.core.file_manager import dataset_cache, load_excel_preview 
-from app.core.llm_interpreter import call_llm_for_plan, call_llm_verifier
+from app.core.file_manager import dataset_cache, dataset_profile, load_excel_preview, sheet_lock, sheet_snapshot, touch_dataset
+from app.core.llm_interpreter import call_llm_for_plan, plan_queries
+from app.core.batch_executor import execute_batch
 from app.core.executor import execute_plan
-from app.core.logger import get_logger
+from app.core.executor_helpers import derive_missing_columns_with_llm, no_result_files
+from app.core.jobs import report_progress
+from app.core.result_store import store_result
+from app.core.prompt_builder import column_profile
+from app.core.plan_cache import make_plan_key
+from app.core.schema import base_columns, frame_fingerprint
+from app.core.singleflight import dataset_flight, plan_flight, execution_flight
+from app.core.metrics import format_timings, record_cache_lookup, server_timing_header, span, start_request_timings
+from app.core.sampling_profiler import profiled_section
+from app.core.verification import callback_allowed, verify_locally, create_verification, get_verification, run_llm_verification
+from app.core.logger import get_logger, log_payload
+from app.core.serialization import FastJSONResponse, to_json_safe
 
 logger = get_logger(__name__)
 logger.info("LOADED: %s", os.path.abspath(__file__))
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
+
+MAX_BATCH_QUERIES = int(os.getenv("QUERY_BATCH_MAX_QUERIES", "100"))
 
 def make_json_serializable(obj):
     """Convert objects into JSON-serializable types."""
-    if isinstance(obj, pd.DataFrame):
-        return obj.head(10).to_dict(orient="records")
-    elif isinstance(obj, pd.Series):
-        return obj.to_dict()
-    elif isinstance(obj, (np.integer, np.int64)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64)):
-        return float(obj)
-    elif isinstance(obj, (np.bool_, bool)):
-        return bool(obj)
-    elif isinstance(obj, (pd.Timestamp, datetime.datetime)):
-        return obj.isoformat()
-    elif isinstance(obj, dict):
-        return {k: make_json_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [make_json_serializable(i) for i in obj]
-    else:
-        try:
-            json.dumps(obj)
-            return obj
-        except Exception:
-            return str(obj)
+    return to_json_safe(obj)
 
-@router.post("/query")
-async def query_excel(payload: Dict[str, Any] = Body(...)):
-    logger.info("Query Route Executing")
-    """Handles user queries on uploaded Excel files by generating, executing, and verifying the LLM generated plan."""
-    filename = payload.get("filename")
-    sheet = payload.get("sheet")
-    user_query = payload.get("query")
-    logger.info(f" Received query request | file={filename}, sheet={sheet}, query={user_query}")
+def _load_if_missing(filename: str, file_path: str) -> None:
+    if filename not in dataset_cache:
+        load_excel_preview(file_path)
 
-    if not filename or not user_query:
-        raise HTTPException(status_code=400, detail="filename and query are required")
 
+def _derive_and_execute(df: pd.DataFrame, plan: Dict[str, Any], other_tables: Dict[str, pd.DataFrame], filename: str, sheet: str) -> Dict[str, Any]:
+    """Runs the plan on a copy of the cached sheet and stores the result. Shared by coalesced identical requests.
+
+    Missing columns are derived on the copy, outside the sheet lock (that is the LLM call); only adding
+    the finished columns to the cached sheet, so later queries reuse them for free, takes the lock."""
+    with profiled_section():
+        working = sheet_snapshot(filename, sheet, df).copy()
+        with span("column_derivation"):
+            derive_missing_columns_with_llm(plan, working, logger)
+        derived = [c for c in working.attrs.get("derived_columns") or [] if c not in df.columns]
+        if derived:
+            with sheet_lock(filename, sheet):
+                cached_derived = df.attrs.setdefault("derived_columns", [])
+                for col in derived:
+                    if col not in df.columns:
+                        df[col] = working[col].copy()
+                        cached_derived.append(col)
+        exec_out = execute_plan(working, plan, other_tables)
+        if exec_out.get("status") == "ok" and exec_out.get("result_df") is not None:
+            workbook = {"workbook": exec_out["file_path"]} if exec_out.get("file_path") else None
+            exec_out["result_id"] = store_result(exec_out["result_df"], plan=plan, source=filename, exports=workbook)
+    return exec_out
+
+
+def _prompt_profile(filename: str, sheet: str, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """The planner's column hints for a cached sheet, kept with the file's other profiles."""
+    return dataset_profile(filename, f"{sheet}:prompt", lambda: column_profile(df), cache="prompt_profile")
+
+
+def _other_sheets(filename: str, sheets: Dict[str, pd.DataFrame], sheet: str) -> Dict[str, pd.DataFrame]:
+    return {k: sheet_snapshot(filename, k, v) for k, v in sheets.items() if k != sheet}
+
+
+async def _load_sheet(filename: str, sheet: Optional[str]):
+    """Returns the cached sheets of an uploaded file and the name of the requested (or first) sheet."""
+    record_cache_lookup("dataset", filename in dataset_cache)
     if filename not in dataset_cache:
         ##where input files are saved.
         uploads_dir = "uploads"
         file_path = os.path.join(uploads_dir, filename)
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="file not found")
-        _ = load_excel_preview(file_path)
+        # concurrent requests for a cold file share one workbook read
+        await dataset_flight.run(filename, _load_if_missing, filename, file_path)
 
     sheets = dataset_cache.get(filename)
+    touch_dataset(filename)
     if sheet is None:
         # pick first sheet if multiple sheets present
         sheet = list(sheets.keys())[0]
     if sheet not in sheets:
         raise HTTPException(status_code=404, detail="sheet not found in file")
+    return sheets, sheet
+
 
+async def answer_query(payload: Dict[str, Any], defer: Callable[..., Any], coalesce: bool = True) -> Dict[str, Any]:
+    """Loads, plans, executes and verifies one query; returns the response body.
+
+    Raises HTTPException for bad input and planner failures. An execution error is returned as a body
+    with "status": "error". `defer(fn, *args)` schedules the LLM verifier after the answer. With
+    coalesce=False the execution is not shared with identical in-flight requests (jobs, which can be
+    cancelled, must not cancel someone else's work)."""
+    filename = payload.get("filename")
+    sheet = payload.get("sheet")
+    user_query = payload.get("query")
+    logger.info(" Received query request | file=%s, sheet=%s, query=%s", filename, sheet, user_query)
+
+    if not filename or not user_query:
+        raise HTTPException(status_code=400, detail="filename and query are required")
+    if payload.get("callback_url") and not callback_allowed(payload["callback_url"]):
+        raise HTTPException(status_code=400, detail="callback_url is not on an allowed callback host")
+
+    report_progress("loading")
+    sheets, sheet = await _load_sheet(filename, sheet)
     df = sheets[sheet]
+    # planning, fingerprinting and verification read this; derivation writes to the cached sheet
+    view = sheet_snapshot(filename, sheet, df)
 
-    # Provide columns to LLM to improve results
-    sample_columns = list(df.columns.astype(str))[:50]
+    # Provide the typed schema to the LLM to improve results; the prompt builder prunes it to the token budget.
+    # Columns derived by earlier queries are left out so the plan (and its cache key) does not depend on them.
+    sample_columns = base_columns(view)
 
+    report_progress("planning")
     try:
-        plan_str = call_llm_for_plan(user_query, sample_columns=sample_columns)
-        logger.info(f"LLM raw output: {plan_str}")
+        # identical queries on the same schema wait for one planner call; the plan is copied since we add to it
+        with span("plan"):
+            plan_str = await plan_flight.run(
+                make_plan_key(user_query, sample_columns),
+                call_llm_for_plan, user_query, sample_columns=sample_columns,
+                column_profile=_prompt_profile(filename, sheet, view),
+            )
+        log_payload(logger, "query_plan", "LLM raw output: %s", plan_str)
 
         # Parse LLM output
         try:
-            plan = json.loads(plan_str) if isinstance(plan_str, str) else plan_str
+            plan = json.loads(plan_str) if isinstance(plan_str, str) else copy.deepcopy(plan_str)
         except Exception as e:
-            logger.warning(f" Failed to parse LLM output as JSON: {e}")
+            logger.warning(" Failed to parse LLM output as JSON: %s", e)
             raise HTTPException(status_code=500, detail="Invalid LLM response format")
 
-        logger.info(f" Parsed plan operation")
+        logger.info(" Parsed plan operation")
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
     
     # 2) Execute the plan generated by LLM
-    other_tables = {k: v for k, v in sheets.items() if k != sheet}  # allow joins with other sheets in same file
+    report_progress("executing")
+    other_tables = _other_sheets(filename, sheets, sheet)  # allow joins with other sheets in same file
     file_path = os.path.join("uploads", filename)
     plan["input_path"] = file_path 
-    exec_out = execute_plan(df.copy(), plan, other_tables)
+    with span("execution"):
+        if coalesce:
+            exec_key = (filename, sheet, frame_fingerprint(view), json.dumps(plan, sort_keys=True, default=str))
+            exec_out = await execution_flight.run(exec_key, _derive_and_execute, df, plan, other_tables, filename, sheet)
+        else:
+            exec_out = await asyncio.to_thread(_derive_and_execute, df, plan, other_tables, filename, sheet)
 
     if exec_out.get("status") != "ok":
-        return JSONResponse(content={"status": "error", "message": exec_out.get("message")}, status_code=400)
+        return {"status": "error", "message": exec_out.get("message")}
 
     result_preview = exec_out.get("preview", [])
-
-    # 3) Verification by LLM if the plan LLM opts for it
-    if plan.get("verify", False):
-        verifier = call_llm_verifier(user_query, plan, result_preview)
-    else:
-        verifier = {"ok": True, "note": "no verification requested"}
+    result_id = exec_out.get("result_id")
+
+    # 3) Deterministic checks inline; the LLM verifier (if the plan or caller asks for it) runs after the response
+    report_progress("verifying")
+    with span("verification"):
+        verifier = verify_locally(plan, view, exec_out.get("result_df"))
+    if plan.get("verify", False) or payload.get("verify", False):
+        verification_id = create_verification(user_query, plan)
+        defer(run_llm_verification, verification_id, user_query, plan, result_preview, payload.get("callback_url"))
+        verifier["llm_verification"] = {
+            "id": verification_id,
+            "status": "pending",
+            "url": f"/api/v1/verification/{verification_id}",
+        }
 
     # Return preview + operation metadata instead of full dataframe
-    return JSONResponse(content={
+    return {
     "status": "ok",
     "plan": plan,
     "message": exec_out.get("message"),
     "preview": result_preview,
     "verifier": verifier,
-    "file_path": exec_out.get("file_path") 
-})
+    "file_path": exec_out.get("file_path"),
+    "result_id": result_id
+}
+
+
+@router.post("/query")
+async def query_excel(background_tasks: BackgroundTasks, payload: Dict[str, Any] = Body(...)):
+    logger.info("Query Route Executing")
+    """Handles user queries on uploaded Excel files by generating, executing, and verifying the LLM generated plan.
+
+    With "timings": true in the payload the response includes the per-stage breakdown in milliseconds
+    (it is always sent as a Server-Timing header). Stages run by a coalesced identical request are
+    reported only to the request that ran them; the others see the time they waited under "plan"
+    and "execution"."""
+    timings = start_request_timings()
+    content = await answer_query(payload, background_tasks.add_task)
+    if content["status"] != "ok":
+        return FastJSONResponse(content=content, status_code=400)
+    if payload.get("timings"):
+        content["timings"] = format_timings(timings)
+    # the response body is serialized here, in the constructor
+    with profiled_section():
+        return FastJSONResponse(content=content, headers={"Server-Timing": server_timing_header(timings)})
+
+def _run_batch(df: pd.DataFrame, plans: List[Any], other_tables: Dict[str, pd.DataFrame], filename: str, sheet: str) -> List[Optional[Dict[str, Any]]]:
+    """Executes a planned batch on one worker thread; fused aggregates are stored here, the rest by _derive_and_execute.
+
+    Batch results are kept in the result store only (fetch or export them by result_id): no plan gets an
+    input_path, so no result workbook is written, and the operations skip their own Excel files."""
+    def execute_one(plan: Dict[str, Any]) -> Dict[str, Any]:
+        return _derive_and_execute(df, plan, other_tables, filename, sheet)
+
+    with profiled_section(), no_result_files():
+        # the fused scan reads a snapshot; execute_one may add derived columns to the cached sheet meanwhile
+        results = execute_batch(sheet_snapshot(filename, sheet, df), plans, execute_one)
+        for plan, out in zip(plans, results):
+            if out is not None and out.get("fused"):
+                out["result_id"] = store_result(out["result_df"], plan=plan, source=filename)
+    return results
+
+
+@router.post("/query_batch")
+async def query_batch(payload: Dict[str, Any] = Body(...)):
+    """Answers many queries on one sheet in a single request.
+
+    The sheet is loaded once and the queries are planned together: fast path and plan cache first, then
+    one batched LLM call for the rest. Grouped aggregates on the same keys are computed in one scan.
+    Each entry of "results" is what /query would have answered for that query (without the LLM
+    verifier, and with a result_id instead of a result workbook); one failing query does not fail the batch."""
+    timings = start_request_timings()
+    filename = payload.get("filename")
+    queries = payload.get("queries")
+    if not filename or not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        raise HTTPException(status_code=400, detail="filename and a non-empty list of queries are required")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_BATCH_QUERIES} queries per batch")
+    logger.info(" Received batch of %d queries | file=%s", len(queries), filename)
+
+    sheets, sheet = await _load_sheet(filename, payload.get("sheet"))
+    df = sheets[sheet]
+    view = sheet_snapshot(filename, sheet, df)
+    with span("plan"):
+        plans = await asyncio.to_thread(plan_queries, queries, base_columns(view), _prompt_profile(filename, sheet, view))
+
+    other_tables = _other_sheets(filename, sheets, sheet)
+    with span("execution"):
+        results = await asyncio.to_thread(_run_batch, df, plans, other_tables, filename, sheet)
+
+    answers = []
+    with span("verification"):
+        for user_query, plan, out in zip(queries, plans, results):
+            if isinstance(plan, Exception):
+                answers.append({"query": user_query, "status": "error", "message": getattr(plan, "detail", str(plan))})
+            elif out.get("status") != "ok":
+                answers.append({"query": user_query, "status": "error", "plan": plan, "message": out.get("message")})
+            else:
+                answers.append({
+                    "query": user_query,
+                    "status": "ok",
+                    "plan": plan,
+                    "message": out.get("message"),
+                    "preview": out.get("preview", []),
+                    "verifier": verify_locally(plan, view, out.get("result_df")),
+                    "result_id": out.get("result_id"),
+                    "fused": bool(out.get("fused")),
+                })
+
+    content = {
+        "status": "ok",
+        "filename": filename,
+        "sheet": sheet,
+        "results": answers,
+        "summary": {
+            "queries": len(answers),
+            "ok": sum(a["status"] == "ok" for a in answers),
+            "fused": sum(bool(a.get("fused")) for a in answers),
+        },
+    }
+    if payload.get("timings"):
+        content["timings"] = format_timings(timings)
+    with profiled_section():
+        return FastJSONResponse(content=content, headers={"Server-Timing": server_timing_header(timings)})
+
+@router.get("/verification/{verification_id}")
+async def verification_status(verification_id: str):
+    """Returns the status and verdict of a background LLM verification."""
+    entry = get_verification(verification_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Verification not found")
+    return {"verification_id": verification_id, **entry}
 
 @router.get("/download_result")
 async def download_result(filename: str):
@@ -142,6 +319,17 @@ def normalize_operation(predicted_op: str) -> str:
     match = difflib.get_close_matches(predicted_op, valid_ops, n=1, cutoff=0.4)
     return match[0] if match else predicted_op
 
+def _save_and_read(path: str, data: bytes) -> pd.DataFrame:
+    with open(path, "wb") as f:
+        f.write(data)
+    return pd.read_excel(path)
+
+
+def _execute_profiled(df: pd.DataFrame, plan: Dict[str, Any], other_tables: Optional[Dict[str, pd.DataFrame]]) -> Dict[str, Any]:
+    with profiled_section():
+        return execute_plan(df, plan, other_tables=other_tables)
+
+
 @router.post("/analyze_and_query")
 async def analyze_and_query(
     file: UploadFile = File(..., description="Main Excel file"),
@@ -156,42 +344,48 @@ async def analyze_and_query(
         upload_dir = "uploads"
         os.makedirs(upload_dir, exist_ok=True)
 
+        # reading the workbooks, planning and executing all block; none of it runs on the event loop
         main_path = os.path.join(upload_dir, file.filename)
-        with open(main_path, "wb") as f:
-            f.write(await file.read())
-        df_main = pd.read_excel(main_path)
+        df_main = await asyncio.to_thread(_save_and_read, main_path, await file.read())
 
         df_others = {}
         if other_file:
             other_path = os.path.join(upload_dir, other_file.filename)
-            with open(other_path, "wb") as f:
-                f.write(await other_file.read())
-            df_others["other_sheet"] = pd.read_excel(other_path)
+            df_others["other_sheet"] = await asyncio.to_thread(_save_and_read, other_path, await other_file.read())
 
-        plan_str = call_llm_for_plan(query, sample_columns=list(df_main.columns))
-        plan = json.loads(plan_str) if isinstance(plan_str, str) else plan_str
+        sample_columns = list(df_main.columns.astype(str))
+        plan_str = await plan_flight.run(
+            make_plan_key(query, sample_columns),
+            call_llm_for_plan, query, sample_columns=sample_columns, column_profile=column_profile(df_main),
+        )
+        plan = json.loads(plan_str) if isinstance(plan_str, str) else copy.deepcopy(plan_str)
 
         # Add meta info for executor
         plan["input_path"] = main_path
         plan["query"] = query
 
-        result = execute_plan(df_main, plan, other_tables=df_others or None)
+        result = await asyncio.to_thread(_execute_profiled, df_main, plan, df_others or None)
 
         try:
-            json_safe_result = make_json_serializable({
-                k: v for k, v in result.items() if k != "result_df"
-            })
+            with profiled_section():
+                json_safe_result = make_json_serializable({
+                    k: v for k, v in result.items() if k != "result_df"
+                })
         except Exception as e:
-            logger.error(f"Serialization failed: {e}")
+            logger.error("Serialization failed: %s", e)
             json_safe_result = {"status": "error", "message": str(e)}
 
+        if result.get("result_df") is not None:
+            workbook = {"workbook": result["file_path"]} if result.get("file_path") else None
+            json_safe_result["result_id"] = store_result(result["result_df"], plan=plan, source=file.filename, exports=workbook)
+
         if result.get("file_path"):
             json_safe_result["excel_saved"] = True
             json_safe_result["download_url"] = f"/api/v1/download_result?filename={os.path.basename(result['file_path'])}"
         else:
             json_safe_result["excel_saved"] = False
 
-        return JSONResponse(content=json_safe_result)
+        return FastJSONResponse(content=json_safe_result)
 
     except Exception as e:
         logger.exception(" Error during analyze_and_query: %s", e)
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse, FileResponse, Response
+from typing import Optional
+import asyncio
+import importlib.util
+import os
+
+from app.core.result_store import get_result, encode_cursor, decode_cursor
+from app.core.result_export import ExportError, ResultEvicted, export_result
+from app.core.result_stream import STREAM_ENCODERS, STREAM_MEDIA_TYPES, DEFAULT_CHUNK_SIZE
+from app.core.serialization import FastJSONResponse, dumps, frame_to_records
+from app.core.logger import get_logger
+
+router = APIRouter(default_response_class=FastJSONResponse)
+logger = get_logger(__name__)
+
+MAX_PAGE_SIZE = 10000
+
+
+def _get_result_or_404(result_id: str):
+    entry = get_result(result_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return entry
+
+
+def _render_page(result_id: str, df, offset: int, limit: int) -> bytes:
+    page = df.iloc[offset:offset + limit]
+    next_offset = offset + len(page)
+    return dumps({
+        "result_id": result_id,
+        "total_rows": int(len(df)),
+        "columns": [str(c) for c in df.columns],
+        "offset": offset,
+        "rows": frame_to_records(page, max_rows=None),
+        "next_cursor": encode_cursor(result_id, next_offset) if next_offset < len(df) else None,
+    })
+
+
+@router.get("/results/{result_id}")
+async def get_result_page(
+    result_id: str,
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE, description="Rows per page"),
+):
+    """Returns one page of a stored result together with the cursor for the next page."""
+    entry = _get_result_or_404(result_id)
+    df = entry["result_df"]
+    try:
+        offset = decode_cursor(result_id, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # converting and encoding up to MAX_PAGE_SIZE rows takes a while; keep it off the event loop
+    body = await asyncio.to_thread(_render_page, result_id, df, offset, limit)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/results/{result_id}/stream")
+async def stream_result(
+    result_id: str,
+    format: str = Query("ndjson", description="One of ndjson, csv, arrow"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=1000000, description="Rows encoded per chunk"),
+):
+    """Streams a stored result chunk by chunk as NDJSON, CSV or Arrow IPC."""
+    entry = _get_result_or_404(result_id)
+    fmt = format.strip().lower()
+    if fmt not in STREAM_ENCODERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {format}")
+    if fmt == "arrow" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=400, detail="Arrow streaming requires pyarrow to be installed")
+
+    try:
+        chunks = STREAM_ENCODERS[fmt](entry["result_df"], chunk_size)
+    except Exception as e:
+        # only the arrow encoder does work before the first chunk: the schema inference
+        raise HTTPException(status_code=422, detail=f"Result cannot be encoded as {fmt}: {e}")
+
+    logger.info("Streaming result %s as %s (chunk_size=%d)", result_id, fmt, chunk_size)
+    return StreamingResponse(chunks, media_type=STREAM_MEDIA_TYPES[fmt])
+
+
+@router.get("/results/{result_id}/download")
+async def download_stored_result(
+    result_id: str,
+    format: str = Query("parquet", description="One of xlsx, parquet, feather, csv.gz"),
+):
+    """Downloads a stored result as xlsx, Parquet, Arrow IPC/Feather or gzip CSV (generated once, then cached)."""
+    entry = _get_result_or_404(result_id)
+    try:
+        # writing parquet/xlsx of a large result takes seconds; keep it off the event loop
+        path, media_type = await asyncio.to_thread(export_result, result_id, entry, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExportError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ResultEvicted:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return FileResponse(path, filename=os.path.basename(path), media_type=media_type)
@@ -1,42 +1,33 @@
-
 import os
-import google.generativeai as genai
+from typing import Optional
 from fastapi import HTTPException
 from app.core.logger import get_logger
+from app.services.llm_backends import LLMBackend
+from app.services.llm_client import MODEL_NAME, LLMError, CircuitOpenError, get_llm_client, set_llm_client, build_client_from_env
 
 logger = get_logger(__name__)
 logger.info("LOADED: %s", os.path.abspath(__file__))
 
-# Configure Gemini api key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-MODEL_NAME = "models/gemini-2.5-flash" # using 2.5 flash model since it is good in json creation and understanding natural text.
 
-def generate_text(prompt: str, model: str = MODEL_NAME):
-    """Sends a prompt to the Gemini API and returns the generated JSON response text."""
+def generate_text(prompt: str, model: str = MODEL_NAME, **generation_config):
+    """Sends a prompt to the Gemini API and returns the generated JSON response text.
 
+    Goes through the pooled LLM client, so the call is bounded by its deadline, retried with jitter
+    and short-circuited while the backend is degraded. Extra kwargs (temperature, max_output_tokens, ...)
+    override the default generation config.
+    """
     try:
-        model_instance = genai.GenerativeModel(model)
-        response = model_instance.generate_content(
-            [prompt],
-            generation_config={
-                "temperature": 0, 
-                "response_mime_type": "application/json"
-            },
-        )
+        return get_llm_client().generate(prompt, model=model, **generation_config)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=f"Error calling Gemini API: {e}")
+    except LLMError as e:
+        raise HTTPException(status_code=500, detail=f"Error calling Gemini API: {e}")
+    except Exception as e:
+        # the client turns backend failures (LLMBackendError, timeouts) into LLMError; anything else is a bug
+        logger.exception("Unexpected error in the LLM client: %s", e)
+        raise HTTPException(status_code=500, detail=f"Unexpected error while calling Gemini API: {e}")
 
-        # Handle all possible response types
-        if hasattr(response, "text") and response.text:
-            return response.text
-        elif getattr(response, "candidates", None):
-            for c in response.candidates:
-                if c.content and c.content.parts:
-                    part = c.content.parts[0]
-                    if hasattr(part, "text") and part.text:
-                        return part.text
-                    if hasattr(part, "data") and part.data:
-                        return part.data.decode("utf-8")
-        raise HTTPException(status_code=500, detail="Gemini returned empty response.")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini API: {e}")
\ No newline at end of file
+def use_backend(backend: Optional[LLMBackend]) -> None:
+    """Swaps the backend behind generate_text (e.g. a ReplayBackend for offline runs). None restores the env default."""
+    set_llm_client(build_client_from_env(backend) if backend is not None else None)
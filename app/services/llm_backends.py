@@ -0,0 +1,287 @@
+import abc
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import http.client
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LLMBackendError(Exception):
+    """Raised by a backend when the LLM call failed. `retryable` tells the client whether to try again."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LLMBackend(abc.ABC):
+    """Interface every LLM backend implements. Backends are blocking; the LLM client adds deadlines,
+    retries and hedging on top."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def generate(self, prompt: str, model: str, generation_config: Dict[str, Any], timeout: float) -> str:
+        """Returns the generated text, or raises LLMBackendError. Must give up after `timeout` seconds."""
+
+    def warm(self, model: str) -> None:
+        """Does the one-off setup of the first call (imports, clients) ahead of time. Optional."""
+
+
+def extract_response_text(response: Any) -> Optional[str]:
+    """Pulls the generated text out of a google.generativeai response object."""
+    if hasattr(response, "text") and response.text:
+        return response.text
+    elif getattr(response, "candidates", None):
+        for c in response.candidates:
+            if c.content and c.content.parts:
+                part = c.content.parts[0]
+                if hasattr(part, "text") and part.text:
+                    return part.text
+                if hasattr(part, "data") and part.data:
+                    return part.data.decode("utf-8")
+    return None
+
+
+# SDK errors that fail the same way on every attempt: bad or missing credentials and rejected requests
+_PERMANENT_SDK_ERRORS = {
+    "DefaultCredentialsError", "Unauthenticated", "PermissionDenied",
+    "InvalidArgument", "NotFound", "FailedPrecondition",
+}
+
+
+def _sdk_error_retryable(error: Exception) -> bool:
+    """Same rule as HTTPBackend: 429 and 5xx (and transport errors) are retried, other client errors are not.
+
+    google.api_core exceptions carry the HTTP status as `code`; the class names are checked too so
+    credential errors raised before any request was sent are caught without importing the SDK here."""
+    if type(error).__name__ in _PERMANENT_SDK_ERRORS:
+        return False
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and 400 <= code < 500:
+        return code == 429
+    return True
+
+
+class GeminiSDKBackend(LLMBackend):
+    """Calls Gemini through google.generativeai, reusing one GenerativeModel per model name."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._genai = None
+
+    def _model(self, model: str):
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key or os.getenv("GEMINI_API_KEY"))
+                self._genai = genai
+            if model not in self._models:
+                self._models[model] = self._genai.GenerativeModel(model)
+            return self._models[model]
+
+    def warm(self, model: str) -> None:
+        # importing google.generativeai takes most of a second; pay it before the first query does
+        self._model(model)
+
+    def generate(self, prompt: str, model: str, generation_config: Dict[str, Any], timeout: float) -> str:
+        try:
+            response = self._model(model).generate_content(
+                [prompt],
+                generation_config=generation_config,
+                request_options={"timeout": timeout},
+            )
+        except Exception as e:
+            raise LLMBackendError(f"Error calling Gemini API: {e}", retryable=_sdk_error_retryable(e))
+        text = extract_response_text(response)
+        if not text:
+            raise LLMBackendError("Gemini returned empty response.")
+        return text
+
+
+class HTTPBackend(LLMBackend):
+    """Calls a Gemini-compatible REST endpoint (`POST {base_url}/v1beta/{model}:generateContent`).
+
+    Keeps one keep-alive connection per thread. Pointing base_url at a local stub server makes the
+    whole client stack testable offline.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip("/")
+        self.api_key = api_key
+        self._local = threading.local()
+
+    def _connection(self, timeout: float):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn_cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = conn_cls(self.netloc, timeout=timeout)
+            self._local.conn = conn
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def generate(self, prompt: str, model: str, generation_config: Dict[str, Any], timeout: float) -> str:
+        model_path = model if model.startswith("models/") else f"models/{model}"
+        path = f"{self.base_path}/v1beta/{model_path}:generateContent"
+        body = json.dumps({
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": generation_config,
+        })
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["x-goog-api-key"] = self.api_key
+
+        try:
+            conn = self._connection(timeout)
+            conn.request("POST", path, body=body, headers=headers)
+            resp = conn.getresponse()
+            payload = resp.read()
+        except Exception as e:
+            self._drop_connection()
+            raise LLMBackendError(f"HTTP call to LLM failed: {e}")
+
+        if resp.status >= 400:
+            # 429 and 5xx are worth retrying, other client errors are not
+            retryable = resp.status == 429 or resp.status >= 500
+            raise LLMBackendError(f"LLM endpoint returned {resp.status}: {payload[:200]!r}", retryable=retryable)
+        try:
+            data = json.loads(payload)
+            return data["candidates"][0]["content"]["parts"][0]["text"]
+        except Exception:
+            raise LLMBackendError("LLM endpoint returned an unexpected payload.")
+
+
+def prompt_key(prompt: str, model: str, generation_config: Dict[str, Any]) -> str:
+    """Stable key of one LLM request, used to match recordings on replay."""
+    raw = json.dumps({"prompt": prompt, "model": model, "config": generation_config}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RecordingBackend(LLMBackend):
+    """Wraps another backend and appends every prompt -> response pair (with its latency) to a JSONL file."""
+
+    name = "record"
+
+    def __init__(self, inner: LLMBackend, path: str):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def generate(self, prompt: str, model: str, generation_config: Dict[str, Any], timeout: float) -> str:
+        start = time.perf_counter()
+        text = self.inner.generate(prompt, model, generation_config, timeout)
+        record = {
+            "key": prompt_key(prompt, model, generation_config),
+            "model": model,
+            "prompt": prompt,
+            "response": text,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        return text
+
+
+class ReplayBackend(LLMBackend):
+    """Answers from a recording made by RecordingBackend, with injected latency.
+
+    Latency is `latency_ms` (+ uniform jitter) or, with use_recorded_latency, the latency captured at
+    record time. Prompts that were never recorded fail (non-retryable) unless a `fallback` text is given.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 use_recorded_latency: bool = False, fallback: Optional[str] = None, seed: Optional[int] = None):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.use_recorded_latency = use_recorded_latency
+        self.fallback = fallback
+        self._random = random.Random(seed)
+        self._records: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records.setdefault(record["key"], []).append(record)
+        logger.info("Replay backend loaded %d recorded prompts from %s", len(self._records), path)
+
+    def _delay(self, record: Optional[Dict[str, Any]]) -> float:
+        base = record["latency_ms"] if (self.use_recorded_latency and record) else self.latency_ms
+        jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(base + jitter, 0.0) / 1000
+
+    def generate(self, prompt: str, model: str, generation_config: Dict[str, Any], timeout: float) -> str:
+        key = prompt_key(prompt, model, generation_config)
+        with self._lock:
+            records = self._records.get(key)
+            record = None
+            if records:
+                # repeated prompts cycle through their recorded responses in order
+                i = self._cursor.get(key, 0)
+                record = records[i % len(records)]
+                self._cursor[key] = i + 1
+
+        delay = self._delay(record)
+        if delay > timeout:
+            time.sleep(timeout)
+            raise LLMBackendError(f"Replayed LLM call exceeded timeout of {timeout:.2f}s")
+        time.sleep(delay)
+
+        if record is not None:
+            return record["response"]
+        if self.fallback is not None:
+            return self.fallback
+        raise LLMBackendError("No recorded response for this prompt", retryable=False)
+
+
+def build_backend_from_env() -> LLMBackend:
+    """Creates the backend selected by LLM_BACKEND (gemini, http, record or replay)."""
+    kind = os.getenv("LLM_BACKEND", "").strip().lower()
+    base_url = os.getenv("GEMINI_BASE_URL")
+    api_key = os.getenv("GEMINI_API_KEY")
+
+    if kind == "replay":
+        return ReplayBackend(
+            os.getenv("LLM_REPLAY_PATH", "llm_recordings.jsonl"),
+            latency_ms=float(os.getenv("LLM_REPLAY_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("LLM_REPLAY_JITTER_MS", "0")),
+            use_recorded_latency=os.getenv("LLM_REPLAY_USE_RECORDED_LATENCY", "").lower() in ("1", "true", "yes"),
+            fallback=os.getenv("LLM_REPLAY_FALLBACK"),
+        )
+
+    live = HTTPBackend(base_url, api_key=api_key) if (kind == "http" or base_url) else GeminiSDKBackend(api_key=api_key)
+    if kind == "record":
+        return RecordingBackend(live, os.getenv("LLM_RECORD_PATH", "llm_recordings.jsonl"))
+    return live
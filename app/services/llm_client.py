@@ -0,0 +1,285 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.core.logger import get_logger
+from app.services.llm_backends import LLMBackend, LLMBackendError, build_backend_from_env
+
+logger = get_logger(__name__)
+
+MODEL_NAME = "models/gemini-2.5-flash" # using 2.5 flash model since it is good in json creation and understanding natural text.
+
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 0,
+    "response_mime_type": "application/json",
+}
+
+
+class LLMError(Exception):
+    """The LLM call failed after all retries or ran out of its latency budget."""
+
+
+class CircuitOpenError(LLMError):
+    """The circuit breaker is open, the backend is considered degraded."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one probe through after `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("LLM circuit breaker opened after %d failures", self.failures)
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Async LLM client with per-call deadlines, hedged requests, jittered retries and a circuit breaker.
+
+    The backend is a blocking LLMBackend (see llm_backends). Calls run
+    on a bounded thread pool so the event loop is never blocked.
+
+    The planner and derivation code is synchronous and runs on worker threads (plan_flight,
+    asyncio.to_thread), so routes reach the client through `generate`, which drives `agenerate` on
+    the client's own loop; async callers can await `agenerate` directly.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        deadline: float = 30.0,
+        max_attempts: int = 3,
+        hedge_after: Optional[float] = None,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        breaker: Optional[CircuitBreaker] = None,
+        max_workers: int = 16,
+    ):
+        self.backend = backend
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.hedge_after = hedge_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "failures": 0, "rejected": 0}
+
+    async def agenerate(self, prompt: str, model: str = MODEL_NAME, deadline: Optional[float] = None, **generation_config) -> str:
+        """Generates text for prompt, retrying and hedging within `deadline` seconds."""
+        if self._closed:
+            raise LLMError("LLM client is closed")
+        if not self.breaker.allow():
+            self.stats["rejected"] += 1
+            raise CircuitOpenError("LLM backend unavailable (circuit open)")
+
+        config = {**DEFAULT_GENERATION_CONFIG, **generation_config}
+        loop = asyncio.get_running_loop()
+        budget_end = loop.time() + (deadline or self.deadline)
+        self.stats["calls"] += 1
+        last_error: Optional[BaseException] = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            remaining = budget_end - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                text = await self._hedged_call(prompt, model, config, remaining)
+                self.breaker.record_success()
+                return text
+            except asyncio.TimeoutError:
+                last_error = LLMError(f"LLM call exceeded its {deadline or self.deadline:.1f}s deadline")
+                self.breaker.record_failure()
+                break
+            except LLMBackendError as e:
+                last_error = e
+                self.breaker.record_failure()
+                if not e.retryable:
+                    break
+
+            # full jitter backoff, only if it still fits into the budget
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+            if attempt == self.max_attempts or loop.time() + delay >= budget_end:
+                break
+            self.stats["retries"] += 1
+            logger.warning("LLM attempt %d failed (%s), retrying in %.2fs", attempt, last_error, delay)
+            await asyncio.sleep(delay)
+
+        self.stats["failures"] += 1
+        if isinstance(last_error, LLMError):
+            raise last_error
+        raise LLMError(str(last_error) if last_error else "LLM latency budget exhausted")
+
+    async def _hedged_call(self, prompt: str, model: str, config: Dict[str, Any], remaining: float) -> str:
+        """Runs one attempt; if it is still pending after `hedge_after`, races a duplicate request against it."""
+        loop = asyncio.get_running_loop()
+        end = loop.time() + remaining
+
+        def start():
+            timeout = max(end - loop.time(), 0.001)
+            return asyncio.ensure_future(
+                loop.run_in_executor(self._executor, self.backend.generate, prompt, model, config, timeout)
+            )
+
+        pending = {start()}
+        hedged = not self.hedge_after or self.hedge_after >= remaining
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                wait_for = end - loop.time()
+                if not hedged:
+                    wait_for = min(wait_for, self.hedge_after)
+                if wait_for <= 0:
+                    raise asyncio.TimeoutError()
+                done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not done and not hedged:
+                    hedged = True
+                    self.stats["hedges"] += 1
+                    logger.info("LLM call slower than %.2fs, sending hedged request", self.hedge_after)
+                    pending.add(start())
+                elif not done:
+                    raise asyncio.TimeoutError()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._closed:
+                raise LLMError("LLM client is closed")
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=_run_loop, args=(self._loop,), name="llm-client-loop", daemon=True).start()
+            return self._loop
+
+    def close(self) -> None:
+        """Stops the client's loop thread and shuts down its worker pool. Calls already in flight on the
+        loop finish first; new calls raise LLMError. Does not block."""
+        with self._loop_lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, self._loop = self._loop, None
+        if loop is None:
+            self._executor.shutdown(wait=False)
+        else:
+            asyncio.run_coroutine_threadsafe(self._drain(), loop)
+
+    async def _drain(self) -> None:
+        current = asyncio.current_task()
+        pending = [t for t in asyncio.all_tasks() if t is not current]
+        if pending:
+            await asyncio.wait(pending)
+        self._executor.shutdown(wait=False)
+        asyncio.get_running_loop().stop()
+
+    def generate(self, prompt: str, model: str = MODEL_NAME, deadline: Optional[float] = None, **generation_config) -> str:
+        """Blocking facade over agenerate, usable from sync code and worker threads."""
+        loop = self._background_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self.agenerate(prompt, model=model, deadline=deadline, **generation_config), loop,
+        )
+        return future.result()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    loop.run_forever()
+    loop.close()
+
+
+def build_client_from_env(backend: Optional[LLMBackend] = None) -> LLMClient:
+    """Creates the client configured by LLM_* env vars, around `backend` or the one selected by LLM_BACKEND."""
+    backend = backend or build_backend_from_env()
+    hedge_after = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0")) or None
+    return LLMClient(
+        backend,
+        deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "30")),
+        max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+        hedge_after=hedge_after,
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+        ),
+    )
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Returns the process-wide client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = build_client_from_env()
+        return _client
+
+
+def set_llm_client(client: Optional[LLMClient]) -> None:
+    """Replaces the process-wide client (None resets it to the env configuration) and closes the old one."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    if previous is not None and previous is not client:
+        previous.close()
+
+
+def warm_llm_client(model: str = MODEL_NAME) -> None:
+    """Creates the process-wide client and lets its backend do its first-call setup (SDK import)."""
+    try:
+        get_llm_client().backend.warm(model)
+    except Exception as e:
+        logger.warning("LLM client warm-up failed, the first call will retry it: %s", e)
+
+
+def current_llm_client() -> Optional[LLMClient]:
+    """The process-wide client if one was created, without creating it (for metrics)."""
+    return _client
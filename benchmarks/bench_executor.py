@@ -0,0 +1,188 @@
+"""Executor micro-benchmarks: time and peak memory of every operation across dataset sizes.
+
+    python -m benchmarks.bench_executor                              # 1k and 10k rows, compare to baseline
+    python -m benchmarks.bench_executor --sizes 1000,1000000,10000000 --ops aggregate,filter
+    python -m benchmarks.bench_executor --save-baseline              # record a new baseline
+
+Each case runs `--repeat` times for timing and once more under tracemalloc for peak memory.
+Results are compared to the stored baseline. A case regresses when its median time or peak memory
+grows by more than the threshold (and by more than the absolute noise floor). The exit status is 1
+on regression, so the suite can gate CI.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.executor import execute_plan
+from app.core.executor_helpers import _do_aggregate, _do_filter, _do_join, _do_pivot, _do_text_analysis
+from app.data_generation.scalable_generator import SCHEMAS, generate_frame
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_executor.json")
+DEFAULT_SIZES = [1_000, 10_000]
+# the export step copies the input workbook and writes cell by cell, so it is capped separately
+EXPORT_MAX_ROWS = 10_000
+# differences below these are noise, whatever the relative change
+MIN_TIME_DELTA = 0.005
+MIN_MEMORY_DELTA = 1 << 20
+
+
+def make_dataset(rows: int, cols: int = 20, seed: int = 42) -> pd.DataFrame:
+    """Sales-shaped frame with `rows` rows; columns beyond the 20 built-in ones are extra float metrics."""
+    df = generate_frame(SCHEMAS["sales"], rows, seed=seed)
+    rng = np.random.default_rng(seed)
+    for i in range(max(cols - df.shape[1], 0)):
+        df[f"Metric_{i}"] = rng.normal(100, 15, rows).round(2)
+    return df
+
+
+def _warehouses() -> Dict[str, pd.DataFrame]:
+    return {"warehouses": pd.DataFrame({"Warehouse": ["A", "B", "C", "D"], "WarehouseCity": ["Pune", "Delhi", "Chennai", "Mumbai"]})}
+
+
+def _export_case(df: pd.DataFrame, workdir: str) -> Callable[[], Any]:
+    input_path = os.path.join(workdir, f"bench_input_{len(df)}.xlsx")
+    if not os.path.exists(input_path):
+        df.to_excel(input_path, index=False)
+    plan = {"operation": "math", "input_path": input_path,
+            "parameters": {"formula": "Quantity * UnitPrice", "new_column": "Revenue"}}
+    return lambda: execute_plan(df.copy(), plan)
+
+
+# name -> builder(df, workdir) returning the zero-argument callable that is timed
+CASES: Dict[str, Callable[[pd.DataFrame, str], Callable[[], Any]]] = {
+    "aggregate": lambda df, _: lambda: _do_aggregate(df, {"column": "UnitPrice", "group_by": "Region", "method": "sum"}),
+    "aggregate_high_cardinality": lambda df, _: lambda: _do_aggregate(
+        df, {"column": "Profit", "group_by": "CustomerName", "method": "mean", "sort_by": "Profit_mean", "order": "desc", "limit": 10}),
+    "filter": lambda df, _: lambda: _do_filter(df, {"column": "Region", "operator": "==", "value": "East"}),
+    "filter_contains": lambda df, _: lambda: _do_filter(df, {"column": "PaymentMethod", "operator": "contains", "value": "card"}),
+    "pivot": lambda df, _: lambda: _do_pivot(df, {"index": "Region", "columns": "ProductCategory", "values": "Profit", "aggfunc": "sum"}),
+    "join": lambda df, _: lambda: _do_join(df, {"right_table": "warehouses", "on": "Warehouse", "left_on": "Warehouse",
+                                                "right_on": "Warehouse", "how": "left"}, _warehouses()),
+    "text_analysis": lambda df, _: lambda: _do_text_analysis(df.copy(), {"column": "Feedback", "op": "sentiment"}),
+    "execute_plan_export": _export_case,
+}
+
+
+def measure(func: Callable[[], Any], repeat: int = 3) -> Dict[str, Any]:
+    """Median/min wall time over `repeat` runs plus peak traced memory of one extra run."""
+    times = []
+    status = "ok"
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        times.append(time.perf_counter() - start)
+        if isinstance(out, dict) and out.get("status") not in (None, "ok"):
+            status = f"error: {out.get('message')}"
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"time_median_s": statistics.median(times), "time_min_s": min(times), "peak_memory_bytes": peak, "status": status}
+
+
+def run_suite(sizes: List[int], ops: Optional[List[str]] = None, cols: int = 20, repeat: int = 3,
+              workdir: Optional[str] = None, export_max_rows: int = EXPORT_MAX_ROWS, log=print) -> Dict[str, Dict[str, Any]]:
+    """Runs every selected case for every size; keys are "<case>:<rows>x<cols>"."""
+    ops = ops or list(CASES)
+    unknown = [op for op in ops if op not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {unknown}")
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_executor_")
+    results = {}
+    cwd = os.getcwd()
+    # the executor writes result workbooks to ./results; keep them out of the repository
+    os.chdir(workdir)
+    try:
+        for rows in sizes:
+            df = make_dataset(rows, cols)
+            for op in ops:
+                if op == "execute_plan_export" and rows > export_max_rows:
+                    continue
+                key = f"{op}:{rows}x{df.shape[1]}"
+                results[key] = {"op": op, "rows": rows, "cols": df.shape[1], **measure(CASES[op](df, workdir), repeat)}
+                r = results[key]
+                log(f"{key:<45} {r['time_median_s'] * 1000:>10.1f} ms {r['peak_memory_bytes'] / 2**20:>9.1f} MiB  {r['status']}")
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                        time_threshold: float = 0.25, memory_threshold: float = 0.25) -> List[str]:
+    """Returns one message per case whose time or peak memory regressed beyond the thresholds."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        t_now, t_base = current["time_median_s"], base["time_median_s"]
+        if t_now > t_base * (1 + time_threshold) and t_now - t_base > MIN_TIME_DELTA:
+            regressions.append(f"{key}: time {t_base * 1000:.1f} ms -> {t_now * 1000:.1f} ms (+{(t_now / t_base - 1) * 100:.0f}%)")
+        m_now, m_base = current["peak_memory_bytes"], base["peak_memory_bytes"]
+        if m_now > m_base * (1 + memory_threshold) and m_now - m_base > MIN_MEMORY_DELTA:
+            regressions.append(f"{key}: peak memory {m_base / 2**20:.1f} MiB -> {m_now / 2**20:.1f} MiB (+{(m_now / m_base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark executor operations and gate on regressions.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated row counts (up to 10M)")
+    parser.add_argument("--cols", type=int, default=20, help="total columns; extra ones are float metrics")
+    parser.add_argument("--ops", help=f"comma-separated subset of {','.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--export-max-rows", type=int, default=EXPORT_MAX_ROWS)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--time-threshold", type=float, default=float(os.getenv("BENCH_TIME_THRESHOLD", "0.25")))
+    parser.add_argument("--memory-threshold", type=float, default=float(os.getenv("BENCH_MEMORY_THRESHOLD", "0.25")))
+    parser.add_argument("--output", help="also write the results as JSON to this path")
+    parser.add_argument("--verbose", action="store_true", help="keep the executor's INFO logs (slower)")
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    ops = args.ops.split(",") if args.ops else None
+    results = run_suite(sizes, ops, cols=args.cols, repeat=args.repeat, export_max_rows=args.export_max_rows)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.time_threshold, args.memory_threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
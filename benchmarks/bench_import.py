@@ -0,0 +1,111 @@
+"""Cold-start benchmark: how long a fresh interpreter takes to import the app, and what it pulls in.
+
+    python -m benchmarks.bench_import                        # app.main, 5 fresh interpreters
+    python -m benchmarks.bench_import --module app.core.executor --runs 10
+    python -m benchmarks.bench_import --max-seconds 1.5      # exit 1 if the median import is slower
+
+Every run is a new subprocess, so nothing is warm except the OS file cache. One extra run under
+`python -X importtime` attributes the time to top-level packages, and the report lists which of the
+known heavy dependencies were loaded by the import at all.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+# dependencies that should only load when a request needs them
+HEAVY_MODULES = ("google.generativeai", "openpyxl", "faker", "matplotlib", "scipy")
+
+_TIMED_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def time_import(module: str, python: str = sys.executable) -> Dict[str, Any]:
+    """Imports `module` in a fresh interpreter; returns seconds taken and the heavy modules it loaded."""
+    code = _TIMED_IMPORT.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([python, "-c", code], capture_output=True, text=True, env=_env(), check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Self time in seconds per top-level package, from `python -X importtime` output."""
+    totals: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        package = parts[2].strip().split(".")[0]
+        totals[package] = totals.get(package, 0.0) + int(parts[0]) / 1e6
+    return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+
+def import_breakdown(module: str, python: str = sys.executable) -> Dict[str, float]:
+    out = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                         capture_output=True, text=True, env=_env(), check=True)
+    return parse_importtime(out.stderr)
+
+
+def run(module: str, runs: int, top: int = 15) -> Dict[str, Any]:
+    samples = [time_import(module) for _ in range(runs)]
+    seconds = [s["seconds"] for s in samples]
+    breakdown = import_breakdown(module)
+    return {
+        "module": module,
+        "runs": runs,
+        "median_s": round(statistics.median(seconds), 4),
+        "min_s": round(min(seconds), 4),
+        "max_s": round(max(seconds), 4),
+        "heavy_modules_loaded": samples[-1]["loaded"],
+        "top_packages_s": {k: round(v, 4) for k, v in list(breakdown.items())[:top]},
+    }
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    lines = [
+        f"import {result['module']}: median {result['median_s'] * 1000:.0f} ms "
+        f"(min {result['min_s'] * 1000:.0f}, max {result['max_s'] * 1000:.0f}) over {result['runs']} runs",
+        f"heavy modules loaded: {', '.join(result['heavy_modules_loaded']) or 'none'}",
+        "self time by package:",
+    ]
+    lines += [f"  {name:<24}{seconds * 1000:8.1f} ms" for name, seconds in result["top_packages_s"].items()]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the app.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the breakdown")
+    parser.add_argument("--max-seconds", type=float, help="fail when the median import takes longer")
+    parser.add_argument("--output", help="also write the result as JSON to this path")
+    args = parser.parse_args(argv)
+
+    result = run(args.module, args.runs, args.top)
+    print(format_report(result))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.max_seconds is not None and result["median_s"] > args.max_seconds:
+        print(f"FAIL: median import {result['median_s']:.3f}s exceeds {args.max_seconds:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
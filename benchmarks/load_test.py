@@ -0,0 +1,251 @@
+"""End-to-end load test of the API with a stubbed LLM.
+
+    python -m benchmarks.load_test                                   # 200 requests, concurrency 8
+    python -m benchmarks.load_test --requests 2000 --concurrency 64 --llm-latency-ms 1200 --workers 4
+    python -m benchmarks.load_test --mix query=80,analyze_excel=20 --rows 100000
+    python -m benchmarks.load_test --url http://staging:8000           # against a running deployment
+
+Unless --url is given, the harness starts a stub Gemini server (benchmarks.stub_llm) and the app under
+uvicorn in a scratch directory, pointed at the stub through LLM_BACKEND=http. The fast-path planner and
+the plan cache are off by default, so every query pays the configured LLM latency like an uncached
+production query; turn them back on with --fast-planner / --plan-cache.
+
+The workload is a weighted mix of /upload, /query, /analyze_excel and /analyze_and_query requests
+against a generated sales workbook, replayed by `--concurrency` workers. The report has latency
+percentiles and throughput per endpoint and overall, the per-stage breakdown of /query (from the
+response "timings"), plus the stub's LLM call count and latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from app.data_generation.scalable_generator import SCHEMAS, write_dataset
+from benchmarks.stub_llm import StubLLMServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_NAME = "loadtest_sales.xlsx"
+DEFAULT_MIX = {"query": 70, "analyze_excel": 15, "upload": 10, "analyze_and_query": 5}
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# queries against the sales schema, a mix of the shapes users ask most
+QUERIES = [
+    "total Profit by Region",
+    "average UnitPrice by ProductCategory",
+    "top 5 CustomerName by Profit",
+    "count of OrderID by PaymentMethod",
+    "show rows where Region is East",
+    "rows where Quantity > 40",
+    "maximum ShippingCost by Warehouse",
+    "bottom 3 City by average CustomerRating",
+    "sum of Quantity",
+    "describe the data",
+]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """"query=70,upload=10" -> {"query": 70.0, "upload": 10.0}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown request kind '{name}', expected one of {sorted(DEFAULT_MIX)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def make_workbook(path: str, rows: int, seed: int = 42) -> bytes:
+    write_dataset(SCHEMAS["sales"], rows, path, fmt="xlsx", seed=seed)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _send(client: httpx.AsyncClient, kind: str, i: int, workbook: bytes, rng: random.Random):
+    if kind == "query":
+        return await client.post("/api/v1/query", json={"filename": DATASET_NAME, "query": rng.choice(QUERIES), "timings": True})
+    if kind == "analyze_excel":
+        return await client.get("/api/v1/analyze_excel", params={"filename": DATASET_NAME})
+    # uploads get their own names so a half-written file is never read by another request
+    name = f"loadtest_{kind}_{i}.xlsx"
+    if kind == "upload":
+        return await client.post("/api/v1/upload", files={"file": (name, workbook, XLSX_MIME)})
+    return await client.post("/api/v1/analyze_and_query", files={"file": (name, workbook, XLSX_MIME)},
+                             data={"query": rng.choice(QUERIES)})
+
+
+async def run_load(client: httpx.AsyncClient, workbook: bytes, mix: Dict[str, float], requests: int = 200,
+                   concurrency: int = 8, seed: int = 0) -> Dict[str, Any]:
+    """Uploads the dataset once, then replays `requests` requests drawn from the mix with `concurrency`
+    workers. Returns the raw per-request records and the wall time of the run."""
+    warmup = await client.post("/api/v1/upload", files={"file": (DATASET_NAME, workbook, XLSX_MIME)})
+    warmup.raise_for_status()
+
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    schedule = rng.choices(kinds, weights=weights, k=requests)
+    records: List[Dict[str, Any]] = []
+    cursor = iter(enumerate(schedule))
+
+    async def worker(worker_id: int):
+        worker_rng = random.Random(seed * 1000 + worker_id)
+        for i, kind in cursor:
+            start = time.perf_counter()
+            try:
+                res = await _send(client, kind, i, workbook, worker_rng)
+                status, error = res.status_code, None if res.status_code < 400 else res.text[:200]
+                stages = res.json().get("timings") if kind == "query" and error is None else None
+            except httpx.HTTPError as e:
+                status, error, stages = 0, str(e), None
+            records.append({"kind": kind, "status": status, "latency_s": time.perf_counter() - start,
+                            "error": error, "stages": stages or {}})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    return {"records": records, "wall_s": time.perf_counter() - start}
+
+
+def _latency_stats(latencies: List[float], wall_s: float) -> Dict[str, Any]:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "throughput_rps": round(len(latencies) / wall_s, 2) if wall_s else 0.0,
+        "mean_ms": round(float(ms.mean()), 1),
+        **{f"p{q}_ms": round(float(np.percentile(ms, q)), 1) for q in (50, 95, 99)},
+        "max_ms": round(float(ms.max()), 1),
+    }
+
+
+def summarize(run: Dict[str, Any], llm: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Latency percentiles and throughput overall and per endpoint, with error counts and samples."""
+    records, wall_s = run["records"], run["wall_s"]
+    report = {"wall_s": round(wall_s, 2), "overall": _latency_stats([r["latency_s"] for r in records], wall_s),
+              "endpoints": {}}
+    report["overall"]["errors"] = sum(1 for r in records if r["error"])
+    for kind in sorted({r["kind"] for r in records}):
+        subset = [r for r in records if r["kind"] == kind]
+        stats = _latency_stats([r["latency_s"] for r in subset], wall_s)
+        errors = [r for r in subset if r["error"]]
+        stats["errors"] = len(errors)
+        if errors:
+            stats["error_sample"] = f"{errors[0]['status']}: {errors[0]['error']}"
+        report["endpoints"][kind] = stats
+    stage_ms: Dict[str, List[float]] = {}
+    for r in records:
+        for stage, ms in r.get("stages", {}).items():
+            stage_ms.setdefault(stage, []).append(ms)
+    report["query_stages"] = {
+        stage: {"count": len(v), "mean_ms": round(float(np.mean(v)), 1), "p95_ms": round(float(np.percentile(v, 95)), 1)}
+        for stage, v in sorted(stage_ms.items())
+    }
+    if llm is not None:
+        report["llm"] = llm
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'endpoint':<20}{'count':>7}{'errors':>8}{'rps':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, s in rows:
+        lines.append(f"{name:<20}{s['count']:>7}{s['errors']:>8}{s['throughput_rps']:>9}{s['mean_ms']:>9}"
+                     f"{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}")
+    if report.get("query_stages"):
+        lines.append("/query stages: " + ", ".join(
+            f"{stage} {s['mean_ms']} ms mean / {s['p95_ms']} ms p95" for stage, s in report["query_stages"].items()))
+    if "llm" in report:
+        llm = report["llm"]
+        lines.append(f"stub LLM: {llm['calls']} calls, {llm['failures']} failures, {llm['mean_latency_ms']} ms mean injected latency")
+    lines.append(f"wall time {report['wall_s']} s")
+    return "\n".join(lines)
+
+
+def start_app(workdir: str, port: int, env: Dict[str, str], workers: int = 1) -> subprocess.Popen:
+    """Runs the app under uvicorn in workdir (uploads/, results/ and server.log land there) and waits for /health."""
+    full_env = {**os.environ, **env, "PYTHONPATH": REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    log_path = os.path.join(workdir, "server.log")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=workdir, env=full_env, stdout=subprocess.DEVNULL, stderr=open(log_path, "wb"),
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+                raise RuntimeError(f"uvicorn exited early: {f.read()[-2000:]}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not become healthy within 60s")
+
+
+async def _drive(url: str, workbook: bytes, args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        return await run_load(client, workbook, parse_mix(args.mix), args.requests, args.concurrency, args.seed)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the API with a stubbed LLM.")
+    parser.add_argument("--url", help="target a running server instead of starting one (the LLM is not stubbed then)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--rows", type=int, default=5_000, help="rows of the generated sales workbook")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request client timeout in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--fast-planner", action="store_true", help="keep the fast-path planner on")
+    parser.add_argument("--plan-cache", action="store_true", help="keep the plan cache on")
+    parser.add_argument("--output", help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    workbook = make_workbook(os.path.join(workdir, DATASET_NAME), args.rows, args.seed)
+    stub, proc, url = None, None, args.url
+    try:
+        if url is None:
+            stub = StubLLMServer(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                                 error_rate=args.llm_error_rate, seed=args.seed).start()
+            env = {"LLM_BACKEND": "http", "GEMINI_BASE_URL": stub.url, "GEMINI_API_KEY": "stub"}
+            env["FAST_PLANNER_MODE"] = "on" if args.fast_planner else "off"
+            if not args.plan_cache:
+                env["PLAN_CACHE_MAX_ENTRIES"] = "0"
+            proc = start_app(workdir, args.port, env, args.workers)
+            url = f"http://127.0.0.1:{args.port}"
+        run = asyncio.run(_drive(url, workbook, args))
+        report = summarize(run, stub.stats() if stub else None)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if stub is not None:
+            stub.stop()
+
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["overall"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Gemini stand-in for load tests: speaks the generateContent REST protocol with configurable latency.
+
+    python -m benchmarks.stub_llm --port 8765 --latency-ms 800 --jitter-ms 200
+    LLM_BACKEND=http GEMINI_BASE_URL=http://127.0.0.1:8765 uvicorn app.main:app
+
+Planner prompts are answered with the fast-path planner's plan for the query (a describe plan when
+no shape matches), verifier prompts with an ok verdict, and derivation prompts with CANNOT_DERIVE
+for every missing column. Every response is delayed by latency +- uniform jitter, and a fraction
+of calls can fail with 503 to exercise retries and the circuit breaker.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from app.core.fast_planner import plan_locally
+
+_QUERY_RE = re.compile(r"User Query: (?P<query>.*?)(?:\n\nAvailable columns \(name:type\): (?P<columns>.*))?$", re.S)
+_BATCH_RE = re.compile(r"User Queries:\n(?P<queries>.*?)(?:\n\nAvailable columns \(name:type\): (?P<columns>.*))?$", re.S)
+_COLUMN_RE = re.compile(r"^(?P<name>.+?):(?:bool|int|float|date|text|cat\()")
+_MISSING_RE = re.compile(r"refers to these missing columns: (?P<missing>.*?)\.\n")
+
+
+def _columns_from_schema(block: str) -> List[str]:
+    block = re.sub(r" \(\+\d+ less relevant columns omitted\)$", "", block.strip())
+    columns = []
+    for item in block.split(", "):
+        m = _COLUMN_RE.match(item)
+        if m:
+            columns.append(m.group("name"))
+        elif item and ":" not in item and not item.endswith(")"):
+            columns.append(item)  # columns without a profile are listed by name only
+    return columns
+
+
+def answer(prompt: str) -> str:
+    """The text a cooperative LLM would return for one of the app's prompts."""
+    missing = _MISSING_RE.search(prompt)
+    if missing:
+        names = re.findall(r'"([^"]+)"', missing.group("missing"))
+        return json.dumps({name: "CANNOT_DERIVE" for name in names})
+    if "Is this result consistent with the user query?" in prompt:
+        return json.dumps({"ok": True, "note": "stub verifier"})
+    batch = _BATCH_RE.search(prompt)
+    if batch:
+        columns = _columns_from_schema(batch.group("columns") or "")
+        queries = [re.sub(r"^\d+\. ", "", line) for line in batch.group("queries").splitlines() if line.strip()]
+        return json.dumps([plan_locally(q, columns)[0] or {"operation": "describe", "parameters": {}} for q in queries])
+    m = _QUERY_RE.search(prompt)
+    if m:
+        columns = _columns_from_schema(m.group("columns") or "")
+        plan, _ = plan_locally(m.group("query").strip(), columns)
+        return json.dumps(plan or {"operation": "describe", "parameters": {}})
+    return json.dumps({"operation": "describe", "parameters": {}})
+
+
+class StubLLMServer:
+    """Threaded HTTP server; `stats()` reports calls, failures and the latency that was injected."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.injected_seconds = 0.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith(":generateContent"):
+                    self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+                delay, fail = stub._next_call()
+                time.sleep(delay)
+                if fail:
+                    self._send(503, {"error": {"message": "stub overloaded"}})
+                    return
+                prompt = body["contents"][0]["parts"][0]["text"]
+                self._send(200, {"candidates": [{"content": {"parts": [{"text": answer(prompt)}]}}]})
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out on this call
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread: Optional[threading.Thread] = None
+
+    def _next_call(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            delay = max(self.latency_ms + jitter, 0.0) / 1000
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            self.calls += 1
+            self.failures += int(fail)
+            self.injected_seconds += delay
+        return delay, fail
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "mean_latency_ms": round(self.injected_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a latency-configurable Gemini stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    args = parser.parse_args(argv)
+    stub = StubLLMServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Stub LLM listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from benchmarks.bench_executor import compare_to_baseline, make_dataset, run_suite
+
+
+def _result(t, mem):
+    return {"time_median_s": t, "peak_memory_bytes": mem}
+
+
+def test_regressions_respect_thresholds_and_noise_floor():
+    baseline = {"aggregate:1000x20": _result(0.100, 10 << 20), "filter:1000x20": _result(0.001, 1 << 20)}
+    current = {
+        "aggregate:1000x20": _result(0.140, 14 << 20),  # +40% time and memory
+        "filter:1000x20": _result(0.002, 1 << 20),      # +100%, but 1 ms is noise
+        "pivot:1000x20": _result(5.0, 1 << 30),          # no baseline
+    }
+    regressions = compare_to_baseline(current, baseline, time_threshold=0.25, memory_threshold=0.25)
+    assert len(regressions) == 2
+    assert all(r.startswith("aggregate:1000x20") for r in regressions)
+    assert compare_to_baseline(current, baseline, time_threshold=0.5, memory_threshold=0.5) == []
+
+
+def test_suite_runs_every_case_on_a_small_dataset(tmp_path):
+    assert make_dataset(100, cols=25).shape == (100, 25)
+    results = run_suite([200], repeat=1, workdir=str(tmp_path), log=lambda *_: None)
+    assert {r["op"] for r in results.values()} == {
+        "aggregate", "aggregate_high_cardinality", "filter", "filter_contains", "pivot", "join",
+        "text_analysis", "execute_plan_export",
+    }
+    assert all(r["status"] == "ok" for r in results.values())
+    assert all(r["peak_memory_bytes"] > 0 for r in results.values())
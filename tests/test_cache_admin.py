@@ -0,0 +1,94 @@
+import os
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.file_manager import dataset_cache, dataset_meta, load_excel_preview
+from app.core.memory_report import frame_memory
+from app.core.result_store import result_store, store_result
+from app.routes import admin_routes
+
+client = TestClient(app, headers={"X-Admin-Token": "test-admin-token"})
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", "test-admin-token")
+
+
+def _upload(name):
+    os.makedirs("uploads", exist_ok=True)
+    path = os.path.join("uploads", name)
+    pd.DataFrame({"Region": ["East", "West"] * 50, "Sales": range(100)}).to_excel(path, index=False)
+    load_excel_preview(path)
+    return path
+
+
+def test_frame_memory_breaks_down_dtypes():
+    df = pd.DataFrame({"a": range(10), "b": [1.5] * 10, "c": ["x" * 100] * 10})
+    report = frame_memory(df)
+    assert report["rows"] == 10 and report["columns"] == 3
+    assert set(report["dtypes"]) == {"int64", "float64", "object"}
+    assert report["dtypes"]["object"]["bytes"] > 1000  # deep counts the strings
+    assert frame_memory(df, deep=False)["dtypes"]["object"]["bytes"] < 1000
+    assert report["bytes"] == sum(d["bytes"] for d in report["dtypes"].values()) + report["index_bytes"]
+
+
+def test_cache_report_lists_datasets_and_evicts():
+    _upload("cache_admin_test.xlsx")
+    client.get("/api/v1/analyze_excel", params={"filename": "cache_admin_test.xlsx"})
+    result_id = store_result(pd.DataFrame({"x": [1, 2]}), source="cache_admin_test.xlsx")
+
+    report = client.get("/api/v1/admin/cache").json()
+    entry = next(d for d in report["datasets"] if d["filename"] == "cache_admin_test.xlsx")
+    sheet = entry["sheets"]["Sheet1"]
+    assert sheet["rows"] == 100 and set(sheet["dtypes"]) == {"object", "int64"}
+    assert entry["hits"] >= 1 and entry["last_access"] is not None
+    assert entry["profiles"]["Sheet1"] > 0
+    assert [r["result_id"] for r in entry["results"]] == [result_id]
+    assert entry["bytes"] >= sheet["bytes"]
+
+    assert client.delete("/api/v1/admin/cache/datasets/cache_admin_test.xlsx/profiles").json()["profiles_removed"] == 1
+    out = client.delete("/api/v1/admin/cache/datasets/cache_admin_test.xlsx", params={"include_results": True}).json()
+    assert out["evicted"] and out["results_removed"] == [result_id]
+    assert "cache_admin_test.xlsx" not in dataset_cache and result_id not in result_store
+    assert client.get("/api/v1/admin/cache/datasets/cache_admin_test.xlsx").status_code == 404
+    assert client.delete("/api/v1/admin/cache/datasets/cache_admin_test.xlsx").status_code == 404
+
+    # evicted files are reloaded from disk on the next request
+    assert client.get("/api/v1/analyze_excel", params={"filename": "cache_admin_test.xlsx"}).status_code == 200
+    assert "cache_admin_test.xlsx" in dataset_cache
+
+
+def test_evict_single_result():
+    result_id = store_result(pd.DataFrame({"x": [1]}), source="elsewhere.xlsx")
+    assert any(r["result_id"] == result_id for r in client.get("/api/v1/admin/cache").json()["other_results"])
+    assert client.delete(f"/api/v1/admin/cache/results/{result_id}").status_code == 200
+    assert client.delete(f"/api/v1/admin/cache/results/{result_id}").status_code == 404
+
+
+def test_prompt_profiles_live_with_the_file_content():
+    from app.routes.query_routes import _prompt_profile
+    path = _upload("cache_admin_prompt_test.xlsx")
+    df = dataset_cache["cache_admin_prompt_test.xlsx"]["Sheet1"]
+    profile = _prompt_profile("cache_admin_prompt_test.xlsx", "Sheet1", df)
+    assert profile["Region"]["type"] == "cat"
+    assert _prompt_profile("cache_admin_prompt_test.xlsx", "Sheet1", df) is profile
+    assert client.get("/api/v1/admin/cache").json()["prompt_profiles_cached"] >= 1
+
+    # new content under the same name starts with no profiles
+    pd.DataFrame({"Region": ["East"], "Units": [1]}).to_excel(path, index=False)
+    load_excel_preview(path)
+    assert dataset_meta["cache_admin_prompt_test.xlsx"]["profiles"] == {}
+
+
+def test_state_changing_endpoints_need_the_admin_token(monkeypatch):
+    result_id = store_result(pd.DataFrame({"x": [1]}), source="elsewhere.xlsx")
+    anonymous = TestClient(app)
+    assert anonymous.delete(f"/api/v1/admin/cache/results/{result_id}").status_code == 401
+    assert anonymous.delete("/api/v1/admin/plan_cache", headers={"X-Admin-Token": "guess"}).status_code == 401
+    assert anonymous.get("/api/v1/admin/cache").status_code == 200  # reports stay readable
+
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", "")
+    assert client.delete(f"/api/v1/admin/cache/results/{result_id}").status_code == 403
+    assert result_id in result_store
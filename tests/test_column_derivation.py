@@ -0,0 +1,94 @@
+import json
+import logging
+import threading
+import pandas as pd
+import pytest
+from collections import OrderedDict
+from app.core import executor_helpers
+from app.core.executor_helpers import derive_missing_columns_with_llm
+
+logger = logging.getLogger(__name__)
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+    def fake_generate(prompt):
+        calls.append(prompt)
+        return json.dumps({"Revenue": "Quantity * UnitPrice", "Cost": "UnitPrice * 0.5", "Margin": "CANNOT_DERIVE"})
+    monkeypatch.setattr(executor_helpers, "generate_text", fake_generate)
+    monkeypatch.setattr(executor_helpers, "derivation_cache", OrderedDict())
+    return calls
+
+def _sales():
+    return pd.DataFrame({"Quantity": [1, 2, 3], "UnitPrice": [10.0, 20.0, 30.0]})
+
+def _plan(*cols):
+    return {"operation": "aggregate", "parameters": {"column": list(cols), "method": "sum"}}
+
+def test_missing_columns_are_derived_in_one_call(llm_calls):
+    df, report = derive_missing_columns_with_llm(_plan("Revenue", "Cost", "Margin"), _sales(), logger)
+    assert len(llm_calls) == 1
+    assert df["Revenue"].tolist() == [10.0, 40.0, 90.0]
+    assert df["Cost"].tolist() == [5.0, 10.0, 15.0]
+    assert report["Margin"]["status"] == "skipped"
+    assert report["Revenue"]["source"] == "llm"
+
+def test_derivations_are_cached_per_schema(llm_calls):
+    derive_missing_columns_with_llm(_plan("Revenue", "Margin"), _sales(), logger)
+    df, report = derive_missing_columns_with_llm(_plan("Revenue", "Margin"), _sales(), logger)
+    assert len(llm_calls) == 1
+    assert report["Revenue"] == {"status": "derived", "detail": "applied", "expr": "Quantity * UnitPrice", "source": "cache"}
+    assert report["Margin"]["status"] == "skipped"
+
+    other_schema = _sales().rename(columns={"UnitPrice": "Price"})
+    derive_missing_columns_with_llm(_plan("Revenue"), other_schema, logger)
+    assert len(llm_calls) == 2
+
+def test_materialized_columns_are_reused(llm_calls):
+    cached_df = _sales()
+    derive_missing_columns_with_llm(_plan("Revenue", "Margin"), cached_df, logger)
+    assert "Revenue" in cached_df.columns
+    assert cached_df.attrs["derived_columns"] == ["Revenue"]
+    # the materialized frame still maps to the original schema's cache entries
+    _, report = derive_missing_columns_with_llm(_plan("Revenue", "Margin"), cached_df, logger)
+    assert len(llm_calls) == 1
+    assert "Revenue" not in report
+    assert report["Margin"]["source"] == "cache"
+
+def test_derivation_cache_is_bounded_lru(llm_calls, monkeypatch):
+    monkeypatch.setattr(executor_helpers, "DERIVATION_CACHE_MAX_ENTRIES", 2)
+    derive_missing_columns_with_llm(_plan("Revenue", "Cost", "Margin"), _sales(), logger)
+    assert [col for _, col in executor_helpers.derivation_cache] == ["Margin", "Revenue"]
+    # the evicted decision is asked for again, the cached ones are not
+    _, report = derive_missing_columns_with_llm(_plan("Revenue", "Cost"), _sales(), logger)
+    assert len(llm_calls) == 2 and 'missing columns: "Cost".' in llm_calls[1]
+    assert report["Revenue"]["source"] == "cache" and report["Cost"]["source"] == "llm"
+
+
+def test_llm_derivation_runs_outside_the_sheet_lock(monkeypatch):
+    from app.core.file_manager import sheet_lock
+    from app.routes.query_routes import _derive_and_execute
+    asked, release = threading.Event(), threading.Event()
+
+    def slow_generate(prompt):
+        asked.set()
+        release.wait(5)
+        return json.dumps({"Revenue": "Quantity * UnitPrice"})
+
+    monkeypatch.setattr(executor_helpers, "generate_text", slow_generate)
+    monkeypatch.setattr(executor_helpers, "derivation_cache", OrderedDict())
+    cached = _sales()
+    plan = {"operation": "aggregate", "parameters": {"column": "Revenue", "method": "sum"}}
+    out = {}
+    worker = threading.Thread(target=lambda: out.update(_derive_and_execute(cached, plan, {}, "lock_test.xlsx", "Sheet1")))
+    worker.start()
+    assert asked.wait(5)
+    # other requests on the sheet are not held up while the LLM answers
+    lock = sheet_lock("lock_test.xlsx", "Sheet1")
+    assert lock.acquire(timeout=1)
+    lock.release()
+    release.set()
+    worker.join(5)
+    assert out["status"] == "ok"
+    assert cached["Revenue"].tolist() == [10.0, 40.0, 90.0]
+    assert cached.attrs["derived_columns"] == ["Revenue"]
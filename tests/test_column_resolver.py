@@ -0,0 +1,61 @@
+import logging
+import pandas as pd
+from app.core import executor_helpers
+from app.core.column_resolver import ColumnIndex, resolve_plan_columns
+from app.core.executor_helpers import derive_missing_columns_with_llm
+
+COLUMNS = ["OrderID", "Region", "Payment Method", "UnitPrice", "Quantity"]
+
+
+def test_index_matches_exact_case_and_normalized_only():
+    index = ColumnIndex(COLUMNS + ["Revenue2023", "Sales_2021"])
+    assert index.resolve("Region") == "Region"
+    assert index.resolve("region") == "Region"
+    assert index.resolve("payment_method") == "Payment Method"
+    assert index.resolve("Unit Price") == "UnitPrice"
+    assert index.resolve("sales 2021") == "Sales_2021"
+    assert index.resolve("Revenue") is None
+    # near misses are other columns, not typos of these
+    assert index.resolve("Quantiy") is None
+    assert index.resolve("Revenue2024") is None
+    assert index.resolve("Sales_2022") is None
+
+
+def test_near_miss_columns_are_reported_missing_and_left_alone():
+    plan = {"operation": "aggregate", "parameters": {"column": "Revenue2024", "group_by": "region", "method": "sum"}}
+    out = resolve_plan_columns(plan, ["Region", "Revenue2023"], canonicalize=True)
+    assert out.missing == ["Revenue2024"]
+    assert plan["parameters"] == {"column": "Revenue2024", "group_by": "Region", "method": "sum"}
+
+
+def test_filter_values_and_methods_are_not_columns():
+    plan = {"operation": "filter", "parameters": {"column": "payment method", "operator": "==", "value": "Credit Card"}}
+    out = resolve_plan_columns(plan, COLUMNS, canonicalize=True)
+    assert out.missing == []
+    assert plan["parameters"]["column"] == "Payment Method"
+    assert plan["parameters"]["value"] == "Credit Card"
+
+    agg = {"operation": "aggregate", "parameters": {"column": "Revenue", "group_by": "region", "method": "mean",
+                                                    "sort_by": "Revenue_mean", "order": "desc", "limit": 5}}
+    out = resolve_plan_columns(agg, COLUMNS)
+    assert out.missing == ["Revenue"]
+    assert out.resolved == {"region": "Region"}
+
+
+def test_multi_step_outputs_are_available_to_later_steps():
+    plan = {"operation": "multi_step", "parameters": {"steps": [
+        {"operation": "math", "parameters": {"formula": "Quantity * UnitPrice", "new_column": "Total"}},
+        {"operation": "aggregate", "parameters": {"column": "Total", "group_by": "Region", "method": "sum"}},
+        {"operation": "filter", "parameters": {"column": "Total_sum", "operator": ">", "value": 10}},
+    ]}}
+    assert resolve_plan_columns(plan, COLUMNS).missing == []
+
+
+def test_filter_query_makes_no_derivation_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(executor_helpers, "generate_text", lambda prompt: calls.append(prompt) or "{}")
+    df = pd.DataFrame({"Payment Method": ["Credit Card", "Cash"], "Quantity": [1, 2]})
+    plan = {"operation": "filter", "parameters": {"column": "Payment Method", "operator": "contains", "value": "Credit Card"}}
+    _, report = derive_missing_columns_with_llm(plan, df, logging.getLogger(__name__))
+    assert calls == []
+    assert report == {}
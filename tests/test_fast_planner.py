@@ -0,0 +1,82 @@
+import pytest
+from app.core import llm_interpreter, fast_planner
+from app.core.fast_planner import plan_locally, plans_agree, record_shadow_comparison
+from app.core.plan_cache import PlanCache
+
+COLUMNS = ["OrderID", "CustomerName", "Region", "Quantity", "UnitPrice", "Revenue", "Department", "Salary"]
+
+@pytest.mark.parametrize("query, expected", [
+    ("Top 10 regions by revenue", {"operation": "aggregate", "parameters": {
+        "column": "Revenue", "group_by": "Region", "method": "sum",
+        "sort_by": "Revenue_sum", "order": "desc", "limit": 10}}),
+    ("sum of quantity by region", {"operation": "aggregate", "parameters": {
+        "column": "Quantity", "group_by": "Region", "method": "sum"}}),
+    ("What is the average salary per department?", {"operation": "aggregate", "parameters": {
+        "column": "Salary", "group_by": "Department", "method": "mean"}}),
+    ("count of order id by region", {"operation": "aggregate", "parameters": {
+        "column": "OrderID", "group_by": "Region", "method": "count"}}),
+    ("total revenue", {"operation": "aggregate", "parameters": {"column": "Revenue", "method": "sum"}}),
+    ("filter quantity > 5", {"operation": "filter", "parameters": {
+        "column": "Quantity", "operator": ">", "value": 5}}),
+    ("show rows where unit price is greater than 99.5", {"operation": "filter", "parameters": {
+        "column": "UnitPrice", "operator": ">", "value": 99.5}}),
+    ("rows where region = 'East'", {"operation": "filter", "parameters": {
+        "column": "Region", "operator": "==", "value": "East"}}),
+])
+def test_common_shapes_are_planned_locally(query, expected):
+    plan, confidence = plan_locally(query, COLUMNS)
+    assert plan == expected
+    assert confidence >= fast_planner.FAST_PLANNER_MIN_CONFIDENCE
+
+@pytest.mark.parametrize("query", [
+    "Pivot by Department and show average salary",
+    "Join orders with customer names",
+    "average shoe size per department",
+    "filter region > east",
+    "Top 10 customers by revenue",  # customers -> CustomerName is only a prefix match
+    "number of orders per region",  # a row count, not the count of some unrelated column
+])
+def test_unmatched_or_unknown_columns_fall_back(query):
+    plan, confidence = plan_locally(query, COLUMNS)
+    assert plan is None or confidence < fast_planner.FAST_PLANNER_MIN_CONFIDENCE
+
+def test_near_miss_column_names_are_not_trusted():
+    columns = ["Region", "Revenue2023", "Sales_2021"]
+    for query in ("total revenue2024 by region", "sum of sales_2022 by region", "total revenue2024"):
+        plan, confidence = plan_locally(query, columns)
+        assert confidence < fast_planner.FAST_PLANNER_MIN_CONFIDENCE, (query, plan)
+
+def test_plans_agree_ignores_naming_differences():
+    fast, _ = plan_locally("top 5 regions by revenue", COLUMNS)
+    llm = {"operation": "aggregate", "parameters": {"column": "revenue", "group_by": ["Region"], "method": "sum",
+                                                    "sort_by": "revenue", "order": "desc", "limit": 5}}
+    assert plans_agree(fast, llm)
+    llm["parameters"]["method"] = "mean"
+    assert not plans_agree(fast, llm)
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+    def fake_generate(prompt):
+        calls.append(prompt)
+        return '{"operation": "aggregate", "parameters": {"column": "Revenue", "group_by": "Region", "method": "sum"}}'
+    monkeypatch.setattr(llm_interpreter, "generate_text", fake_generate)
+    monkeypatch.setattr(llm_interpreter, "plan_cache", PlanCache(max_entries=0))
+    return calls
+
+def test_fast_path_skips_llm(monkeypatch, llm_calls):
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "on")
+    plan = llm_interpreter.call_llm_for_plan("sum of revenue by region", sample_columns=COLUMNS)
+    assert plan["planner"] == "fast_path"
+    assert llm_calls == []
+    llm_interpreter.call_llm_for_plan("Pivot by Department and show average salary", sample_columns=COLUMNS)
+    assert len(llm_calls) == 1
+
+def test_shadow_mode_uses_llm_and_records_agreement(monkeypatch, llm_calls):
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "shadow")
+    monkeypatch.setattr(fast_planner, "fast_planner_stats", dict.fromkeys(fast_planner.fast_planner_stats, 0))
+    plan = llm_interpreter.call_llm_for_plan("sum of revenue by region", sample_columns=COLUMNS)
+    assert "planner" not in plan
+    assert len(llm_calls) == 1
+    stats = fast_planner.planner_stats()
+    assert stats["shadow_compared"] == 1 and stats["shadow_agreed"] == 1
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import executor, fast_planner, jobs, llm_interpreter
+from app.core.plan_cache import PlanCache
+
+
+def _use_plan(monkeypatch, plan_json: str) -> None:
+    monkeypatch.setattr(llm_interpreter, "generate_text", lambda prompt: plan_json)
+    monkeypatch.setattr(llm_interpreter, "plan_cache", PlanCache(max_entries=0))
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "off")
+
+
+def _upload(name: str) -> None:
+    os.makedirs("uploads", exist_ok=True)
+    pd.DataFrame({"Region": ["East", "West", "East"], "Sales": [1, 2, 3]}).to_excel(f"uploads/{name}", index=False)
+
+
+def _wait_for(client, job_id, predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if predicate(job):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job never reached the expected state: {job}")
+
+
+def test_query_job_runs_in_the_background_and_returns_the_query_body(monkeypatch):
+    _use_plan(monkeypatch, '{"operation": "aggregate", "parameters": {"column": "Sales", "group_by": "Region", "method": "sum"}}')
+    _upload("jobs_test.xlsx")
+    with TestClient(app) as client:
+        submitted = client.post("/api/v1/jobs/query", json={"filename": "jobs_test.xlsx", "query": "sales per region"})
+        assert submitted.status_code == 202
+        job_id = submitted.json()["job_id"]
+
+        job = _wait_for(client, job_id, lambda j: j["status"] in jobs.FINISHED)
+        assert job["status"] == "done" and job["stage"] == "done"
+        assert job["elapsed_s"] >= 0 and job["query"] == "sales per region"
+
+        result = client.get(submitted.json()["result_url"])
+        assert result.status_code == 200
+        body = result.json()
+        assert body["status"] == "ok" and body["result_id"]
+        assert {"plan", "execute"} <= set(body["timings"])
+        assert any(j["job_id"] == job_id for j in client.get("/api/v1/jobs").json()["jobs"])
+        assert 'excel_ai_jobs{status="done"}' in client.get("/metrics").text
+
+
+def test_cancelling_a_multi_step_job_stops_before_the_next_step(monkeypatch):
+    steps = ",".join(['{"operation": "filter", "parameters": {"column": "Sales", "operator": ">", "value": 0}}'] * 3)
+    _use_plan(monkeypatch, '{"operation": "multi_step", "parameters": {"steps": [' + steps + ']}}')
+    _upload("jobs_cancel_test.xlsx")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_filter(df, params):
+        calls.append(params)
+        started.set()
+        release.wait(5)
+        return {"status": "ok", "result_df": df, "preview": [], "message": "filtered"}
+
+    monkeypatch.setattr(executor, "_do_filter", slow_filter)
+    with TestClient(app) as client:
+        job_id = client.post("/api/v1/jobs/query", json={"filename": "jobs_cancel_test.xlsx", "query": "three filters"}).json()["job_id"]
+        assert started.wait(5)
+        running = client.get(f"/api/v1/jobs/{job_id}").json()
+        assert running["status"] == "running"
+        assert running["stage"] == "multi_step" and running["progress"] == {"done": 0, "total": 3}
+        assert client.get(f"/api/v1/jobs/{job_id}/result").status_code == 409
+
+        cancelling = client.post(f"/api/v1/jobs/{job_id}/cancel").json()
+        assert cancelling["cancel_requested"] is True and cancelling["status"] == "cancelling"
+        # the step is still running on its worker thread, so the job is not cancelled yet
+        assert client.get(f"/api/v1/jobs/{job_id}").json()["status"] == "cancelling"
+        assert client.get(f"/api/v1/jobs/{job_id}/result").status_code == 409
+        assert 'excel_ai_jobs{status="cancelling"} 1' in client.get("/metrics").text
+        started.clear()
+        release.set()
+        job = _wait_for(client, job_id, lambda j: j["status"] in jobs.FINISHED)
+        assert job["status"] == "cancelled"
+        assert client.get(f"/api/v1/jobs/{job_id}/result").status_code == 410
+        # the worker thread stops at the checkpoint before step 2 instead of running it
+        assert not started.wait(0.5)
+        assert len(calls) == 1
+
+
+def test_job_errors_and_unknown_ids(monkeypatch):
+    _use_plan(monkeypatch, '{"operation": "no_such_op", "parameters": {}}')
+    _upload("jobs_error_test.xlsx")
+    with TestClient(app) as client:
+        assert client.post("/api/v1/jobs/query", json={"filename": "jobs_error_test.xlsx"}).status_code == 400
+        assert client.post("/api/v1/jobs/query", json={"filename": "missing.xlsx", "query": "q"}).status_code == 404
+        assert client.get("/api/v1/jobs/nope").status_code == 404
+        assert client.post("/api/v1/jobs/nope/cancel").status_code == 404
+
+        job_id = client.post("/api/v1/jobs/query", json={"filename": "jobs_error_test.xlsx", "query": "q"}).json()["job_id"]
+        job = _wait_for(client, job_id, lambda j: j["status"] in jobs.FINISHED)
+        assert job["status"] == "failed"
+        result = client.get(f"/api/v1/jobs/{job_id}/result")
+        assert result.status_code == 400 and "Unsupported operation" in result.json()["message"]
+
+
+def test_checkpoints_are_no_ops_outside_a_job():
+    jobs.check_cancelled()
+    jobs.report_progress("anything", done=1, total=2)
@@ -0,0 +1,142 @@
+import json
+import os
+import time
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import llm_interpreter, fast_planner
+from app.core.plan_cache import PlanCache
+from app.services import gemini_service
+from app.services.llm_backends import GeminiSDKBackend, LLMBackend, LLMBackendError, RecordingBackend, ReplayBackend
+
+client = TestClient(app)
+
+PIVOT_PLAN = json.dumps({"operation": "pivot", "parameters": {
+    "index": ["Department"], "values": "Salary", "aggfunc": "mean"}})
+
+
+class FixedBackend(LLMBackend):
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def generate(self, prompt, model, generation_config, timeout):
+        self.calls += 1
+        return self.text
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    monkeypatch.setattr(llm_interpreter, "plan_cache", PlanCache(max_entries=0))
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "off")
+    yield
+    gemini_service.use_backend(None)
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "rec.jsonl")
+    recorder = RecordingBackend(FixedBackend("first"), path)
+    config = {"temperature": 0}
+    assert recorder.generate("p1", "m", config, 5) == "first"
+    recorder.inner.text = "second"
+    recorder.generate("p1", "m", config, 5)
+
+    replay = ReplayBackend(path, latency_ms=50)
+    start = time.perf_counter()
+    assert replay.generate("p1", "m", config, 5) == "first"
+    assert time.perf_counter() - start >= 0.05
+    assert replay.generate("p1", "m", config, 5) == "second"
+    assert replay.generate("p1", "m", config, 5) == "first"
+
+    with pytest.raises(LLMBackendError) as err:
+        replay.generate("never recorded", "m", config, 5)
+    assert err.value.retryable is False
+    assert ReplayBackend(path, fallback="{}").generate("never recorded", "m", config, 5) == "{}"
+
+
+def test_replay_respects_timeout(tmp_path):
+    path = str(tmp_path / "rec.jsonl")
+    RecordingBackend(FixedBackend("x"), path).generate("p", "m", {}, 5)
+    with pytest.raises(LLMBackendError):
+        ReplayBackend(path, latency_ms=500).generate("p", "m", {}, 0.05)
+
+
+class DefaultCredentialsError(Exception):
+    pass
+
+
+class PermissionDenied(Exception):
+    code = 403
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+
+@pytest.mark.parametrize("error,retryable", [
+    (DefaultCredentialsError("no key"), False),
+    (PermissionDenied("bad key"), False),
+    (ResourceExhausted("quota"), True),
+    (ServiceUnavailable("down"), True),
+    (ConnectionError("reset"), True),
+])
+def test_gemini_sdk_errors_are_classified(error, retryable):
+    class FailingModel:
+        def generate_content(self, *args, **kwargs):
+            raise error
+
+    backend = GeminiSDKBackend()
+    backend._model = lambda model: FailingModel()
+    with pytest.raises(LLMBackendError) as excinfo:
+        backend.generate("p", "m", {}, 5)
+    assert excinfo.value.retryable is retryable
+
+
+def test_query_route_end_to_end_offline(tmp_path, offline):
+    os.makedirs("uploads", exist_ok=True)
+    pd.DataFrame({"Department": ["HR", "IT", "IT"], "Salary": [10, 20, 30]}).to_excel(
+        os.path.join("uploads", "replay_test.xlsx"), index=False)
+    payload = {"filename": "replay_test.xlsx", "query": "Pivot by Department and show average salary"}
+    path = str(tmp_path / "rec.jsonl")
+
+    live = FixedBackend(PIVOT_PLAN)
+    gemini_service.use_backend(RecordingBackend(live, path))
+    recorded = client.post("/api/v1/query", json=payload)
+    assert recorded.status_code == 200
+    live_calls = live.calls
+    assert live_calls >= 1
+
+    gemini_service.use_backend(ReplayBackend(path, latency_ms=20))
+    replayed = client.post("/api/v1/query", json=payload)
+    assert replayed.status_code == 200
+    assert replayed.json()["preview"] == recorded.json()["preview"]
+    assert live.calls == live_calls
+
+
+def test_backend_failures_and_unexpected_errors_are_reported_apart():
+    from fastapi import HTTPException
+
+    class FailingBackend(LLMBackend):
+        def __init__(self, error):
+            self.error = error
+
+        def generate(self, prompt, model, generation_config, timeout):
+            raise self.error
+
+    try:
+        gemini_service.use_backend(FailingBackend(LLMBackendError("quota exhausted", retryable=False)))
+        with pytest.raises(HTTPException) as err:
+            gemini_service.generate_text("p")
+        assert err.value.detail == "Error calling Gemini API: quota exhausted"
+
+        gemini_service.use_backend(FailingBackend(KeyError("candidates")))
+        with pytest.raises(HTTPException) as err:
+            gemini_service.generate_text("p")
+        assert err.value.status_code == 500 and err.value.detail.startswith("Unexpected error")
+    finally:
+        gemini_service.use_backend(None)
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from app.services import llm_client
+from app.services.llm_backends import HTTPBackend, LLMBackend
+from app.services.llm_client import LLMClient, LLMError, CircuitBreaker, CircuitOpenError
+
+
+class StubGemini:
+    """Local Gemini-compatible server that replays scripted (delay, status) behaviours."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests += 1
+                delay, status = stub.script.pop(0) if stub.script else (0, 200)
+                time.sleep(delay)
+                prompt = body["contents"][0]["parts"][0]["text"]
+                payload = json.dumps({"candidates": [{"content": {"parts": [{"text": f"echo:{prompt}"}]}}]}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up on this (slow) request
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture(scope="module")
+def stub():
+    server = StubGemini()
+    yield server
+    server.server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_stub(stub):
+    stub.script.clear()
+    stub.requests = 0
+
+
+def make_client(stub, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return LLMClient(HTTPBackend(stub.url), **kwargs)
+
+
+def test_generate_through_http_backend(stub):
+    client = make_client(stub)
+    assert client.generate("hello") == "echo:hello"
+    assert asyncio.run(client.agenerate("async hello")) == "echo:async hello"
+
+
+def test_retries_transient_errors(stub):
+    stub.script[:] = [(0, 503), (0, 500)]
+    client = make_client(stub, max_attempts=3)
+    assert client.generate("retry me") == "echo:retry me"
+    assert stub.requests == 3
+    assert client.stats["retries"] == 2
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.script[:] = [(0, 400)]
+    client = make_client(stub, max_attempts=3)
+    with pytest.raises(LLMError):
+        client.generate("bad request")
+    assert stub.requests == 1
+
+
+def test_hedged_request_beats_slow_call(stub):
+    stub.script[:] = [(1.5, 200), (0, 200)]
+    client = make_client(stub, hedge_after=0.1, deadline=5)
+    start = time.monotonic()
+    assert client.generate("hedge") == "echo:hedge"
+    assert time.monotonic() - start < 1.0
+    assert client.stats["hedges"] == 1
+
+
+def test_deadline_is_enforced(stub):
+    stub.script[:] = [(1.0, 200)] * 3
+    client = make_client(stub, deadline=0.3)
+    start = time.monotonic()
+    with pytest.raises(LLMError):
+        client.generate("slow")
+    assert time.monotonic() - start < 0.8
+
+
+def test_circuit_breaker_fails_fast(stub):
+    stub.script[:] = [(0, 500)] * 2
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = make_client(stub, max_attempts=2, breaker=breaker)
+    with pytest.raises(LLMError):
+        client.generate("down")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.generate("down again")
+    assert stub.requests == 2
+
+
+def test_circuit_breaker_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_backends_must_implement_generate():
+    class Incomplete(LLMBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_replacing_the_client_closes_the_old_one(stub):
+    old = make_client(stub)
+    assert old.generate("hello") == "echo:hello"
+    loop = old._loop
+    llm_client.set_llm_client(old)
+    llm_client.set_llm_client(make_client(stub))
+    try:
+        with pytest.raises(LLMError):
+            old.generate("after close")
+        deadline = time.time() + 5
+        while not loop.is_closed() and time.time() < deadline:
+            time.sleep(0.01)
+        assert loop.is_closed()
+        assert old._executor._shutdown
+    finally:
+        llm_client.set_llm_client(None)
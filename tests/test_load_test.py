@@ -0,0 +1,55 @@
+import asyncio
+import json
+import httpx
+import pytest
+from app.main import app
+from app.core import llm_interpreter, fast_planner
+from app.core.plan_cache import PlanCache
+from app.core.prompt_builder import build_derivation_prompt, build_plan_prompt, column_profile
+from app.services import gemini_service
+from app.services.llm_backends import HTTPBackend
+from benchmarks.load_test import format_report, make_workbook, parse_mix, run_load, summarize
+from benchmarks.stub_llm import StubLLMServer, answer
+from benchmarks.bench_executor import make_dataset
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubLLMServer(latency_ms=5, seed=0).start()
+    monkeypatch.setattr(llm_interpreter, "plan_cache", PlanCache(max_entries=0))
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "off")
+    gemini_service.use_backend(HTTPBackend(server.url))
+    yield server
+    gemini_service.use_backend(None)
+    server.stop()
+
+
+def test_stub_answers_the_apps_prompts():
+    df = make_dataset(50)
+    prompt = build_plan_prompt("SYSTEM", "total Profit by Region", list(df.columns), column_profile(df))
+    assert json.loads(answer(prompt)) == {"operation": "aggregate", "parameters": {
+        "column": "Profit", "method": "sum", "group_by": "Region"}}
+    assert json.loads(answer(build_plan_prompt("SYSTEM", "something vague", list(df.columns))))["operation"] == "describe"
+    assert json.loads(answer(build_derivation_prompt(["Revenue"], df.columns))) == {"Revenue": "CANNOT_DERIVE"}
+
+
+def test_mixed_workload_reports_percentiles(stub, tmp_path):
+    workbook = make_workbook(str(tmp_path / "load.xlsx"), rows=50)
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            return await run_load(client, workbook, parse_mix("query=6,analyze_excel=2,upload=1,analyze_and_query=1"),
+                                  requests=16, concurrency=4)
+
+    report = summarize(asyncio.run(go()), stub.stats())
+    assert report["overall"]["count"] == 16
+    assert report["overall"]["errors"] == 0, report
+    assert report["overall"]["p50_ms"] <= report["overall"]["p95_ms"] <= report["overall"]["p99_ms"]
+    assert set(report["endpoints"]) <= {"query", "analyze_excel", "upload", "analyze_and_query"}
+    assert stub.stats()["calls"] > 0
+    assert "p99" in format_report(report)
+    if "query" in report["endpoints"]:
+        assert "llm_plan" in report["query_stages"]
+    with pytest.raises(ValueError):
+        parse_mix("query=1,delete=2")
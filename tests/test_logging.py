@@ -0,0 +1,90 @@
+import json
+import logging
+import queue
+import threading
+from app.core import logger as app_logger
+from app.core.logger import AsyncQueueHandler, JsonFormatter, log_payload, log_stats
+from app.core.request_context import reset_request_id, set_request_id
+
+
+class CountingPayload:
+    def __init__(self):
+        self.calls = []
+
+    def __str__(self):
+        self.calls.append(threading.current_thread().name)
+        return "payload"
+
+
+def _logger(name, handler, level=logging.INFO):
+    log = logging.getLogger(name)
+    log.handlers = [handler]
+    log.propagate = False
+    log.setLevel(level)
+    return log
+
+
+def test_records_are_formatted_off_the_calling_path_with_request_id():
+    records = queue.Queue()
+    log = _logger("test_async_logging", AsyncQueueHandler(records))
+    payload = CountingPayload()
+    token = set_request_id("req-42")
+    try:
+        log.debug("skipped %s", payload)
+        log.info("plan %s", payload)
+    finally:
+        reset_request_id(token)
+    assert payload.calls == []  # filtered records and enqueued ones are not formatted by the caller
+
+    record = records.get_nowait()
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "plan payload"
+    assert entry["request_id"] == "req-42"
+    assert entry["level"] == "INFO" and entry["logger"] == "test_async_logging"
+    assert records.empty()
+
+
+def test_container_args_are_rendered_before_the_caller_mutates_them():
+    records = queue.Queue()
+    log = _logger("test_async_logging_containers", AsyncQueueHandler(records))
+    plan = {"operation": "aggregate", "parameters": {"column": "Sales"}}
+    log.info("plan %s", plan)
+    plan["parameters"]["column"] = "Revenue"
+    record = records.get_nowait()
+    assert record.getMessage() == "plan {'operation': 'aggregate', 'parameters': {'column': 'Sales'}}"
+
+
+def test_exceptions_are_rendered_before_enqueueing():
+    records = queue.Queue()
+    log = _logger("test_async_logging_exc", AsyncQueueHandler(records))
+    try:
+        raise ValueError("bad plan")
+    except ValueError:
+        log.exception("failed")
+    record = records.get_nowait()
+    assert record.exc_info is None and "ValueError: bad plan" in record.exc_text
+    assert "ValueError: bad plan" in json.loads(JsonFormatter().format(record))["exc_info"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    log = _logger("test_async_logging_full", AsyncQueueHandler(queue.Queue(maxsize=1)))
+    before = log_stats["dropped"]
+    for i in range(3):
+        log.info("message %d", i)
+    assert log_stats["dropped"] == before + 2
+
+
+def test_payload_logs_are_sampled_and_truncated(monkeypatch):
+    monkeypatch.setattr(app_logger, "LOG_PAYLOAD_MAX_CHARS", 10)
+    monkeypatch.setattr(app_logger, "LOG_PAYLOAD_PER_SECOND", 0.001)
+    monkeypatch.setattr(app_logger, "_payload_limiter", app_logger._PayloadLimiter())
+    records = queue.Queue()
+    log = _logger("test_payload_logging", AsyncQueueHandler(records))
+    for _ in range(5):
+        log_payload(log, "plan", "plan: %s", {"operation": "aggregate", "parameters": {"column": "Sales"}})
+    assert records.qsize() == 1
+    assert records.get_nowait().getMessage().startswith("plan: {'operatio... (")
+
+    log.setLevel(logging.DEBUG)
+    log_payload(log, "plan", "plan: %s", "x" * 50)
+    assert records.get_nowait().getMessage() == "plan: " + "x" * 50
@@ -0,0 +1,53 @@
+import os
+import time
+import pandas as pd
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import llm_interpreter, fast_planner
+from app.core.metrics import Histogram, span, start_request_timings, stage_seconds
+from app.core.plan_cache import PlanCache
+
+client = TestClient(app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("demo_seconds", "Demo.", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.7, 5):
+        h.observe(v, stage='a"b')
+    lines = h.render()
+    assert 'demo_seconds_bucket{stage="a\\"b",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="a\\"b",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{stage="a\\"b",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{stage="a\\"b"} 4' in lines
+
+
+def test_nested_spans_of_one_stage_count_once():
+    timings = start_request_timings()
+    before = stage_seconds.snapshot().get((("stage", "nested_demo"),), {"count": 0})["count"]
+    with span("nested_demo"):
+        with span("nested_demo"):
+            time.sleep(0.01)
+    assert stage_seconds.snapshot()[(("stage", "nested_demo"),)]["count"] == before + 1
+    assert timings["nested_demo"] >= 0.01
+
+
+def test_query_returns_stage_timings_and_metrics_are_exposed(monkeypatch):
+    monkeypatch.setattr(llm_interpreter, "generate_text",
+                        lambda prompt: '{"operation": "aggregate", "parameters": {"column": "Sales", "group_by": "Region", "method": "sum"}}')
+    monkeypatch.setattr(llm_interpreter, "plan_cache", PlanCache(max_entries=0))
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "off")
+    os.makedirs("uploads", exist_ok=True)
+    pd.DataFrame({"Region": ["East", "West", "East"], "Sales": [1, 2, 3]}).to_excel("uploads/metrics_test.xlsx", index=False)
+
+    res = client.post("/api/v1/query", json={"filename": "metrics_test.xlsx", "query": "sales per region please", "timings": True})
+    assert res.status_code == 200
+    timings = res.json()["timings"]
+    assert {"workbook_parse", "plan", "prompt_build", "llm_plan", "execution", "execute", "excel_export", "verification"} <= set(timings)
+    assert "llm_plan;dur=" in res.headers["server-timing"]
+    assert "timings" not in client.post("/api/v1/query", json={"filename": "metrics_test.xlsx", "query": "sales per region please"}).json()
+
+    text = client.get("/metrics").text
+    assert 'excel_ai_stage_seconds_count{stage="llm_plan"}' in text
+    assert 'excel_ai_http_request_seconds_count{method="POST",route="/query",status="200"}' in text
+    assert 'excel_ai_cache_hit_ratio{cache="dataset"}' in text
+    assert 'excel_ai_singleflight_in_flight{flight="plan"} 0' in text
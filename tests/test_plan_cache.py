@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+from app.core import llm_interpreter
+from app.core.plan_cache import PlanCache, make_plan_key
+from app.core.schema import base_columns
+
+def test_key_normalizes_query_and_fingerprints_columns():
+    cols = ["Region", "Sales"]
+    assert make_plan_key("  Total sales   by region? ", cols) == make_plan_key("Total sales by region", cols)
+    # values in queries are case sensitive
+    assert make_plan_key("rows where Region = East", cols) != make_plan_key("rows where Region = east", cols)
+    assert make_plan_key("total sales by region", cols) != make_plan_key("total sales by region", ["Region", "Revenue"])
+
+def test_plan_key_ignores_columns_derived_into_the_sheet():
+    df = pd.DataFrame({"Quantity": [1, 2], "UnitPrice": [3.0, 4.0]})
+    key = make_plan_key("total revenue", base_columns(df))
+    df["Revenue"] = df["Quantity"] * df["UnitPrice"]
+    df.attrs["derived_columns"] = ["Revenue"]
+    assert base_columns(df) == ["Quantity", "UnitPrice"]
+    assert make_plan_key("total revenue", base_columns(df)) == key
+
+def test_lru_eviction_and_stats():
+    cache = PlanCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", {"operation": "a"})
+    cache.put("b", {"operation": "b"})
+    assert cache.get("a") == {"operation": "a"}
+    cache.put("c", {"operation": "c"})
+    assert cache.get("b") is None
+    assert cache.get("c") == {"operation": "c"}
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["evictions"] == 1
+
+def test_ttl_expiry(monkeypatch):
+    cache = PlanCache(max_entries=10, ttl_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr("app.core.plan_cache.time.time", lambda: now[0])
+    cache.put("k", {"operation": "filter"})
+    now[0] += 61
+    assert cache.get("k") is None
+
+def test_returned_plan_is_a_copy():
+    cache = PlanCache()
+    cache.put("k", {"operation": "filter", "parameters": {"column": "A"}})
+    plan = cache.get("k")
+    plan["input_path"] = "uploads/x.xlsx"
+    plan["parameters"]["column"] = "B"
+    assert cache.get("k") == {"operation": "filter", "parameters": {"column": "A"}}
+
+def test_persistence_across_instances(tmp_path):
+    path = str(tmp_path / "plans.json")
+    cache = PlanCache(persist_path=path)
+    cache.put("k", {"operation": "pivot"})
+    cache.flush()
+    assert PlanCache(persist_path=path).get("k") == {"operation": "pivot"}
+
+def test_persistence_is_batched_until_flush(tmp_path):
+    path = str(tmp_path / "plans.json")
+    cache = PlanCache(persist_path=path, save_every=3, save_interval=3600)
+    cache.put("a", {"operation": "a"})
+    cache.put("b", {"operation": "b"})
+    assert PlanCache(persist_path=path).get("a") is None
+    cache.put("c", {"operation": "c"})
+    assert PlanCache(persist_path=path).get("c") == {"operation": "c"}
+    cache.put("d", {"operation": "d"})
+    cache.flush()
+    assert PlanCache(persist_path=path).get("d") == {"operation": "d"}
+    assert [p.name for p in tmp_path.iterdir()] == ["plans.json"]
+
+def test_call_llm_for_plan_uses_cache(monkeypatch):
+    calls = []
+    def fake_generate(prompt):
+        calls.append(prompt)
+        return '{"operation": "aggregate", "parameters": {"column": "Sales", "group_by": "Region"}}'
+    monkeypatch.setattr(llm_interpreter, "generate_text", fake_generate)
+    monkeypatch.setattr(llm_interpreter, "plan_cache", PlanCache())
+    monkeypatch.setattr("app.core.fast_planner.FAST_PLANNER_MODE", "off")
+
+    first = llm_interpreter.call_llm_for_plan("Total sales by region", sample_columns=["Region", "Sales"])
+    second = llm_interpreter.call_llm_for_plan("Total  sales by region.", sample_columns=["Region", "Sales"])
+    assert first == second
+    assert len(calls) == 1
+    llm_interpreter.call_llm_for_plan("Total sales by region", sample_columns=["Region", "Sales", "Cost"])
+    assert len(calls) == 2
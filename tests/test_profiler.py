@@ -0,0 +1,163 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.file_manager import dataset_cache, iter_sheet_chunks
+from app.core.profiler import profile_frame
+from app.core.sketches import HeavyHitters, HyperLogLog, QuantileSketch, ReservoirSample, approximate_profile, sketch_chunks
+from app.routes import analyze_routes
+
+client = TestClient(app)
+
+
+def _frame(n=200):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "Sales": rng.normal(100, 10, n).round(2),
+        "Units": rng.integers(1, 10, n),
+        "Region": rng.choice(["East", "West"], n),
+        "OrderDate": pd.date_range("2024-01-01", periods=n),
+        "Feedback": [f"feedback text {i}" if i % 7 else None for i in range(n)],
+        "Empty": [np.nan] * n,
+    })
+
+
+def test_profile_matches_expected_format():
+    df = _frame()
+    out = profile_frame(df)
+    assert out["inferred_column_types"] == {
+        "Sales": "numeric", "Units": "numeric", "Region": "categorical",
+        "OrderDate": "date", "Feedback": "text", "Empty": "numeric",
+    }
+    assert out["summary"]["Sales"]["mean"] == float(df["Sales"].mean())
+    assert out["summary"]["Units"] == {"mean": float(df["Units"].mean()), "min": 1.0, "max": 9.0, "missing": 0}
+    assert out["summary"]["Empty"] == {"mean": None, "min": None, "max": None, "missing": 200}
+    assert out["summary"]["Region"] == {"unique_values": 2, "top_value": df["Region"].mode().iloc[0], "missing": 0}
+    assert out["summary"]["OrderDate"] == {"min_date": "2024-01-01", "max_date": "2024-07-18", "missing": 0}
+    expected_len = round(df["Feedback"].dropna().apply(lambda x: len(str(x))).mean(), 2)
+    assert out["summary"]["Feedback"] == {"avg_text_length": expected_len, "missing": 29}
+    assert out["unstructured_columns"] == ["Feedback"]
+    assert list(out["summary"]) == list(df.columns)
+
+
+def test_analyze_excel_serves_repeat_calls_from_cache(monkeypatch):
+    calls = []
+    def counting_profile(df):
+        calls.append(len(df))
+        return profile_frame(df)
+    monkeypatch.setattr(analyze_routes, "profile_frame", counting_profile)
+
+    os.makedirs("uploads", exist_ok=True)
+    path = os.path.join("uploads", "profile_test.xlsx")
+    _frame(50).to_excel(path, index=False)
+
+    first = client.get("/api/v1/analyze_excel", params={"filename": "profile_test.xlsx"})
+    second = client.get("/api/v1/analyze_excel", params={"filename": "profile_test.xlsx"})
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    assert calls == [50]
+
+    # new content on disk invalidates the cached profile
+    time.sleep(0.01)
+    _frame(30).to_excel(path, index=False)
+    third = client.get("/api/v1/analyze_excel", params={"filename": "profile_test.xlsx"})
+    assert third.status_code == 200
+    assert calls == [50, 30]
+
+
+def test_analyze_excel_leaves_out_derived_columns(monkeypatch):
+    from app.core.file_manager import dataset_cache, drop_profiles
+    seen = []
+    def recording_profile(df):
+        seen.append(list(df.columns))
+        return profile_frame(df)
+    monkeypatch.setattr(analyze_routes, "profile_frame", recording_profile)
+
+    os.makedirs("uploads", exist_ok=True)
+    _frame(20).to_excel(os.path.join("uploads", "profile_derived_test.xlsx"), index=False)
+    assert client.get("/api/v1/analyze_excel", params={"filename": "profile_derived_test.xlsx"}).status_code == 200
+    sheet = dataset_cache["profile_derived_test.xlsx"]["Sheet1"]
+    sheet["Revenue"] = sheet["Sales"] * sheet["Units"]
+    sheet.attrs["derived_columns"] = ["Revenue"]
+    drop_profiles("profile_derived_test.xlsx")
+    assert client.get("/api/v1/analyze_excel", params={"filename": "profile_derived_test.xlsx"}).status_code == 200
+    assert seen[0] == seen[1] == list(_frame(1).columns)
+
+
+def test_approximate_profile_agrees_with_exact_on_types():
+    df = _frame(2000)
+    exact = profile_frame(df)
+    approx = approximate_profile(df, chunk_size=300)
+    assert approx["approximate"] is True
+    assert approx["inferred_column_types"] == exact["inferred_column_types"]
+    assert approx["summary"]["Region"]["unique_values"] == 2
+    assert approx["summary"]["Region"]["top_value"] == exact["summary"]["Region"]["top_value"]
+    assert approx["summary"]["Sales"]["mean"] == pytest.approx(exact["summary"]["Sales"]["mean"])
+    assert approx["summary"]["Sales"]["approx_quantiles"]["p50"] == pytest.approx(df["Sales"].median(), abs=2)
+    assert approx["summary"]["OrderDate"] == exact["summary"]["OrderDate"]
+    assert approx["summary"]["Empty"]["missing"] == 2000
+
+
+def test_sketches_merge_across_chunks():
+    values = pd.Series([f"id{i}" for i in range(20000)] + ["hot"] * 5000)
+    left, right = HyperLogLog(), HyperLogLog()
+    left.update(values[:12000])
+    right.update(values[8000:])
+    assert left.merge(right).count() == pytest.approx(20001, rel=0.05)
+
+    hh_a, hh_b = HeavyHitters(k=8), HeavyHitters(k=8)
+    hh_a.update(values[::2])
+    hh_b.update(values[1::2])
+    assert hh_a.merge(hh_b).top(1) == ["hot"]
+
+    q_a, q_b = QuantileSketch(k=64), QuantileSketch(k=64)
+    q_a.update(np.arange(0, 50000))
+    q_b.update(np.arange(50000, 100000))
+    assert q_a.merge(q_b).quantile(0.5) == pytest.approx(50000, rel=0.05)
+    assert sum(len(level) for level in q_a.levels) < 1000
+
+    r_a, r_b = ReservoirSample(size=100, seed=1), ReservoirSample(size=100, seed=2)
+    r_a.update(values[:10000])
+    r_b.update(values[10000:])
+    assert len(r_a.merge(r_b).values) == 100
+
+
+def test_sheet_is_sketched_while_streamed_from_the_workbook():
+    os.makedirs("uploads", exist_ok=True)
+    df = _frame(500)
+    path = os.path.join("uploads", "profile_stream_test.xlsx")
+    df.to_excel(path, index=False)
+    chunks = list(iter_sheet_chunks(path, chunk_size=120))
+    assert [len(c) for c in chunks] == [120, 120, 120, 120, 20]
+    assert list(chunks[0].columns) == list(df.columns)
+
+    approx = sketch_chunks(iter_sheet_chunks(path, chunk_size=120)).to_profile()
+    exact = profile_frame(pd.read_excel(path))
+    assert approx["inferred_column_types"] == exact["inferred_column_types"]
+    assert approx["summary"]["Units"]["min"] == exact["summary"]["Units"]["min"]
+    assert approx["summary"]["OrderDate"] == exact["summary"]["OrderDate"]
+    assert approx["summary"]["Feedback"]["missing"] == exact["summary"]["Feedback"]["missing"]
+
+
+def test_column_kind_follows_the_first_chunk_with_values():
+    empty_first = [pd.DataFrame({"A": [None, None]}, dtype=object), pd.DataFrame({"A": ["x", "y"]})]
+    out = sketch_chunks(empty_first).to_profile()
+    assert out["inferred_column_types"]["A"] in ("categorical", "text")
+    assert out["summary"]["A"]["missing"] == 2
+    mixed = sketch_chunks([pd.DataFrame({"B": [1.5, 2.5]}), pd.DataFrame({"B": ["n/a", 3.5]})]).to_profile()
+    assert mixed["summary"]["B"]["max"] == 3.5 and mixed["summary"]["B"]["missing"] == 1
+
+
+def test_analyze_excel_approx_mode():
+    os.makedirs("uploads", exist_ok=True)
+    _frame(100).to_excel(os.path.join("uploads", "profile_approx_test.xlsx"), index=False)
+    dataset_cache.pop("profile_approx_test.xlsx", None)
+    res = client.get("/api/v1/analyze_excel", params={"filename": "profile_approx_test.xlsx", "mode": "approx"})
+    assert res.status_code == 200
+    assert res.json()["approximate"] is True
+    assert "profile_approx_test.xlsx" not in dataset_cache  # streamed from disk, not loaded
+    assert "approximate" not in client.get("/api/v1/analyze_excel", params={"filename": "profile_approx_test.xlsx"}).json()
+    assert client.get("/api/v1/analyze_excel", params={"filename": "profile_approx_test.xlsx", "mode": "fast"}).status_code == 422
@@ -0,0 +1,64 @@
+import pandas as pd
+from app.core import llm_interpreter
+from app.core.prompt_builder import (
+    build_derivation_prompt, build_plan_prompt, column_profile, estimate_tokens, relevance,
+)
+
+
+def _frame():
+    return pd.DataFrame({
+        "Region": ["East", "West", "East", "North"] * 5,
+        "Sales": [10.5, 20.0, 5.25, 7.0] * 5,
+        "Units": [1, 2, 3, 4] * 5,
+        "OrderDate": pd.date_range("2024-01-01", periods=20),
+        "Comment": [f"comment number {i}" for i in range(20)],
+    })
+
+
+def test_profile_has_types_and_category_examples():
+    profile = column_profile(_frame())
+    assert profile["Sales"]["type"] == "float"
+    assert profile["Units"]["type"] == "int"
+    assert profile["OrderDate"]["type"] == "date"
+    assert profile["Comment"]["type"] == "text"
+    assert profile["Region"]["type"] == "cat"
+    assert profile["Region"]["examples"][0] == "East"
+
+
+def test_plan_prompt_contains_typed_schema():
+    df = _frame()
+    prompt = build_plan_prompt("SYSTEM", "total sales by region", list(df.columns), column_profile(df))
+    assert "Sales:float" in prompt
+    assert "Region:cat(East|" in prompt
+    assert "omitted" not in prompt
+
+
+def test_wide_schema_is_pruned_to_budget_keeping_relevant_columns():
+    columns = [f"metric_{i}" for i in range(500)] + ["UnitPrice", "Region"]
+    prompt = build_plan_prompt("SYSTEM", "average unit price per region", columns, budget=200)
+    assert estimate_tokens(prompt) <= 200
+    assert "UnitPrice" in prompt and "Region" in prompt
+    assert "less relevant columns omitted" in prompt
+
+
+def test_relevance_prefers_matching_columns():
+    assert relevance("average unit price", "UnitPrice") > relevance("average unit price", "CustomerName")
+    assert relevance("sales by region", "metric_7") == 0
+
+
+def test_derivation_prompt_lists_missing_and_budgeted_columns():
+    columns = [f"col_{i}" for i in range(300)] + ["Quantity", "UnitPrice"]
+    prompt = build_derivation_prompt(["Revenue", "UnitCost"], columns, budget=300)
+    assert '"Revenue", "UnitCost"' in prompt
+    assert "UnitPrice" in prompt
+    assert estimate_tokens(prompt) <= 300
+
+
+def test_llm_plan_prompt_uses_profile(monkeypatch):
+    prompts = []
+    monkeypatch.setattr(llm_interpreter, "generate_text", lambda p: prompts.append(p) or '{"operation": "describe", "parameters": {}}')
+    monkeypatch.setattr(llm_interpreter.fast_planner, "FAST_PLANNER_MODE", "off")
+    monkeypatch.setattr(llm_interpreter.plan_cache, "max_entries", 0)
+    df = _frame()
+    llm_interpreter.call_llm_for_plan("describe the comments", list(df.columns), column_profile(df))
+    assert "Comment:text" in prompts[0]
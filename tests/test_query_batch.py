@@ -0,0 +1,139 @@
+import json
+import os
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import fast_planner, llm_interpreter
+from app.core.batch_executor import fusion_key, run_fused_aggregates
+from app.core.executor_helpers import _do_aggregate
+from app.core.plan_cache import PlanCache
+from app.core.prompt_builder import build_batch_plan_prompt
+from benchmarks.stub_llm import answer
+
+client = TestClient(app)
+
+QUERIES = [
+    "sum of Sales by Region",
+    "average Sales by Region",
+    "maximum Units by Region",
+    "rows where Units > 2",
+    "sum of Sales by Region",
+]
+
+
+def _frame():
+    return pd.DataFrame({
+        "Region": ["East", "West", "East", "North", "West", "East"],
+        "Channel": ["Web", "Store", "Store", "Web", "Web", "Store"],
+        "Sales": [10.0, 20.0, 30.0, 5.0, 7.5, 1.0],
+        "Units": [1, 2, 3, 4, 5, 6],
+    })
+
+
+def _setup(monkeypatch, name, cache_entries=0):
+    prompts = []
+
+    def fake_generate(prompt, **kwargs):
+        prompts.append(prompt)
+        return answer(prompt)
+
+    monkeypatch.setattr(llm_interpreter, "generate_text", fake_generate)
+    monkeypatch.setattr(llm_interpreter, "plan_cache", PlanCache(max_entries=cache_entries))
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "off")
+    os.makedirs("uploads", exist_ok=True)
+    _frame().to_excel(f"uploads/{name}", index=False)
+    return prompts
+
+
+def test_batch_plans_with_one_llm_call_and_fuses_shared_group_keys(monkeypatch):
+    prompts = _setup(monkeypatch, "batch_test.xlsx")
+    res = client.post("/api/v1/query_batch", json={"filename": "batch_test.xlsx", "queries": QUERIES, "timings": True})
+    assert res.status_code == 200
+    body = res.json()
+    assert len(prompts) == 1 and "User Queries:" in prompts[0]
+    assert body["summary"] == {"queries": 5, "ok": 5, "fused": 4}
+
+    results = body["results"]
+    assert [r["query"] for r in results] == QUERIES
+    assert [r["fused"] for r in results] == [True, True, True, False, True]
+    assert all(r["status"] == "ok" and r["result_id"] and r["verifier"]["ok"] for r in results)
+    # each fused answer is what the aggregate operation would have returned on its own
+    for r in results[:3]:
+        alone = _do_aggregate(_frame(), r["plan"]["parameters"])
+        assert r["preview"] == alone["preview"]
+    assert results[0]["preview"] == results[4]["preview"]
+    assert len(results[3]["preview"]) == 4
+    assert "execution" in body["timings"]
+
+
+def test_batch_results_are_kept_by_result_id_without_writing_files(monkeypatch):
+    _setup(monkeypatch, "batch_files_test.xlsx")
+    writes = []
+    monkeypatch.setattr(pd.DataFrame, "to_excel", lambda self, *args, **kwargs: writes.append(args))
+    before = set(os.listdir("results")) if os.path.isdir("results") else set()
+    queries = ["sum of Sales by Region", "maximum Units by Region", "sum of Sales by Channel", "rows where Units > 2"]
+    results = client.post("/api/v1/query_batch", json={"filename": "batch_files_test.xlsx", "queries": queries}).json()["results"]
+    assert [r["fused"] for r in results] == [True, True, False, False]
+    assert all(r["status"] == "ok" and r["result_id"] and "file_path" not in r for r in results)
+    assert writes == [] and (set(os.listdir("results")) if os.path.isdir("results") else set()) == before
+    # the stored result is still served by id
+    assert client.get(f"/api/v1/results/{results[2]['result_id']}", params={"limit": 10}).status_code == 200
+
+
+def test_repeated_batch_is_planned_from_the_plan_cache(monkeypatch):
+    prompts = _setup(monkeypatch, "batch_cache_test.xlsx", cache_entries=64)
+    payload = {"filename": "batch_cache_test.xlsx", "queries": QUERIES[:4]}
+    assert client.post("/api/v1/query_batch", json=payload).json()["summary"]["ok"] == 4
+    assert client.post("/api/v1/query_batch", json=payload).json()["summary"]["ok"] == 4
+    assert len(prompts) == 1
+
+
+def test_unusable_batch_response_falls_back_to_one_call_per_query(monkeypatch):
+    prompts = _setup(monkeypatch, "batch_fallback_test.xlsx")
+
+    def single_plans_only(prompt, **kwargs):
+        prompts.append(prompt)
+        if "User Queries:" in prompt:
+            return '{"operation": "describe"}'
+        if "bogus" in prompt:
+            return "no json here"
+        return answer(prompt)
+
+    monkeypatch.setattr(llm_interpreter, "generate_text", single_plans_only)
+    res = client.post("/api/v1/query_batch", json={"filename": "batch_fallback_test.xlsx", "queries": ["sum of Sales by Region", "bogus"]})
+    results = res.json()["results"]
+    assert len(prompts) == 3
+    assert results[0]["status"] == "ok" and results[0]["fused"] is False
+    assert results[1]["status"] == "error" and "valid JSON" in results[1]["message"]
+
+
+def test_batch_validation(monkeypatch):
+    _setup(monkeypatch, "batch_validation_test.xlsx")
+    assert client.post("/api/v1/query_batch", json={"filename": "batch_validation_test.xlsx", "queries": []}).status_code == 400
+    assert client.post("/api/v1/query_batch", json={"filename": "batch_validation_test.xlsx", "queries": "sum"}).status_code == 400
+    assert client.post("/api/v1/query_batch", json={"filename": "missing.xlsx", "queries": ["q"]}).status_code == 404
+
+
+def test_fusion_matches_single_aggregates_with_sort_limit_and_multiple_keys():
+    df = _frame()
+    plans = [
+        {"operation": "aggregate", "parameters": {"column": "Sales", "group_by": ["Region", "Channel"], "method": "sum",
+                                                  "sort_by": "Sales_sum", "order": "desc", "limit": 2}},
+        {"operation": "aggregate", "parameters": {"column": "Units", "by": ["Region", "Channel"], "method": "count"}},
+    ]
+    assert {fusion_key(df, p) for p in plans} == {("Region", "Channel")}
+    for fused, plan in zip(run_fused_aggregates(df, ("Region", "Channel"), plans), plans):
+        pd.testing.assert_frame_equal(fused["result_df"], _do_aggregate(df, plan["parameters"])["result_df"])
+
+    assert fusion_key(df, {"operation": "aggregate", "parameters": {"column": "Revenue", "group_by": "Region"}}) is None
+    assert fusion_key(df, {"operation": "aggregate", "parameters": {"column": "Sales", "group_by": "Region", "method": "describe"}}) is None
+    assert fusion_key(df, {"operation": "aggregate", "parameters": {"column": "Sales"}}) is None
+
+
+def test_batch_prompt_numbers_queries_and_shares_the_schema():
+    prompt = build_batch_plan_prompt(llm_interpreter.SYSTEM_PROMPT, ["a", "b"], ["Region", "Sales"])
+    assert "exactly 2 plan objects" in prompt
+    assert "User Queries:\n1. a\n2. b\n\nAvailable columns (name:type): Region" in prompt
+    assert json.loads(answer(prompt)) == [{"operation": "describe", "parameters": {}}] * 2
@@ -0,0 +1,161 @@
+import io
+import os
+import json
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.result_store import store_result
+from app.core.result_export import EXPORT_FORMATS
+
+client = TestClient(app)
+
+@pytest.fixture
+def result_id():
+    df = pd.DataFrame({
+        "Region": ["East", "West", "North", "South", "East"],
+        "Sales": [10, 20, 30, 40, 50],
+        "OrderDate": pd.to_datetime(["2024-01-01"] * 5),
+    })
+    return store_result(df, source="test.xlsx")
+
+def test_paginate_result_with_cursor(result_id):
+    res = client.get(f"/api/v1/results/{result_id}", params={"limit": 2})
+    assert res.status_code == 200
+    page = res.json()
+    assert page["total_rows"] == 5
+    assert [r["Sales"] for r in page["rows"]] == [10, 20]
+
+    rows = page["rows"]
+    while page["next_cursor"]:
+        page = client.get(f"/api/v1/results/{result_id}", params={"limit": 2, "cursor": page["next_cursor"]}).json()
+        rows.extend(page["rows"])
+    assert [r["Sales"] for r in rows] == [10, 20, 30, 40, 50]
+    assert rows[0]["OrderDate"] == "2024-01-01"
+
+def test_cursor_from_other_result_is_rejected(result_id):
+    other = store_result(pd.DataFrame({"A": [1, 2, 3]}))
+    cursor = client.get(f"/api/v1/results/{other}", params={"limit": 1}).json()["next_cursor"]
+    res = client.get(f"/api/v1/results/{result_id}", params={"cursor": cursor})
+    assert res.status_code == 400
+
+def test_unknown_result_returns_404():
+    assert client.get("/api/v1/results/doesnotexist").status_code == 404
+
+def test_stream_ndjson_and_csv(result_id):
+    res = client.get(f"/api/v1/results/{result_id}/stream", params={"format": "ndjson", "chunk_size": 2})
+    assert res.status_code == 200
+    lines = [json.loads(l) for l in res.text.splitlines()]
+    assert [l["Region"] for l in lines] == ["East", "West", "North", "South", "East"]
+
+    res = client.get(f"/api/v1/results/{result_id}/stream", params={"format": "csv", "chunk_size": 2})
+    df = pd.read_csv(io.StringIO(res.text))
+    assert df["Sales"].tolist() == [10, 20, 30, 40, 50]
+
+def test_stream_arrow(result_id):
+    pa = pytest.importorskip("pyarrow")
+    res = client.get(f"/api/v1/results/{result_id}/stream", params={"format": "arrow", "chunk_size": 2})
+    assert res.status_code == 200
+    table = pa.ipc.open_stream(res.content).read_all()
+    assert table.num_rows == 5
+    assert table.column("Sales").to_pylist() == [10, 20, 30, 40, 50]
+
+def test_stream_arrow_rejects_mixed_column_before_streaming():
+    pytest.importorskip("pyarrow")
+    mixed = store_result(pd.DataFrame({"A": [1, "two", 3.0]}))
+    res = client.get(f"/api/v1/results/{mixed}/stream", params={"format": "arrow"})
+    assert res.status_code == 422
+    assert "arrow" in res.json()["detail"]
+
+def test_results_are_evicted_by_byte_budget(monkeypatch):
+    from app.core import result_store
+    monkeypatch.setattr(result_store, "MAX_STORED_BYTES", 0)
+    first = store_result(pd.DataFrame({"A": range(100)}))
+    second = store_result(pd.DataFrame({"A": range(100)}))
+    assert result_store.get_result(first) is None
+    # the newest result is kept even when it alone is over the budget
+    assert result_store.get_result(second)["bytes"] == result_store.stored_bytes() > 0
+
+def test_stream_unknown_format(result_id):
+    res = client.get(f"/api/v1/results/{result_id}/stream", params={"format": "xml"})
+    assert res.status_code == 400
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather", "csv.gz", "xlsx"])
+def test_download_formats_are_generated_once(result_id, fmt):
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    res = client.get(f"/api/v1/results/{result_id}/download", params={"format": fmt})
+    assert res.status_code == 200
+    path = os.path.join("results", f"result_{result_id}{EXPORT_FORMATS[fmt][0]}")
+    assert os.path.exists(path)
+    mtime = os.path.getmtime(path)
+
+    res_again = client.get(f"/api/v1/results/{result_id}/download", params={"format": fmt})
+    assert res_again.content == res.content
+    assert os.path.getmtime(path) == mtime
+
+    readers = {"parquet": pd.read_parquet, "feather": pd.read_feather, "xlsx": pd.read_excel,
+               "csv.gz": lambda p: pd.read_csv(p, compression="gzip")}
+    assert readers[fmt](path)["Sales"].tolist() == [10, 20, 30, 40, 50]
+
+def test_download_unknown_format(result_id):
+    res = client.get(f"/api/v1/results/{result_id}/download", params={"format": "docx"})
+    assert res.status_code == 400
+
+def test_download_writer_error_is_422_and_leaves_no_temp_file():
+    pytest.importorskip("pyarrow")
+    mixed = store_result(pd.DataFrame({"A": [1, "two", 3.0]}))
+    res = client.get(f"/api/v1/results/{mixed}/download", params={"format": "parquet"})
+    assert res.status_code == 422
+    assert not [f for f in os.listdir("results") if f.startswith(f".tmp_result_{mixed}")]
+
+def test_result_workbooks_are_unique_and_removed_with_the_result():
+    from app.core.executor import execute_plan
+    from app.core.result_store import delete_result
+    os.makedirs("uploads", exist_ok=True)
+    pd.DataFrame({"Region": ["East", "West"], "Sales": [1, 2]}).to_excel("uploads/workbook_test.xlsx", index=False)
+    plan = {"operation": "aggregate", "parameters": {"column": "Sales", "group_by": "Region", "method": "sum"},
+            "input_path": "uploads/workbook_test.xlsx"}
+    df = pd.read_excel("uploads/workbook_test.xlsx")
+    paths = [execute_plan(df.copy(), dict(plan))["file_path"] for _ in range(2)]
+    assert paths[0] != paths[1] and all(os.path.exists(p) for p in paths)
+
+    rid = store_result(df, exports={"workbook": paths[0]})
+    assert delete_result(rid)
+    assert not os.path.exists(paths[0]) and os.path.exists(paths[1])
+    os.remove(paths[1])
+
+def test_export_of_a_result_evicted_meanwhile_is_not_left_on_disk():
+    from app.core.result_export import ResultEvicted, export_result
+    from app.core.result_store import delete_result, get_result
+    rid = store_result(pd.DataFrame({"A": [1, 2]}))
+    entry = get_result(rid)
+    delete_result(rid)  # evicted while the download was being written
+    with pytest.raises(ResultEvicted):
+        export_result(rid, entry, "csv.gz")
+    assert not os.path.exists(os.path.join("results", f"result_{rid}.csv.gz"))
+
+def test_result_files_are_bounded_and_stale_ones_swept(monkeypatch, tmp_path):
+    from app.core import result_store
+    monkeypatch.setattr(result_store, "MAX_RESULT_FILE_BYTES", 150)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"result_wb_{i}.xlsx"
+        path.write_bytes(b"x" * 100)
+        paths.append(str(path))
+    rids = [store_result(pd.DataFrame({"A": [i]}), exports={"workbook": p}) for i, p in enumerate(paths)]
+    # only the newest workbook fits the budget; the older results stay stored without their files
+    assert [os.path.exists(p) for p in paths] == [False, False, True]
+    assert result_store.get_result(rids[0]) is not None and result_store.get_result(rids[0])["exports"] == {}
+    assert client.get(f"/api/v1/results/{rids[0]}/download", params={"format": "csv.gz"}).status_code == 200
+    for rid in rids:
+        result_store.delete_result(rid)
+
+    monkeypatch.setattr(result_store, "RESULTS_DIR", str(tmp_path))
+    old, fresh, other = tmp_path / "result_old.xlsx", tmp_path / "result_fresh.xlsx", tmp_path / "notes.txt"
+    for f in (old, fresh, other):
+        f.write_bytes(b"x")
+    os.utime(old, (0, 0))
+    os.utime(other, (0, 0))
+    assert result_store.sweep_result_files() == 1
+    assert not old.exists() and fresh.exists() and other.exists()
@@ -0,0 +1,71 @@
+import os
+import time
+import pandas as pd
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import llm_interpreter, fast_planner, sampling_profiler
+from app.core.plan_cache import PlanCache
+from app.routes import query_routes
+
+client = TestClient(app)
+
+
+def slow_execute_plan_for_test(df, plan, other_tables=None):
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    return {"status": "ok", "result_df": df, "preview": [], "message": "done"}
+
+
+def _query(headers=None, params=None):
+    return client.post("/api/v1/query", json={"filename": "profiling_test.xlsx", "query": "anything"},
+                       headers=headers or {}, params=params or {})
+
+
+def test_profiles_are_opt_in_and_gated(monkeypatch):
+    monkeypatch.setattr(llm_interpreter, "generate_text", lambda prompt: '{"operation": "describe", "parameters": {}}')
+    monkeypatch.setattr(llm_interpreter, "plan_cache", PlanCache(max_entries=0))
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "off")
+    monkeypatch.setattr(query_routes, "execute_plan", slow_execute_plan_for_test)
+    monkeypatch.setattr(sampling_profiler, "PROFILE_SAMPLE_INTERVAL_MS", 2)
+    os.makedirs("uploads", exist_ok=True)
+    pd.DataFrame({"a": [1, 2]}).to_excel("uploads/profiling_test.xlsx", index=False)
+
+    # disabled by config: the header is ignored
+    res = _query(headers={"X-Profile": "1"})
+    assert res.status_code == 200 and "x-profile-url" not in res.headers
+    assert res.headers["x-request-id"]
+
+    monkeypatch.setattr(sampling_profiler, "PROFILING_ENABLED", True)
+    assert "x-profile-url" not in _query().headers  # enabled, but this request did not ask
+
+    res = _query(headers={"X-Profile": "1", "X-Request-ID": "req-profile-1"})
+    assert res.headers["x-request-id"] == "req-profile-1"
+    url = res.headers["x-profile-url"]
+    assert url.startswith("/api/v1/admin/profiles/") and "req-profile-1" not in url
+    assert client.get("/api/v1/admin/profiles/req-profile-1").status_code == 404  # not addressable by the client's id
+
+    profile = client.get(url, params={"format": "json"}).json()
+    assert profile["request_id"] == "req-profile-1" and url.endswith(profile["profile_id"])
+    assert profile["samples"] > 5
+    assert any("slow_execute_plan_for_test" in stack for stack in profile["stacks"])
+    collapsed = client.get(url).text
+    stack, count = collapsed.splitlines()[0].rsplit(" ", 1)
+    assert int(count) >= 1 and ";" in stack
+
+    # the same client request id twice gives two profiles instead of one overwriting the other
+    again = _query(headers={"X-Profile": "1", "X-Request-ID": "req-profile-1"}).headers["x-profile-url"]
+    assert again != url and client.get(url).status_code == 200
+
+    assert _query(params={"profile": "true"}).headers["x-profile-url"]
+    listed = client.get("/api/v1/admin/profiles").json()
+    assert listed["enabled"] and "stacks" not in listed["profiles"][0]
+    assert client.get("/api/v1/admin/profiles/unknown").status_code == 404
+
+
+def test_retention_is_bounded(monkeypatch):
+    monkeypatch.setattr(sampling_profiler, "MAX_STORED_PROFILES", 2)
+    for i in range(4):
+        profile, token = sampling_profiler.start_profile(f"bounded-{i}")
+        sampling_profiler.finish_profile(profile, token)
+    assert [p["request_id"] for p in sampling_profiler.list_profiles()] == ["bounded-3", "bounded-2"]
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from app.data_generation.scalable_generator import SCHEMAS, generate_frame, main, write_dataset
+
+SCHEMA = {
+    "OrderID": {"type": "id", "prefix": "ORD-", "start": 1000},
+    "Region": {"type": "choice", "values": ["North", "South"]},
+    "Discount": {"type": "choice", "values": [0, 0.1]},
+    "Units": {"type": "int", "low": 1, "high": 5},
+    "Price": {"type": "float", "low": 1, "high": 2, "decimals": 2},
+    "Day": {"type": "date", "start": "2024-01-01", "end": "2024-01-31"},
+    "Flag": {"type": "bool"},
+}
+
+
+def test_generation_is_reproducible_and_typed():
+    a = generate_frame(SCHEMA, 2500, seed=7, chunk_size=1000)
+    b = generate_frame(SCHEMA, 2500, seed=7, chunk_size=1000)
+    assert a.equals(b)
+    assert not a.equals(generate_frame(SCHEMA, 2500, seed=8, chunk_size=1000))
+    assert a["OrderID"].iloc[[0, -1]].tolist() == ["ORD-1000", "ORD-3499"]
+    assert a["OrderID"].is_unique
+    assert set(a["Region"]) == {"North", "South"}
+    assert pd.api.types.is_float_dtype(a["Discount"])
+    assert a["Units"].between(1, 4).all()
+    assert pd.api.types.is_datetime64_any_dtype(a["Day"])
+    assert a["Day"].min() >= pd.Timestamp("2024-01-01") and a["Day"].max() <= pd.Timestamp("2024-01-31")
+    assert a["Flag"].dtype == bool
+
+
+def test_builtin_schema_uses_faker_pools():
+    df = generate_frame(SCHEMAS["sales"], 500, seed=1)
+    assert list(df.columns) == list(SCHEMAS["sales"])
+    assert df["CustomerName"].nunique() > 50
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "xlsx"])
+def test_chunked_writers_round_trip(tmp_path, fmt):
+    path = write_dataset(SCHEMA, 1200, str(tmp_path / f"out.{fmt}"), seed=3, chunk_size=500)
+    reader = {"csv": pd.read_csv, "parquet": pd.read_parquet, "xlsx": pd.read_excel}[fmt]
+    back = reader(path)
+    assert len(back) == 1200
+    assert back["OrderID"].tolist() == generate_frame(SCHEMA, 1200, seed=3, chunk_size=500)["OrderID"].tolist()
+
+
+def test_xlsx_row_limit_is_enforced(tmp_path):
+    with pytest.raises(ValueError):
+        write_dataset(SCHEMA, 2_000_000, str(tmp_path / "big.xlsx"))
+
+
+def test_cli(tmp_path, capsys):
+    out = tmp_path / "hr.parquet"
+    main(["--schema", "hr", "--rows", "300", "--out", str(out), "--seed", "5"])
+    assert len(pd.read_parquet(out)) == 300
+    assert "300 rows" in capsys.readouterr().out
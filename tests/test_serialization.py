@@ -0,0 +1,41 @@
+import json
+import numpy as np
+import pandas as pd
+from app.core.serialization import frame_to_records, to_json_safe, FastJSONResponse
+
+def test_frame_to_records_converts_columns():
+    df = pd.DataFrame({
+        "Date": pd.to_datetime(["2024-01-05", None, "2024-03-01"]),
+        "Qty": np.array([1, 2, 3], dtype=np.int64),
+        "Price": [1.5, np.nan, 3.0],
+        "Flag": [True, False, True],
+        "Name": ["a", None, "c"],
+    })
+    records = frame_to_records(df, max_rows=10)
+    assert records[0] == {"Date": "2024-01-05", "Qty": 1, "Price": 1.5, "Flag": True, "Name": "a"}
+    assert records[1]["Date"] is None
+    assert records[1]["Price"] is None
+    assert records[1]["Name"] is None
+    assert type(records[2]["Qty"]) is int
+    assert json.dumps(records)
+
+def test_frame_to_records_respects_max_rows_and_empty():
+    df = pd.DataFrame({"A": range(50)})
+    assert len(frame_to_records(df, max_rows=20)) == 20
+    assert len(frame_to_records(df, max_rows=None)) == 50
+    assert frame_to_records(df.iloc[0:0]) == []
+
+def test_object_column_with_timestamps_is_formatted():
+    df = pd.DataFrame({"When": [pd.Timestamp("2023-02-01"), pd.Timestamp("2023-02-02")]}, dtype=object)
+    assert frame_to_records(df) == [{"When": "2023-02-01"}, {"When": "2023-02-02"}]
+
+def test_to_json_safe_handles_nested_numpy():
+    out = to_json_safe({"a": np.int64(3), "b": [np.float64(1.5), np.bool_(True)], "c": float("nan")})
+    assert out == {"a": 3, "b": [1.5, True], "c": None}
+
+def test_fast_json_response_encodes_numpy():
+    resp = FastJSONResponse(content={"n": np.int64(7), "arr": np.array([1, 2]), "ts": pd.Timestamp("2024-01-01")})
+    body = json.loads(resp.body)
+    assert body["n"] == 7
+    assert body["arr"] == [1, 2]
+    assert body["ts"].startswith("2024-01-01")
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from app.core import file_manager, shared_store
+
+
+def _sheets(rows=50):
+    sales = pd.DataFrame({
+        "Region": [["North", "South", "East"][i % 3] for i in range(rows)],
+        "Revenue": [float(i) * 1.5 for i in range(rows)],
+        "Units": list(range(rows)),
+        "Date": pd.date_range("2024-01-01", periods=rows, freq="D"),
+        "Note": [float("nan") if i % 4 else f"n{i}" for i in range(rows)],
+    })
+    return {"Sales": sales, "Targets": pd.DataFrame({"Region": ["North", "South"], "Target": [10, 20]})}
+
+
+def test_publish_then_attach_round_trips_sheets_and_maps_numeric_columns_read_only(tmp_path):
+    sheets = _sheets()
+    assert shared_store.publish("abc", sheets, directory=str(tmp_path))
+
+    attached = shared_store.attach("abc", directory=str(tmp_path))
+    assert list(attached) == ["Sales", "Targets"]
+    for name, df in sheets.items():
+        pd.testing.assert_frame_equal(attached[name], df)
+    assert not attached["Sales"]["Units"].values.flags.writeable
+    with pytest.raises(ValueError):
+        attached["Sales"].loc[0, "Units"] = 99
+    # adding columns (derived columns) still works on the mapped frame
+    attached["Sales"]["Double"] = attached["Sales"]["Units"] * 2
+    assert shared_store.store_stats(str(tmp_path))["attaches"] == 1
+
+
+def test_unshareable_sheets_are_not_published(tmp_path):
+    mixed = {"Sheet1": pd.DataFrame({"Value": [1, "two", 3.0]})}
+    numeric_headers = {"Sheet1": pd.DataFrame({2024: [1, 2]})}
+    assert not shared_store.publish("mixed", mixed, directory=str(tmp_path))
+    assert not shared_store.publish("headers", numeric_headers, directory=str(tmp_path))
+    assert shared_store.attach("mixed", directory=str(tmp_path)) is None
+    assert not [p for p in os.listdir(tmp_path) if p != shared_store.CATALOG_NAME and not p.startswith(shared_store.CATALOG_NAME)]
+
+
+def test_prune_drops_least_recently_attached_datasets(tmp_path):
+    directory = str(tmp_path)
+    for key in ("old", "new"):
+        shared_store.publish(key, _sheets(), directory=directory)
+    shared_store.attach("new", directory=directory)
+    one_dataset = shared_store.store_stats(directory)["bytes"] // 2
+    assert shared_store.prune(max_bytes=one_dataset + 1, directory=directory) == ["old"]
+    assert shared_store.attach("old", directory=directory) is None
+    assert shared_store.attach("new", directory=directory) is not None
+
+
+def test_entry_whose_files_disappeared_is_forgotten(tmp_path):
+    directory = str(tmp_path)
+    shared_store.publish("gone", _sheets(), directory=directory)
+    shutil.rmtree(tmp_path / "gone")
+    assert shared_store.attach("gone", directory=directory) is None
+    assert shared_store.store_stats(directory)["datasets"] == 0
+
+
+def test_cold_worker_attaches_instead_of_parsing(tmp_path, monkeypatch):
+    store_dir = tmp_path / "shared"
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    path = upload_dir / "shared_sales.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        for name, df in _sheets(20).items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    monkeypatch.setattr(shared_store, "SHARED_DATASET_DIR", str(store_dir))
+    monkeypatch.delitem(file_manager.dataset_cache, "shared_sales.xlsx", raising=False)
+
+    first, _ = file_manager.get_dataset("shared_sales.xlsx", str(upload_dir))
+    # a second worker: empty local cache, and parsing the workbook is not an option
+    file_manager.dataset_cache.pop("shared_sales.xlsx")
+    monkeypatch.setattr(file_manager, "_read_all_sheets_to_cache", lambda _: pytest.fail("workbook parsed again"))
+    second, meta = file_manager.get_dataset("shared_sales.xlsx", str(upload_dir))
+    try:
+        pd.testing.assert_frame_equal(second["Sales"], first["Sales"])
+        assert meta["content_hash"] == file_manager.file_content_hash(str(path))
+
+        # and from another process, as another uvicorn worker would
+        code = ("import json, sys; from app.core import shared_store; "
+                "s = shared_store.attach(sys.argv[1]); print(json.dumps({k: list(v.shape) for k, v in s.items()}))")
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=repo_root, SHARED_DATASET_DIR=str(store_dir), LOG_LEVEL="WARNING")
+        out = subprocess.run([sys.executable, "-c", code, meta["content_hash"]], env=env, capture_output=True, text=True, check=True)
+        assert json.loads(out.stdout.strip().splitlines()[-1]) == {"Sales": [20, 5], "Targets": [2, 2]}
+    finally:
+        file_manager.dataset_cache.pop("shared_sales.xlsx", None)
+        file_manager.dataset_meta.pop("shared_sales.xlsx", None)
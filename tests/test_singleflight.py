@@ -0,0 +1,80 @@
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import pandas as pd
+import pytest
+from app.main import app
+from app.core.singleflight import SingleFlight
+from app.routes import query_routes
+
+
+def test_concurrent_callers_share_one_execution():
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return {"value": x}
+
+    async def main():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.run("k", slow, 1) for _ in range(10)))
+        again = await flight.run("k", slow, 2)
+        return flight, results, again
+
+    flight, results, again = asyncio.run(main())
+    assert calls == [1, 2]
+    assert all(r is results[0] for r in results)
+    assert again == {"value": 2}
+    assert flight.stats == {"executions": 2, "shared": 9}
+    assert flight.in_flight() == 0
+
+
+def test_errors_are_shared_and_not_cached():
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    async def main():
+        flight = SingleFlight("test")
+        outcomes = await asyncio.gather(*(flight.run("k", failing) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(ValueError):
+            await flight.run("k", failing)
+        return outcomes
+
+    outcomes = asyncio.run(main())
+    assert all(isinstance(o, ValueError) for o in outcomes)
+    assert len(attempts) == 2
+
+
+def test_identical_queries_call_planner_once(monkeypatch):
+    planner_calls = []
+    lock = threading.Lock()
+
+    def slow_planner(user_query, sample_columns=None, column_profile=None):
+        with lock:
+            planner_calls.append(user_query)
+        time.sleep(0.2)
+        return {"operation": "aggregate", "parameters": {"column": "Sales", "group_by": "Region", "method": "sum"}}
+
+    monkeypatch.setattr(query_routes, "call_llm_for_plan", slow_planner)
+    os.makedirs("uploads", exist_ok=True)
+    pd.DataFrame({"Region": ["East", "West"], "Sales": [1, 2]}).to_excel(os.path.join("uploads", "herd_test.xlsx"), index=False)
+    query_routes.dataset_cache.pop("herd_test.xlsx", None)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"filename": "herd_test.xlsx", "query": "total sales by region"}
+            return await asyncio.gather(*(client.post("/api/v1/query", json=body) for _ in range(8)))
+
+    responses = asyncio.run(main())
+    assert all(r.status_code == 200 for r in responses)
+    assert planner_calls == ["total sales by region"]
+    assert len({r.json()["result_id"] for r in responses}) == 1
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from benchmarks.bench_import import parse_importtime, time_import
+from app.services import llm_client
+from app.services.llm_backends import LLMBackend
+
+
+def test_importing_the_app_does_not_load_the_llm_sdk_or_openpyxl():
+    result = time_import("app.main")
+    assert result["seconds"] > 0
+    assert "google.generativeai" not in result["loaded"]
+    assert "openpyxl" not in result["loaded"]
+
+
+def test_importing_the_app_has_no_filesystem_side_effects(tmp_path):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import json, os, app.main; print(json.dumps(os.listdir('.')))"
+    env = dict(os.environ, PYTHONPATH=repo_root, LOG_LEVEL="WARNING")
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+def test_parse_importtime_sums_self_time_per_package():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:      1000 |       1000 |     pandas._libs",
+        "import time:       500 |       1500 |   pandas",
+        "import time:       250 |        250 | app.core.logger",
+        "{\"level\": \"INFO\"}",
+    ])
+    assert parse_importtime(stderr) == {"pandas": 0.0015, "app": 0.00025}
+
+
+class _WarmBackend(LLMBackend):
+    name = "warm"
+
+    def __init__(self):
+        self.warmed = []
+
+    def generate(self, prompt, model, generation_config, timeout):
+        return "{}"
+
+    def warm(self, model):
+        self.warmed.append(model)
+
+
+def test_startup_creates_directories_and_warms_the_llm_client(tmp_path, monkeypatch):
+    backend = _WarmBackend()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "LLM_WARM_START", True)
+    monkeypatch.setattr(llm_client, "build_backend_from_env", lambda: backend)
+    llm_client.set_llm_client(None)
+    try:
+        with TestClient(main.app) as client:
+            assert client.get("/health").json() == {"status": "ok"}
+        for thread in [t for t in threading.enumerate() if t.name == "llm-warm-start"]:
+            thread.join(timeout=5)
+        assert (tmp_path / "uploads").is_dir() and (tmp_path / "results").is_dir()
+        assert backend.warmed == [llm_client.MODEL_NAME]
+    finally:
+        llm_client.set_llm_client(None)
@@ -0,0 +1,83 @@
+import os
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import fast_planner, verification
+from app.core.verification import verify_locally
+
+client = TestClient(app)
+
+SOURCE = pd.DataFrame({"Region": ["East", "West", "East"], "Rep": ["a", "b", "c"], "Sales": [10, 20, 30]})
+
+def _checks(out):
+    return {c["name"]: c["ok"] for c in out["checks"]}
+
+def test_local_checks_pass_for_consistent_aggregate():
+    plan = {"operation": "aggregate", "parameters": {"column": "Sales", "group_by": "Region", "method": "sum"}}
+    result = SOURCE.groupby("Region")["Sales"].sum().reset_index()
+    out = verify_locally(plan, SOURCE, result)
+    assert out["ok"] is True
+    assert _checks(out) == {"columns_exist": True, "result_non_empty": True, "row_count_plausible": True, "aggregation_types": True}
+
+def test_local_checks_flag_problems():
+    plan = {"operation": "aggregate", "parameters": {"column": "Rep", "group_by": "Territory", "method": "sum", "limit": 1}}
+    out = verify_locally(plan, SOURCE, SOURCE)
+    checks = _checks(out)
+    assert out["ok"] is False
+    assert checks["columns_exist"] is False
+    assert checks["row_count_plausible"] is False
+    assert checks["aggregation_types"] is False
+
+    empty = verify_locally({"operation": "filter", "parameters": {"column": "Sales", "operator": ">", "value": 100}},
+                           SOURCE, SOURCE.iloc[0:0])
+    assert _checks(empty)["result_non_empty"] is False
+
+def test_filter_check_reevaluates_the_condition():
+    plan = {"operation": "filter", "parameters": {"column": "Sales", "operator": ">", "value": 15}}
+    assert _checks(verify_locally(plan, SOURCE, SOURCE[SOURCE["Sales"] > 15]))["filter_condition_holds"] is True
+    wrong = verify_locally(plan, SOURCE, SOURCE)
+    assert wrong["ok"] is False and "1 of 3 kept rows" in wrong["checks"][-1]["detail"]
+
+    contains = {"operation": "filter", "parameters": {"column": "Region", "operator": "contains", "value": "ea"}}
+    assert _checks(verify_locally(contains, SOURCE, SOURCE[SOURCE["Region"] == "East"]))["filter_condition_holds"] is True
+
+def test_callbacks_only_go_to_allowed_hosts(monkeypatch):
+    monkeypatch.setattr(verification, "CALLBACK_HOSTS", set())
+    assert not verification.callback_allowed("http://hooks.example.com/done")
+    monkeypatch.setattr(verification, "CALLBACK_HOSTS", {"hooks.example.com"})
+    assert verification.callback_allowed("https://Hooks.Example.com/done")
+    assert not verification.callback_allowed("http://169.254.169.254/latest/meta-data")
+    assert not verification.callback_allowed("file:///etc/passwd")
+
+    posted = []
+    monkeypatch.setattr(verification._callback_opener, "open", lambda req, timeout: posted.append(req.full_url))
+    verification._post_callback("http://localhost:8000/admin", {"ok": True})
+    assert posted == []
+
+    res = client.post("/api/v1/query", json={"filename": "verify_test.xlsx", "query": "q", "callback_url": "http://localhost/x"})
+    assert res.status_code == 400
+
+def test_llm_verification_runs_in_background(monkeypatch):
+    calls = []
+    def fake_verifier(user_query, plan, result_sample):
+        calls.append(user_query)
+        return {"ok": True, "note": "looks right"}
+    monkeypatch.setattr(verification, "call_llm_verifier", fake_verifier)
+    monkeypatch.setattr(fast_planner, "FAST_PLANNER_MODE", "on")  # planned locally, no LLM needed
+
+    os.makedirs("uploads", exist_ok=True)
+    SOURCE.to_excel(os.path.join("uploads", "verify_test.xlsx"), index=False)
+    res = client.post("/api/v1/query", json={"filename": "verify_test.xlsx", "query": "sum of sales by region", "verify": True})
+    assert res.status_code == 200
+    verifier = res.json()["verifier"]
+    assert verifier["ok"] is True
+    assert verifier["llm_verification"]["status"] == "pending"
+
+    status = client.get(verifier["llm_verification"]["url"]).json()
+    assert status["status"] == "done"
+    assert status["verdict"] == {"ok": True, "note": "looks right"}
+    assert calls == ["sum of sales by region"]
+
+def test_unknown_verification_returns_404():
+    assert client.get("/api/v1/verification/nope").status_code == 404